@@ -0,0 +1,152 @@
+"""Backfill for the astronomy pipeline. Splits a date range into weeks and
+extracts several weeks at once through one shared API client, so every
+week draws on the same connections and rate limit, then upserts each
+week as soon as it is extracted. Rerunning a range is safe: finished
+work is resumed from checkpoints and loaded rows are merged, not
+duplicated."""
+
+from os import environ as ENV
+from datetime import date, timedelta
+import argparse
+import asyncio
+import logging
+import time
+
+from astronomy_extract import (extract_astronomy_week, get_db_regions, get_auth_string,
+                               ASTRO_URL)
+from astronomy_cache import ResponseCache
+from astronomy_checkpoint import Checkpoint, get_checkpoint_store
+from astronomy_client import AstronomyAPIClient
+from astronomy_transform import transform_astronomy_data
+from astronomy_load import bulk_upload_astronomy_data
+from instrumentation import track_stage
+
+BACKFILL_CONCURRENCY = 2
+
+
+def get_week_windows(start_date: date, end_date: date) -> list[date]:
+    """Returns the first day of each week needed to cover start_date to
+    end_date inclusive. The last week may run past end_date."""
+
+    if end_date < start_date:
+        raise ValueError(f"Backfill end {end_date} is before its start {start_date}.")
+
+    return [start_date + timedelta(days=7 * n)
+            for n in range((end_date - start_date).days // 7 + 1)]
+
+
+class BackfillProgress():
+    """Tracks and logs how far a backfill has got."""
+
+    def __init__(self, weeks: list[date]):
+        """Creates progress for the given weeks."""
+        self.weeks = weeks
+        self.loaded = []
+        self.failed = []
+        self.rows = 0
+        self.start = time.monotonic()
+
+    @property
+    def finished(self) -> int:
+        '''Returns the number of weeks loaded or failed.'''
+        return len(self.loaded) + len(self.failed)
+
+    def get_eta(self) -> float:
+        '''Returns the estimated seconds until every week has finished.'''
+        if not self.finished:
+            return 0.0
+
+        elapsed = time.monotonic() - self.start
+        return elapsed / self.finished * (len(self.weeks) - self.finished)
+
+    def week_loaded(self, week_start: date, rows: int) -> None:
+        '''Records a loaded week and logs the progress so far.'''
+        self.loaded.append(str(week_start))
+        self.rows += rows
+        logging.info("Backfilled week of %s with %s rows: %s of %s weeks done, "
+                     "about %.0f seconds left.", week_start, rows, self.finished,
+                     len(self.weeks), self.get_eta())
+
+    def week_failed(self, week_start: date, err: Exception) -> None:
+        '''Records a week that could not be backfilled.'''
+        self.failed.append({"week": str(week_start), "error": repr(err)})
+        logging.error("Backfill of week %s failed: %r (%s of %s weeks done).",
+                      week_start, err, self.finished, len(self.weeks))
+
+    def to_dict(self) -> dict:
+        '''Returns a summary of the backfill.'''
+        return {"weeks": len(self.weeks), "loaded": sorted(self.loaded),
+                "failed": self.failed, "rows": self.rows}
+
+
+def load_week(extract_data: dict) -> int:
+    """Transforms and upserts one week, returning the number of rows."""
+
+    transformed_data = transform_astronomy_data(extract_data)
+    bulk_upload_astronomy_data(transformed_data, upsert=True)
+
+    return sum(len(rows) for rows in transformed_data.values())
+
+
+async def backfill_week(client: AstronomyAPIClient, week_start: date,
+                        regions: list[dict], semaphore: asyncio.Semaphore,
+                        progress: BackfillProgress) -> None:
+    """Extracts, transforms and loads one week. The week keeps its
+    checkpoints until it has been loaded, so a failed week resumes."""
+
+    async with semaphore:
+        try:
+            checkpoint = Checkpoint(get_checkpoint_store(), str(week_start))
+            extract_data = await extract_astronomy_week(client, week_start, regions,
+                                                        checkpoint)
+            rows = await asyncio.to_thread(load_week, extract_data)
+            checkpoint.finish()
+
+        except Exception as err:  # pylint: disable=W0718
+            progress.week_failed(week_start, err)
+            return
+
+    progress.week_loaded(week_start, rows)
+
+
+async def run_backfill(start_date: date, end_date: date,
+                       concurrency: int = None) -> dict:
+    """Backfills every week from start_date to end_date, running up to
+    `concurrency` weeks at once, and returns a summary."""
+
+    concurrency = concurrency or int(ENV.get("BACKFILL_CONCURRENCY", BACKFILL_CONCURRENCY))
+    weeks = get_week_windows(start_date, end_date)
+    progress = BackfillProgress(weeks)
+
+    logging.info("Backfilling %s weeks from %s, %s at a time.",
+                 len(weeks), start_date, concurrency)
+
+    with track_stage("astronomy", "backfill") as stage:
+        regions = get_db_regions()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with AstronomyAPIClient(get_auth_string(), ASTRO_URL,
+                                      cache=ResponseCache.from_env()) as client:
+            await asyncio.gather(*[backfill_week(client, week, regions, semaphore, progress)
+                                   for week in weeks])
+
+            logging.info("Astronomy API requests sent: %s", client.request_count)
+
+        stage.add_rows(progress.rows)
+
+    return progress.to_dict()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Backfill the astronomy tables.")
+    parser.add_argument("start_date", type=date.fromisoformat)
+    parser.add_argument("end_date", type=date.fromisoformat)
+    parser.add_argument("--concurrency", type=int,
+                        help="weeks extracted at once, otherwise BACKFILL_CONCURRENCY")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run_backfill(args.start_date, args.end_date, args.concurrency))
+    logging.info("Backfill finished: %s weeks loaded, %s failed, %s rows.",
+                 len(summary["loaded"]), len(summary["failed"]), summary["rows"])
@@ -0,0 +1,99 @@
+"""Persistent on-disk cache for Astronomy API responses.
+Responses are keyed by a hash of the endpoint and request body, so a
+rerun only requests the items that are missing or expired."""
+
+from os import environ as ENV
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+
+CACHE_PATH = "/tmp/astronomy_cache.sqlite"
+CACHE_TTL = 14 * 24 * 60 * 60
+CACHE_MAX_ENTRIES = 5000
+
+
+def make_cache_key(path: str, body: dict) -> str:
+    """Returns a content hash for a request to the given path."""
+
+    payload = json.dumps({"path": path, "body": body},
+                         sort_keys=True, default=str)
+
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache():
+    """SQLite backed response cache with a TTL and LRU eviction."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl: int = CACHE_TTL,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        """Opens the cache file, creating the table if needed."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS response (
+                             cache_key TEXT PRIMARY KEY,
+                             body TEXT NOT NULL,
+                             created_at REAL NOT NULL,
+                             accessed_at REAL NOT NULL)""")
+        self.conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        '''Returns a cache configured from the environment, or None
+        if caching is disabled.'''
+        if ENV.get("ASTRONOMY_CACHE", "on").lower() == "off":
+            return None
+
+        return cls(ENV.get("ASTRONOMY_CACHE_PATH", CACHE_PATH),
+                   int(ENV.get("ASTRONOMY_CACHE_TTL", CACHE_TTL)),
+                   int(ENV.get("ASTRONOMY_CACHE_MAX_ENTRIES", CACHE_MAX_ENTRIES)))
+
+    def get(self, key: str) -> dict:
+        '''Returns the cached response for a key, or None if it is
+        missing or has expired.'''
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT body, created_at FROM response WHERE cache_key = ?;",
+            (key,)).fetchone()
+
+        if row is None or now - row[1] > self.ttl:
+            self.misses += 1
+            return None
+
+        self.conn.execute(
+            "UPDATE response SET accessed_at = ? WHERE cache_key = ?;",
+            (now, key))
+        self.conn.commit()
+        self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, key: str, response: dict) -> None:
+        '''Stores a response and evicts the least recently used entries
+        beyond the size limit.'''
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?);",
+            (key, json.dumps(response), now, now))
+        self.evict()
+        self.conn.commit()
+
+    def evict(self) -> None:
+        '''Removes expired entries and any beyond the size limit.'''
+        self.conn.execute("DELETE FROM response WHERE created_at < ?;",
+                          (time.time() - self.ttl,))
+        self.conn.execute("""DELETE FROM response WHERE cache_key NOT IN
+                             (SELECT cache_key FROM response
+                              ORDER BY accessed_at DESC LIMIT ?);""",
+                          (self.max_entries,))
+
+    def close(self) -> None:
+        '''Logs the hit rate and closes the cache file.'''
+        logging.info("Response cache hits: %s, misses: %s",
+                     self.hits, self.misses)
+        self.conn.close()
@@ -0,0 +1,154 @@
+"""Checkpoints for resuming a partially completed weekly astronomy run.
+Each finished piece of extract work is saved as JSON to a local
+directory or an S3 bucket, keyed by the week being extracted."""
+
+from os import environ as ENV
+import json
+import logging
+import os
+
+CHECKPOINT_DIR = "/tmp/astronomy_checkpoints"
+
+
+class LocalCheckpointStore():
+    """Stores checkpoints as JSON files in a local directory."""
+
+    def __init__(self, root: str = CHECKPOINT_DIR):
+        """Creates a store rooted at the given directory."""
+        self.root = root
+
+    def list(self, run_id: str) -> set:
+        '''Returns the checkpoint names saved for a run.'''
+        run_dir = os.path.join(self.root, run_id)
+
+        if not os.path.isdir(run_dir):
+            return set()
+
+        return {name.removesuffix(".json") for name in os.listdir(run_dir)}
+
+    def read(self, run_id: str, name: str):
+        '''Returns the data saved under a checkpoint name.'''
+        with open(os.path.join(self.root, run_id, f"{name}.json"),
+                  "r", encoding="UTF-8") as f_obj:
+            return json.load(f_obj)
+
+    def write(self, run_id: str, name: str, data) -> None:
+        '''Saves data under a checkpoint name.'''
+        run_dir = os.path.join(self.root, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+
+        with open(os.path.join(run_dir, f"{name}.json"),
+                  "w", encoding="utf-8") as f_obj:
+            json.dump(data, f_obj)
+
+    def delete(self, run_id: str) -> None:
+        '''Removes every checkpoint saved for a run.'''
+        for name in self.list(run_id):
+            os.remove(os.path.join(self.root, run_id, f"{name}.json"))
+
+
+class S3CheckpointStore():
+    """Stores checkpoints as JSON objects in an S3 compatible bucket."""
+
+    def __init__(self, bucket: str, prefix: str = "astronomy-checkpoints/",
+                 s3_client=None):
+        """Creates a store writing under the given bucket prefix."""
+        if s3_client is None:
+            from boto3 import client  # pylint: disable=C0415
+            s3_client = client("s3", endpoint_url=ENV.get("CHECKPOINT_ENDPOINT"))
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3 = s3_client
+
+    def _key(self, run_id: str, name: str) -> str:
+        '''Returns the object key for a checkpoint name.'''
+        return f"{self.prefix}{run_id}/{name}.json"
+
+    def list(self, run_id: str) -> set:
+        '''Returns the checkpoint names saved for a run.'''
+        paginator = self.s3.get_paginator("list_objects_v2")
+        run_prefix = f"{self.prefix}{run_id}/"
+
+        names = set()
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=run_prefix):
+            for obj in page.get("Contents", []):
+                names.add(obj["Key"].removeprefix(run_prefix).removesuffix(".json"))
+
+        return names
+
+    def read(self, run_id: str, name: str):
+        '''Returns the data saved under a checkpoint name.'''
+        response = self.s3.get_object(Bucket=self.bucket,
+                                      Key=self._key(run_id, name))
+
+        return json.loads(response["Body"].read())
+
+    def write(self, run_id: str, name: str, data) -> None:
+        '''Saves data under a checkpoint name.'''
+        self.s3.put_object(Bucket=self.bucket, Key=self._key(run_id, name),
+                           Body=json.dumps(data).encode())
+
+    def delete(self, run_id: str) -> None:
+        '''Removes every checkpoint saved for a run.'''
+        for name in self.list(run_id):
+            self.s3.delete_object(Bucket=self.bucket, Key=self._key(run_id, name))
+
+
+class Checkpoint():
+    """Checkpoints of a single run, backed by a local or S3 store."""
+
+    def __init__(self, store, run_id: str):
+        """Loads the names of the checkpoints already saved for the run."""
+        self.store = store
+        self.run_id = run_id
+        self.completed = store.list(run_id)
+        self.failed = set()
+
+        if self.completed:
+            logging.info("Resuming run %s from %s checkpoints.",
+                         run_id, len(self.completed))
+
+    def load(self, name: str):
+        '''Returns the saved data for a name, or None if it has not
+        been checkpointed.'''
+        if name not in self.completed:
+            return None
+
+        return self.store.read(self.run_id, name)
+
+    def save(self, name: str, data) -> None:
+        '''Saves the data for a name.'''
+        self.store.write(self.run_id, name, data)
+        self.completed.add(name)
+
+    def mark_failed(self, name: str) -> None:
+        '''Records a piece of work that could not be fetched this run.'''
+        self.failed.add(name)
+
+    def clear(self) -> None:
+        '''Removes the run's checkpoints once it has been loaded.'''
+        self.store.delete(self.run_id)
+        self.completed = set()
+
+    def finish(self) -> bool:
+        '''Clears the checkpoints once the run has been loaded, unless some
+        work failed, in which case they are kept so the next run fetches
+        only the gaps. Returns whether the checkpoints were cleared.'''
+        if self.failed:
+            logging.warning("Keeping checkpoints of run %s, %s pieces failed: %s.",
+                            self.run_id, len(self.failed), sorted(self.failed))
+            return False
+
+        self.clear()
+        return True
+
+
+def get_checkpoint_store():
+    """Returns an S3 store if CHECKPOINT_BUCKET is set, otherwise a
+    local store under CHECKPOINT_DIR."""
+
+    if ENV.get("CHECKPOINT_BUCKET"):
+        return S3CheckpointStore(ENV["CHECKPOINT_BUCKET"])
+
+    return LocalCheckpointStore(ENV.get("CHECKPOINT_DIR", CHECKPOINT_DIR))
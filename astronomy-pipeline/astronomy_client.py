@@ -0,0 +1,153 @@
+"""Shared client for the Astronomy API.
+Owns a pooled keep-alive session, a token bucket rate limiter and
+retries with jittered backoff, so every endpoint shares one set of
+connections and one request budget."""
+
+from os import environ as ENV
+import asyncio
+import json
+import logging
+import random
+import time
+
+import aiohttp
+
+from api_error import APIError
+from astronomy_cache import ResponseCache, make_cache_key
+from instrumentation import record_request
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class TokenBucket():
+    """Token bucket rate limiter shared by every request of a client."""
+
+    def __init__(self, rate: float, capacity: int):
+        """Creates a full bucket refilled at `rate` tokens per second."""
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        '''Adds the tokens accrued since the last refill.'''
+        now = time.monotonic()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        '''Waits until a token is available and consumes it.'''
+        async with self._lock:
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+class AstronomyAPIClient():
+    """Asynchronous Astronomy API client used as an async context manager."""
+
+    def __init__(self, auth_string: str, base_url: str,
+                 rate: float = None, burst: int = None,
+                 max_retries: int = 3, pool_size: int = 20,
+                 timeout: int = 50, cache: ResponseCache = None):
+        """Creates a client; the session is opened on entering the context."""
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.headers = {"Authorization": f"Basic {auth_string}"}
+
+        rate = rate or float(ENV.get("ASTRONOMY_RATE_LIMIT", 10))
+        burst = burst or int(ENV.get("ASTRONOMY_RATE_BURST", 10))
+        self.limiter = TokenBucket(rate, burst)
+
+        self.cache = cache
+        self.session = None
+        self.request_count = 0
+
+    async def __aenter__(self):
+        '''Opens the pooled session.'''
+        connector = aiohttp.TCPConnector(limit=self.pool_size,
+                                         keepalive_timeout=60,
+                                         ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(connector=connector,
+                                             headers=self.headers,
+                                             timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        '''Closes the pooled session.'''
+        await self.session.close()
+        self.session = None
+
+        if self.cache:
+            self.cache.close()
+
+    @staticmethod
+    def get_backoff(attempt: int, retry_after: str = None) -> float:
+        '''Returns the seconds to wait before the next attempt, honouring
+        a numeric Retry-After header and otherwise using full jitter.'''
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+
+        return random.uniform(0, min(30, 2 ** attempt))
+
+    async def request(self, method: str, path: str, retries: int = None, **kwargs) -> dict:
+        '''Returns the decoded json of a request, retrying rate limited,
+        server side and connection failures up to `retries` times, or
+        max_retries if not given. Raises an APIError once the retries
+        are exhausted.'''
+        url = f"{self.base_url}{path}"
+        retries = self.max_retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            await self.limiter.acquire()
+            self.request_count += 1
+            retry_after = None
+
+            try:
+                async with self.session.request(method, url, **kwargs) as response:
+                    if response.status == 200:
+                        body = await response.read()
+                        record_request(len(body))
+                        return json.loads(body)
+
+                    error = APIError("Unsuccessful request.", response.status)
+                    if response.status not in RETRY_STATUSES:
+                        raise error
+                    retry_after = response.headers.get("Retry-After")
+
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as exc:
+                error = APIError(f"Request failed: {exc!r}", 408)
+
+            if attempt < retries:
+                logging.info("Retrying %s %s after HTTP %s (attempt %s).",
+                             method, path, error.code, attempt + 1)
+                await asyncio.sleep(self.get_backoff(attempt, retry_after))
+
+        raise error
+
+    async def get(self, path: str, params: dict = None) -> dict:
+        '''Sends a get request to the given API path.'''
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path: str, body: dict, cacheable: bool = False,
+                   retries: int = None) -> dict:
+        '''Sends a post request with a json body to the given API path.
+        Cacheable requests are answered from the response cache when
+        an identical body has been sent before.'''
+        if not (cacheable and self.cache):
+            return await self.request("POST", path, retries, json=body)
+
+        key = make_cache_key(path, body)
+        response = self.cache.get(key)
+
+        if response is None:
+            response = await self.request("POST", path, retries, json=body)
+            self.cache.set(key, response)
+
+        return response
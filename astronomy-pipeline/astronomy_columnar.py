@@ -0,0 +1,153 @@
+"""Columnar intermediate format for the weekly extract payload.
+Each part of the extract is written as an Arrow IPC or Parquet file, so
+a run can be inspected, kept as a checkpoint, and read back column by
+column, memory-mapped, instead of parsing one large JSON document."""
+
+import os
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import ipc, parquet
+
+from astronomy_extract import POSITION_COLUMNS
+
+FILE_FORMATS = {"arrow": ".arrow", "parquet": ".parquet"}
+POSITION_SCHEMA = pa.schema([("region_id", pa.int16()),
+                             ("slot", pa.string()),
+                             ("timestamp", pa.string()),
+                             ("body_name", pa.string()),
+                             ("distance_km", pa.float64()),
+                             ("azimuth", pa.float64()),
+                             ("altitude", pa.float64()),
+                             ("constellation_name", pa.string())])
+MOON_PHASE_SCHEMA = pa.schema([("day", pa.string()), ("url", pa.string())])
+STAR_CHART_SCHEMA = pa.schema([("day", pa.string()), ("url", pa.string()),
+                               ("constellation", pa.string())])
+RECORD_SCHEMAS = {"moon_phase_urls": MOON_PHASE_SCHEMA,
+                  "star_chart_urls": STAR_CHART_SCHEMA}
+
+
+def positions_to_table(body_positions: dict) -> pa.Table:
+    """Returns the body positions of every region and time slot as one
+    table, with the region and slot as columns."""
+
+    slots = [(int(region), slot, columns)
+             for region, times in body_positions.items()
+             for slot, columns in times.items() if columns]
+
+    data = {name: [] for name in POSITION_SCHEMA.names}
+    for region, slot, columns in slots:
+        rows = len(columns["timestamp"])
+        data["region_id"].extend([region] * rows)
+        data["slot"].extend([slot] * rows)
+        for name in POSITION_COLUMNS:
+            data[name].extend(columns[name])
+
+    return pa.table(data, schema=POSITION_SCHEMA)
+
+
+def table_to_positions(table: pa.Table) -> dict:
+    """Returns a positions table in the region/slot dictionary shape
+    produced by the extract."""
+
+    body_positions = {}
+    frame = table.to_pandas()
+
+    for (region, slot), rows in frame.groupby(["region_id", "slot"], sort=False):
+        body_positions.setdefault(int(region), {})[slot] = {
+            name: rows[name].tolist() for name in POSITION_COLUMNS}
+
+    return body_positions
+
+
+def get_extract_path(directory: str, key: str, file_format: str) -> str:
+    """Returns the file holding one part of the extract."""
+
+    return os.path.join(directory, f"{key}{FILE_FORMATS[file_format]}")
+
+
+def find_extract_format(directory: str) -> str:
+    """Returns the format an extract was saved in."""
+
+    for file_format in FILE_FORMATS:
+        if os.path.exists(get_extract_path(directory, "body_positions", file_format)):
+            return file_format
+
+    raise FileNotFoundError(f"No columnar extract found in {directory}.")
+
+
+def write_table(path: str, table: pa.Table, file_format: str,
+                compression: str = None) -> None:
+    """Writes a table as an Arrow IPC file or a Parquet file."""
+
+    if file_format == "parquet":
+        parquet.write_table(table, path, compression=compression or "zstd")
+        return
+
+    options = ipc.IpcWriteOptions(compression=compression)
+    with ipc.new_file(path, table.schema, options=options) as writer:
+        writer.write_table(table)
+
+
+def read_table(path: str, columns: list[str] = None) -> pa.Table:
+    """Reads the given columns of a table. Arrow IPC files are memory
+    mapped, so uncompressed columns are used without a copy."""
+
+    if path.endswith(FILE_FORMATS["parquet"]):
+        return parquet.read_table(path, columns=columns, memory_map=True)
+
+    with pa.memory_map(path) as source:
+        table = ipc.open_file(source).read_all()
+
+    return table.select(columns) if columns else table
+
+
+def save_extract(directory: str, data: dict, file_format: str = "arrow",
+                 compression: str = None) -> None:
+    """Saves the extract payload as one columnar file per part. Arrow files
+    are uncompressed by default so they can be memory mapped without a
+    copy; Parquet files default to zstd."""
+
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown extract format: {file_format}")
+
+    os.makedirs(directory, exist_ok=True)
+
+    write_table(get_extract_path(directory, "body_positions", file_format),
+                positions_to_table(data["body_positions"]), file_format, compression)
+
+    for key, schema in RECORD_SCHEMAS.items():
+        write_table(get_extract_path(directory, key, file_format),
+                    pa.Table.from_pylist(data[key], schema=schema),
+                    file_format, compression)
+
+
+def read_records(directory: str, key: str) -> list[dict]:
+    """Returns the moon phase or star chart records of a saved extract."""
+
+    return read_table(get_extract_path(directory, key,
+                                       find_extract_format(directory))).to_pylist()
+
+
+def load_extract(directory: str) -> dict:
+    """Loads an extract saved by save_extract in the dictionary shape
+    produced by the extract."""
+
+    data = {"body_positions": table_to_positions(read_table(get_extract_path(
+        directory, "body_positions", find_extract_format(directory))))}
+
+    for key in RECORD_SCHEMAS:
+        data[key] = read_records(directory, key)
+
+    return data
+
+
+def read_positions_frame(directory: str) -> pd.DataFrame:
+    """Returns only the position columns the transform uses, in the
+    layout of astronomy_transform.get_data_into_dataframe."""
+
+    path = get_extract_path(directory, "body_positions", find_extract_format(directory))
+    frame = read_table(path, POSITION_COLUMNS + ["region_id"]).to_pandas()
+    frame["region_id"] = frame["region_id"].astype("category")
+
+    return frame
@@ -0,0 +1,57 @@
+"""Process level cache of the body, constellation and region tables.
+Each table is queried once per Lambda container and reused by warm
+invocations until it is explicitly invalidated."""
+
+import logging
+
+DIMENSION_QUERIES = {
+    "body": "SELECT body_id, body_name from body;",
+    "constellation": "SELECT constellation_id, constellation_short_name from constellation;",
+    "region": "SELECT * FROM region;"
+}
+
+
+class DimensionCache():
+    """Caches the rows of the dimension tables used across the pipeline."""
+
+    def __init__(self, connection_factory):
+        """Creates an empty cache loading tables through the given
+        connection factory."""
+        self.connection_factory = connection_factory
+        self._tables = {}
+
+    def get_table(self, table: str) -> list[dict]:
+        '''Returns the rows of a dimension table, querying it on first use.'''
+        if table not in self._tables:
+            with self.connection_factory() as conn:
+                cur = conn.cursor()
+
+                cur.execute(DIMENSION_QUERIES[table])
+
+                self._tables[table] = [dict(row) for row in cur.fetchall()]
+
+            logging.info("Cached %s rows of the %s table.",
+                         len(self._tables[table]), table)
+
+        return self._tables[table]
+
+    def invalidate(self, table: str = None) -> None:
+        '''Drops one cached table, or every table if none is given.'''
+        if table is None:
+            self._tables = {}
+        else:
+            self._tables.pop(table, None)
+
+    def get_regions(self) -> list[dict]:
+        '''Returns every region row.'''
+        return self.get_table("region")
+
+    def get_body_mapping(self) -> dict:
+        '''Returns body name to ID mapping.'''
+        return {body["body_name"].lower(): body["body_id"]
+                for body in self.get_table("body")}
+
+    def get_constellation_mapping(self) -> dict:
+        '''Returns constellation short name to ID mapping.'''
+        return {const["constellation_short_name"].lower(): const["constellation_id"]
+                for const in self.get_table("constellation")}
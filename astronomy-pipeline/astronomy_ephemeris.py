@@ -0,0 +1,251 @@
+"""Local ephemeris engine for body positions without the Astronomy API.
+Computes azimuth, altitude, distance and constellation for the Sun,
+Moon and planets over every region and timestamp in one vectorised
+NumPy pass. Planets use the JPL approximate Keplerian elements
+(valid 1800-2050) and the Moon the leading terms of Meeus' lunar
+theory, which is accurate to a fraction of a degree."""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+AU_KM = 149597870.7
+EARTH_RADIUS_KM = 6378.14
+OBLIQUITY = np.radians(23.43928)
+
+# a (au), e, I, L, long. perihelion, long. ascending node (deg)
+# followed by their rates per Julian century, J2000 ecliptic.
+PLANET_ELEMENTS = {
+    "mercury": ((0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593),
+                (0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081)),
+    "venus": ((0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255),
+              (0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418)),
+    "earth": ((1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0),
+              (0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0)),
+    "mars": ((1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891),
+             (0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343)),
+    "jupiter": ((5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909),
+                (-0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106)),
+    "saturn": ((9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448),
+               (-0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794)),
+    "uranus": ((19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503),
+               (-0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589)),
+    "neptune": ((30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574),
+                (0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.00508664)),
+    "pluto": ((39.48211675, 0.24882730, 17.14001206, 238.92903833, 224.06891629, 110.30393684),
+              (-0.00031596, 0.00005170, 0.00004818, 145.20780515, -0.04062942, -0.01183482))
+}
+
+BODIES = ["sun", "moon", "mercury", "venus", "mars", "jupiter",
+          "saturn", "uranus", "neptune", "pluto"]
+
+# Ecliptic longitudes (J2000) at which the ecliptic enters each
+# constellation along the IAU boundaries.
+ECLIPTIC_CONSTELLATIONS = ((29.1, "ari"), (53.5, "tau"), (90.4, "gem"),
+                           (118.3, "cnc"), (138.2, "leo"), (174.2, "vir"),
+                           (218.0, "lib"), (241.0, "sco"), (248.0, "oph"),
+                           (266.3, "sgr"), (299.7, "cap"), (327.9, "aqr"),
+                           (351.6, "psc"))
+
+
+def to_julian_date(timestamps: np.ndarray) -> np.ndarray:
+    """Returns Julian dates for an array of UTC datetime64 values."""
+
+    seconds = timestamps.astype("datetime64[s]").astype(np.float64)
+
+    return seconds / 86400.0 + 2440587.5
+
+
+def solve_kepler(mean_anomaly: np.ndarray, eccentricity: np.ndarray) -> np.ndarray:
+    """Returns the eccentric anomaly (radians) by Newton iteration."""
+
+    ecc_anomaly = mean_anomaly + eccentricity * np.sin(mean_anomaly)
+
+    for _ in range(8):
+        ecc_anomaly -= ((ecc_anomaly - eccentricity * np.sin(ecc_anomaly) - mean_anomaly)
+                        / (1 - eccentricity * np.cos(ecc_anomaly)))
+
+    return ecc_anomaly
+
+
+def get_heliocentric_ecliptic(body: str, centuries: np.ndarray) -> np.ndarray:
+    """Returns heliocentric J2000 ecliptic coordinates (au) of a
+    planet with shape (3, N)."""
+
+    elements, rates = PLANET_ELEMENTS[body]
+    a, e, incl, mean_long, peri_long, node = (
+        element + rate * centuries for element, rate in zip(elements, rates))
+
+    incl, node = np.radians(incl), np.radians(node)
+    arg_peri = np.radians(peri_long) - node
+    mean_anomaly = np.radians((mean_long - peri_long + 180) % 360 - 180)
+
+    ecc_anomaly = solve_kepler(mean_anomaly, e)
+    x_orb = a * (np.cos(ecc_anomaly) - e)
+    y_orb = a * np.sqrt(1 - e ** 2) * np.sin(ecc_anomaly)
+
+    cos_w, sin_w = np.cos(arg_peri), np.sin(arg_peri)
+    cos_n, sin_n = np.cos(node), np.sin(node)
+    cos_i, sin_i = np.cos(incl), np.sin(incl)
+
+    return np.stack([
+        (cos_w * cos_n - sin_w * sin_n * cos_i) * x_orb
+        + (-sin_w * cos_n - cos_w * sin_n * cos_i) * y_orb,
+        (cos_w * sin_n + sin_w * cos_n * cos_i) * x_orb
+        + (-sin_w * sin_n + cos_w * cos_n * cos_i) * y_orb,
+        sin_w * sin_i * x_orb + cos_w * sin_i * y_orb])
+
+
+def get_moon_ecliptic(julian_dates: np.ndarray) -> np.ndarray:
+    """Returns geocentric J2000 ecliptic coordinates (au) of the Moon
+    with shape (3, N)."""
+
+    days = julian_dates - 2451545.0
+    mean_long = 218.3165 + 13.17639648 * days
+    elong = np.radians(297.8502 + 12.19074912 * days)
+    sun_anom = np.radians(357.5291 + 0.98560028 * days)
+    moon_anom = np.radians(134.9634 + 13.06499295 * days)
+    lat_arg = np.radians(93.2721 + 13.22935024 * days)
+
+    longitude = (mean_long + 6.288774 * np.sin(moon_anom)
+                 + 1.274027 * np.sin(2 * elong - moon_anom)
+                 + 0.658314 * np.sin(2 * elong)
+                 + 0.213618 * np.sin(2 * moon_anom)
+                 - 0.185116 * np.sin(sun_anom)
+                 - 0.114332 * np.sin(2 * lat_arg)
+                 - 1.396971 * days / 36525)
+    latitude = (5.128122 * np.sin(lat_arg)
+                + 0.280602 * np.sin(moon_anom + lat_arg)
+                + 0.277693 * np.sin(moon_anom - lat_arg)
+                + 0.173237 * np.sin(2 * elong - lat_arg))
+    distance = (385000.56 - 20905.355 * np.cos(moon_anom)
+                - 3699.111 * np.cos(2 * elong - moon_anom)
+                - 2955.968 * np.cos(2 * elong)
+                - 569.925 * np.cos(2 * moon_anom)) / AU_KM
+
+    lon, lat = np.radians(longitude), np.radians(latitude)
+
+    return distance * np.stack([np.cos(lat) * np.cos(lon),
+                                np.cos(lat) * np.sin(lon),
+                                np.sin(lat)])
+
+
+def get_geocentric_ecliptic(julian_dates: np.ndarray) -> np.ndarray:
+    """Returns geocentric ecliptic coordinates (au) of every body
+    with shape (bodies, 3, N)."""
+
+    centuries = (julian_dates - 2451545.0) / 36525
+    earth = get_heliocentric_ecliptic("earth", centuries)
+
+    positions = []
+    for body in BODIES:
+        if body == "sun":
+            positions.append(-earth)
+        elif body == "moon":
+            positions.append(get_moon_ecliptic(julian_dates))
+        else:
+            positions.append(get_heliocentric_ecliptic(body, centuries) - earth)
+
+    return np.stack(positions)
+
+
+def get_constellations(ecliptic_longitude: np.ndarray) -> np.ndarray:
+    """Returns constellation ids for ecliptic longitudes (degrees).
+    Bodies far from the ecliptic are given the zodiacal constellation
+    they lie above or below."""
+
+    bounds = np.array([bound for bound, _ in ECLIPTIC_CONSTELLATIONS])
+    names = np.array(["psc"] + [name for _, name in ECLIPTIC_CONSTELLATIONS])
+
+    return names[np.searchsorted(bounds, ecliptic_longitude % 360, side="right")]
+
+
+def compute_body_positions(timestamps: np.ndarray, latitudes: np.ndarray,
+                           longitudes: np.ndarray) -> dict:
+    """Returns azimuth, altitude, distance and constellation of every
+    body for every timestamp and observer. Angular and distance arrays
+    have shape (bodies, timestamps, observers)."""
+
+    julian_dates = to_julian_date(timestamps)
+    ecliptic = get_geocentric_ecliptic(julian_dates)
+
+    x_ecl, y_ecl, z_ecl = ecliptic[:, 0], ecliptic[:, 1], ecliptic[:, 2]
+
+    # Precess from the J2000 ecliptic to the equinox of date
+    precession = np.radians(1.396971 * (julian_dates - 2451545.0) / 36525)
+    x_date = np.cos(precession) * x_ecl - np.sin(precession) * y_ecl
+    y_date = np.sin(precession) * x_ecl + np.cos(precession) * y_ecl
+
+    x_eq = x_date
+    y_eq = np.cos(OBLIQUITY) * y_date - np.sin(OBLIQUITY) * z_ecl
+    z_eq = np.sin(OBLIQUITY) * y_date + np.cos(OBLIQUITY) * z_ecl
+
+    distance_km = np.sqrt(x_eq ** 2 + y_eq ** 2 + z_eq ** 2) * AU_KM
+    right_ascension = np.arctan2(y_eq, x_eq)[..., None]
+    declination = np.arcsin(z_eq * AU_KM / distance_km)[..., None]
+
+    sidereal = np.radians(280.46061837 + 360.98564736629 * (julian_dates - 2451545.0))
+    hour_angle = (sidereal[None, :, None] + np.radians(longitudes)[None, None, :]
+                  - right_ascension)
+    lat = np.radians(latitudes)[None, None, :]
+
+    altitude = np.arcsin(np.sin(lat) * np.sin(declination)
+                         + np.cos(lat) * np.cos(declination) * np.cos(hour_angle))
+    azimuth = np.arctan2(-np.cos(declination) * np.sin(hour_angle),
+                         np.sin(declination) * np.cos(lat)
+                         - np.cos(declination) * np.cos(hour_angle) * np.sin(lat))
+
+    # Topocentric parallax only matters for the Moon
+    moon = BODIES.index("moon")
+    altitude[moon] -= np.arcsin(EARTH_RADIUS_KM / distance_km[moon][:, None]
+                                * np.cos(altitude[moon]))
+
+    shape = altitude.shape
+
+    return {
+        "azimuth": np.degrees(azimuth) % 360,
+        "altitude": np.degrees(altitude),
+        "distance_km": np.broadcast_to(distance_km[..., None], shape),
+        "constellation_name": np.broadcast_to(
+            get_constellations(np.degrees(np.arctan2(y_ecl, x_ecl)))[..., None], shape)
+    }
+
+
+def get_local_position_data(input_dict: dict, times: list[str],
+                            regions: list[dict], start_date: date,
+                            end_date: date) -> dict:
+    """Returns all positional data for astronomical bodies as dictionary,
+    computed locally as the same columns produced by the Astronomy API path."""
+
+    output_dict = input_dict.copy()
+
+    days = [start_date + timedelta(days=n)
+            for n in range((end_date - start_date).days + 1)]
+    timestamps = np.array([f"{day}T{time}" for time in times for day in days],
+                          dtype="datetime64[ms]")
+
+    positions = compute_body_positions(
+        timestamps,
+        np.array([region["latitude"] for region in regions], dtype=float),
+        np.array([region["longitude"] for region in regions], dtype=float))
+
+    stamps = np.char.add(np.datetime_as_string(timestamps, unit="ms"), "+00:00")
+    body_names = np.array(BODIES)
+
+    for r, region in enumerate(regions):
+        for t, time in enumerate(times):
+            slot = slice(t * len(days), (t + 1) * len(days))
+            body_idx, day_idx = np.nonzero(positions["altitude"][:, slot, r] > 5.0)
+            stamp_idx = day_idx + slot.start
+
+            output_dict[region["region_id"]][time[:2]] = {
+                "timestamp": stamps[stamp_idx].tolist(),
+                "body_name": body_names[body_idx].tolist(),
+                "distance_km": positions["distance_km"][body_idx, stamp_idx, r].tolist(),
+                "azimuth": positions["azimuth"][body_idx, stamp_idx, r].round(2).tolist(),
+                "altitude": positions["altitude"][body_idx, stamp_idx, r].round(2).tolist(),
+                "constellation_name":
+                    positions["constellation_name"][body_idx, stamp_idx, r].tolist()
+            }
+
+    return output_dict
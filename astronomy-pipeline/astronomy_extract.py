@@ -10,17 +10,27 @@ import json
 import logging
 import asyncio
 
-import aiohttp
-import requests
+import numpy as np
 from dotenv import load_dotenv
 from psycopg2 import connect, extensions, extras
-from requests import exceptions as ex
 
 from api_error import APIError
+from astronomy_cache import ResponseCache
+from astronomy_checkpoint import Checkpoint
+from astronomy_dimensions import DimensionCache
+from astronomy_client import AstronomyAPIClient
+from astronomy_scheduler import StarChartScheduler
+from astronomy_ephemeris import get_local_position_data
 
 load_dotenv()
 
 ASTRO_URL = "https://api.astronomyapi.com/api/v2"
+MAX_CONCURRENT_REQUESTS = 10
+POSITION_TIMES = ["18:00:00", "21:00:00", "00:00:00", "03:00:00", "06:00:00"]
+# Positions up to noon belong to the night that began the evening before
+NIGHT_OFFSET = timedelta(hours=12)
+POSITION_COLUMNS = ["timestamp", "body_name", "distance_km", "azimuth",
+                    "altitude", "constellation_name"]
 
 
 def get_db_connection() -> extensions.connection:
@@ -34,6 +44,10 @@ def get_db_connection() -> extensions.connection:
                    port=ENV["DB_PORT"])
 
 
+# Looked up on every load so the connection function can be swapped out
+DIMENSIONS = DimensionCache(lambda: get_db_connection())  # pylint: disable=W0108
+
+
 def get_auth_string() -> str:
     """Generates AstronomyAPI authorisation key from env values."""
 
@@ -47,70 +61,67 @@ def get_auth_string() -> str:
 def get_db_regions() -> list:
     """Returns the regions data from an RDS instance"""
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-
-        cur.execute("SELECT * FROM region;")
-
-        regions = cur.fetchall()
-
-    return regions
+    return DIMENSIONS.get_regions()
 
 
-def get_all_body_positions(start_date: date, end_date: date, lat: float,
-                           long: float, time: str, elev: int = 50) -> dict:
+async def get_all_body_positions(client: AstronomyAPIClient, start_date: date,
+                                 end_date: date, lat: float, long: float,
+                                 time: str, elev: int = 50) -> dict:
     """Returns the inclusive body positional information from
     the Astronomy API for a given date range."""
 
-    url = f"{ASTRO_URL}/bodies/positions?latitude={lat}&longitude={
-        long}&elevation={elev}&from_date={start_date}&to_date={end_date}&time={time}"
+    params = {"latitude": lat, "longitude": long, "elevation": elev,
+              "from_date": str(start_date), "to_date": str(end_date),
+              "time": time}
 
-    auth_string = get_auth_string()
+    return await client.get("/bodies/positions", params)
 
-    headers = {"Authorization": f"Basic {auth_string}"}
 
-    response = requests.get(url, headers=headers, timeout=10)
+async def fetch_body_positions(client: AstronomyAPIClient,
+                               semaphore: asyncio.Semaphore, start_date: date,
+                               end_date: date, lat: float, long: float,
+                               time: str) -> dict:
+    """Returns body positional information for one region and time,
+    or None if the request fails."""
 
-    if response.status_code == 200:
-        return response.json()
+    async with semaphore:
+        try:
+            return await get_all_body_positions(client, start_date, end_date,
+                                                lat, long, time)
 
-    logging.info('Body position get request unsuccessful.')
-    return APIError("Unsuccessful request.", response.status_code)
+        except APIError as err:
+            logging.info("Body position get request unsuccessful: %s", err.code)
+            return None
 
 
-def make_clean_body_dict(entry: dict) -> dict:
-    """Creates refined body data from astronomy API body data."""
+def refine_bodies_columns(bodies: dict) -> dict:
+    """Flattens the astronomy positions dict straight into columns of
+    the bodies above 5 degrees altitude, without building a dict per row."""
 
-    clean_dict = {}
-    clean_dict["timestamp"] = entry["date"]
-    clean_dict["body_name"] = entry["id"]
-    clean_dict["distance_km"] = entry["distance"]["fromEarth"]["km"]
-    clean_dict["azimuth"] = entry["position"]["horizontal"]["azimuth"]["degrees"]
-    clean_dict["altitude"] = entry["position"]["horizontal"]["altitude"]["degrees"]
-    clean_dict["constellation_name"] = entry["position"]["constellation"]["id"]
+    cells = [entry for obj in bodies["data"]["table"]["rows"]
+             for entry in obj["cells"]]
 
-    return clean_dict
+    horizontal = [entry["position"]["horizontal"] for entry in cells]
+    altitude = np.array([pos["altitude"]["degrees"] for pos in horizontal],
+                        dtype=float)
+    visible = altitude > 5.0
 
+    columns = {
+        "timestamp": np.array([entry["date"] for entry in cells], dtype=object),
+        "body_name": np.array([entry["id"] for entry in cells], dtype=object),
+        "distance_km": np.array([entry["distance"]["fromEarth"]["km"]
+                                 for entry in cells], dtype=float),
+        "azimuth": np.array([pos["azimuth"]["degrees"] for pos in horizontal],
+                            dtype=float),
+        "altitude": altitude,
+        "constellation_name": np.array([entry["position"]["constellation"]["id"]
+                                        for entry in cells], dtype=object)
+    }
 
-def refine_bodies_data(bodies: dict) -> list:
-    """Removes unnecessary data from the astronomy positions dict."""
-
-    rows = bodies["data"]["table"]["rows"]
-
-   # Each cell contains a list of dictionaries of an entry
-   # key and a single body over a set number of days (7)
-    output_list = []
-    for obj in rows:
-        for entry in obj["cells"]:
-            altitude = entry["position"]["horizontal"]["altitude"]["degrees"]
-            if float(altitude) > 5.0:
-                clean_dict = make_clean_body_dict(entry)
-                output_list.append(clean_dict)
-
-    return output_list
+    return {name: columns[name][visible].tolist() for name in POSITION_COLUMNS}
 
 
-def get_moon_phase(input_date: str) -> str:
+async def get_moon_phase(client: AstronomyAPIClient, input_date: str) -> str:
     """Returns a url for an image of the moon phase for a given date."""
 
     request_body = {
@@ -132,43 +143,27 @@ def get_moon_phase(input_date: str) -> str:
         }
     }
 
-    url = f"{ASTRO_URL}/studio/moon-phase"
-
-    auth_string = get_auth_string()
-
-    headers = {"Authorization": f"Basic {auth_string}"}
-
     try:
-        response = requests.post(url, headers=headers, json=request_body,
-                                 timeout=10)
+        data = await client.post("/studio/moon-phase", request_body,
+                                 cacheable=True)
+        return data["data"]["imageUrl"]
 
-        if response.status_code == 200:
-            return response.json()["data"]["imageUrl"]
-
-        logging.info('Moon phase post request unsuccessful.')
-        return APIError("Unsuccessful request.", response.status_code)
-
-    except ex.ReadTimeout:
-        logging.info("Star chart API request failed.")
+    except APIError as err:
+        logging.info("Moon phase post request unsuccessful: %s", err.code)
         return None
 
 
 def get_const_list():
+    """Returns the lower case short name of every constellation."""
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-
-        cur.execute("SELECT constellation_short_name from constellation;")
-
-        res = cur.fetchall()
-
-    constellations = [c["constellation_short_name"].lower() for c in res]
+    return list(DIMENSIONS.get_constellation_mapping())
 
-    return constellations
 
-
-async def get_star_chart(input_date: str, constellation: str) -> str:
-    """Returns a URL for an image of the star chart for a given date asynchronously."""
+async def request_star_chart(client: AstronomyAPIClient, input_date: str,
+                             constellation: str, retries: int = None) -> dict:
+    """Returns a URL for an image of the star chart for a given date,
+    raising an APIError if the request fails. `retries` overrides the
+    client's own retry count."""
 
     request_body = {
         "style": "default",
@@ -185,88 +180,255 @@ async def get_star_chart(input_date: str, constellation: str) -> str:
         }
     }
 
-    url = f"{ASTRO_URL}/studio/star-chart"
+    data = await client.post("/studio/star-chart", request_body,
+                             cacheable=True, retries=retries)
+    return {
+        "day": input_date,
+        "url": data["data"]["imageUrl"],
+        "constellation": constellation
+    }
 
-    auth_string = get_auth_string()
-    headers = {"Authorization": f"Basic {auth_string}"}
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=request_body, timeout=50) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    image_url = data["data"]["imageUrl"]
-                    return {
-                        "day": input_date,
-                        "url": image_url,
-                        "constellation": constellation
-                    }
-
-                return None
-
-    except asyncio.TimeoutError:
-        logging.info("Star chart API request failed due to timeout.")
-        return None
+def get_visible_constellations(position_data: dict) -> set[tuple[date, str]]:
+    """Returns the (day, constellation) pairs holding a body above the
+    horizon in the extracted body positions, where the day is the evening
+    the position's night began."""
 
+    return {((datetime.fromisoformat(timestamp) - NIGHT_OFFSET).date(), constellation)
+            for times in position_data.values()
+            for columns in times.values() if columns
+            for timestamp, constellation in zip(columns["timestamp"],
+                                                columns["constellation_name"])}
 
-async def get_star_chart_urls(start: date) -> list:
-    """Returns list of star chart URLs from the Astronomy API asynchronously."""
-    constellations = get_const_list()
 
-    tasks = []
+def get_pending_star_charts(start: date, constellations: list[str],
+                            checkpoint: Checkpoint = None,
+                            demand: set = None) -> tuple[dict, dict]:
+    """Returns the charts of the week saved in the checkpoint and the
+    constellations still to be requested, both keyed by day. Given a
+    demand set of (day, constellation) pairs, only those are requested."""
+
+    saved = {}
+    pending = {}
 
     for n in range(7):
-        for const in constellations:
-            day = start + timedelta(days=n)
-            task = get_star_chart(str(day), const)
-            tasks.append(task)
+        day = start + timedelta(days=n)
+        saved[day] = (checkpoint.load(f"star_charts_{day}") if checkpoint else None) or []
 
-    chart_list = await asyncio.gather(*tasks)
+        done = {chart["constellation"] for chart in saved[day]}
+        pending[day] = [const for const in constellations if const not in done
+                        and (demand is None or (day, const) in demand)]
 
-    output_list = [item for item in chart_list if item]
+    return saved, pending
 
-    return output_list
 
+def get_star_chart_mode() -> str:
+    """Returns whether to request star charts for every constellation
+    ("all") or only those hosting a visible body ("visible")."""
 
-def get_position_data(input_dict: dict, times: list[str], regions: list[dict],
-                      start_date: date, end_date: date) -> dict:
-    """Returns all positional data for astronomical bodies as dictionary."""
+    return ENV.get("STAR_CHART_MODE", "all").lower()
 
-    output_dict = input_dict.copy()
 
-    for region in regions:
+async def stream_star_chart_batches(client: AstronomyAPIClient, start: date,
+                                    checkpoint: Checkpoint = None,
+                                    visible: set = frozenset()):
+    """Yields each day's star charts as soon as the day's requests finish.
+    Requests go through a bounded scheduler, which asks for the visible
+    (day, constellation) pairs first, or only for them in visible mode,
+    and reports the charts it could not get."""
+
+    constellations = get_const_list()
+    demand = visible if get_star_chart_mode() == "visible" else None
+
+    saved, pending = get_pending_star_charts(start, constellations, checkpoint, demand)
+    logging.info("Requesting %s of %s star charts.",
+                 sum(len(consts) for consts in pending.values()),
+                 7 * len(constellations))
+
+    for charts in saved.values():
+        if charts:
+            yield charts
+
+    # The scheduler retries failed charts itself, within its deadline
+    scheduler = StarChartScheduler.from_env(
+        lambda day, const: request_star_chart(client, str(day), const, retries=0))
+
+    async for day, charts in scheduler.stream(pending, visible):
+        if charts:
+            if checkpoint:
+                checkpoint.save(f"star_charts_{day}", saved[day] + charts)
+
+            yield charts
+
+    if checkpoint:
+        for failure in scheduler.report.failed:
+            checkpoint.mark_failed(f"star_chart_{failure['day']}_{failure['constellation']}")
+
+
+async def get_star_chart_urls(client: AstronomyAPIClient, start: date,
+                              checkpoint: Checkpoint = None,
+                              visible: set = frozenset()) -> list:
+    """Returns list of star chart URLs from the Astronomy API asynchronously."""
+
+    return [chart async for batch in stream_star_chart_batches(client, start, checkpoint,
+                                                               visible)
+            for chart in batch]
+
+
+async def get_region_time_positions(client: AstronomyAPIClient,
+                                    semaphore: asyncio.Semaphore, region: dict,
+                                    time: str, start_date: date, end_date: date,
+                                    checkpoint: Checkpoint = None) -> list:
+    """Returns refined body positions for one region and time, loading
+    them from the checkpoint if they were fetched by an earlier run."""
+
+    name = f"positions_{region['region_id']}_{time[:2]}"
+
+    if checkpoint:
+        saved = checkpoint.load(name)
+        if saved is not None:
+            return saved
+
+    bodies_pos = await fetch_body_positions(client, semaphore, start_date, end_date,
+                                            region["latitude"], region["longitude"],
+                                            time)
+
+    if not bodies_pos:
+        logging.warning("No body positions for region %s at %s.",
+                        region["region_id"], time)
+        if checkpoint:
+            checkpoint.mark_failed(name)
+        return None
+
+    refined_pos = refine_bodies_columns(bodies_pos)
+
+    if checkpoint:
+        checkpoint.save(name, refined_pos)
+
+    return refined_pos
+
+
+async def get_position_data(client: AstronomyAPIClient, input_dict: dict,
+                            times: list[str], regions: list[dict],
+                            start_date: date, end_date: date,
+                            max_concurrent: int = MAX_CONCURRENT_REQUESTS,
+                            checkpoint: Checkpoint = None) -> dict:
+    """Returns all positional data for astronomical bodies as dictionary,
+    fetching every region and time concurrently through the shared client."""
+
+    output_dict = input_dict.copy()
 
-        region_id = region["region_id"]
-        lat = region["latitude"]
-        long = region["longitude"]
+    slots = [(region, time) for region in regions for time in times]
 
-        for time in times:
+    semaphore = asyncio.Semaphore(max_concurrent)
 
-            bodies_pos = get_all_body_positions(
-                start_date, end_date, lat, long, time)
+    tasks = [get_region_time_positions(client, semaphore, region, time,
+                                       start_date, end_date, checkpoint)
+             for region, time in slots]
 
-            refined_pos = refine_bodies_data(bodies_pos)
+    results = await asyncio.gather(*tasks)
 
-            output_dict[region_id][time[:2]] = refined_pos
+    for (region, time), refined_pos in zip(slots, results):
+        if refined_pos is not None:
+            output_dict[region["region_id"]][time[:2]] = refined_pos
 
     return output_dict
 
 
-def get_moon_urls(start: date) -> list[dict]:
-    """Returns list of moon phase URLs from the Astronomy API"""
-    output_list = []
+async def stream_position_batches(client: AstronomyAPIClient, times: list[str],
+                                  regions: list[dict], start_date: date,
+                                  end_date: date,
+                                  max_concurrent: int = MAX_CONCURRENT_REQUESTS,
+                                  checkpoint: Checkpoint = None):
+    """Yields the body positions of each region and time as a one slot
+    region/hour dictionary as soon as it is fetched. A fixed pool of
+    workers feeds a bounded queue, so at most a few slots are held in
+    memory however many regions and times there are."""
 
-    for n in range(7):
-        moon_day_dict = {}
-        day = start + timedelta(days=n)
-        phase_url = get_moon_phase(day)
+    semaphore = asyncio.Semaphore(max_concurrent)
+    queue = asyncio.Queue(maxsize=max_concurrent)
+    slots = iter([(region, time) for region in regions for time in times])
+
+    async def worker():
+        try:
+            for region, time in slots:
+                refined_pos = await get_region_time_positions(
+                    client, semaphore, region, time, start_date, end_date, checkpoint)
+                await queue.put((region, time, refined_pos))
+        except Exception as err:  # pylint: disable=W0718
+            await queue.put(err)
+            return
+
+        await queue.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max_concurrent)]
+
+    try:
+        finished = 0
+        while finished < len(workers):
+            item = await queue.get()
+
+            if item is None:
+                finished += 1
+                continue
+
+            if isinstance(item, Exception):
+                raise item
+
+            region, time, refined_pos = item
+            if refined_pos is not None:
+                yield {region["region_id"]: {time[:2]: refined_pos}}
+
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+def get_loaded_moon_phase_dates(start: date, end: date) -> set[date]:
+    """Returns the days between start and end that already have a moon
+    phase image in the database."""
+
+    query = """SELECT image_date FROM image
+               WHERE image_name = 'moon_phase' AND image_date BETWEEN %s AND %s;"""
 
-        moon_day_dict["day"] = str(day)
-        moon_day_dict["url"] = phase_url
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(query, (start, end))
+        days = {row["image_date"] for row in cur.fetchall()}
+
+    conn.close()
+
+    return days
+
+
+async def get_moon_urls(client: AstronomyAPIClient, start: date,
+                        checkpoint: Checkpoint = None,
+                        loaded: set = frozenset()) -> list[dict]:
+    """Returns list of moon phase URLs from the Astronomy API, requesting
+    every day of the week at once. Days in `loaded` already have an image
+    and are skipped, and days without a URL are left out."""
+
+    days = [start + timedelta(days=n) for n in range(7)]
+    days = [day for day in days if day not in loaded]
 
-        output_list.append(moon_day_dict)
+    phase_urls = {day: checkpoint.load(f"moon_phase_{day}") if checkpoint else None
+                  for day in days}
+    missing = [day for day in days if phase_urls[day] is None]
 
-    return output_list
+    fetched = await asyncio.gather(*[get_moon_phase(client, day) for day in missing])
+
+    for day, phase_url in zip(missing, fetched):
+        if phase_url:
+            phase_urls[day] = phase_url
+            if checkpoint:
+                checkpoint.save(f"moon_phase_{day}", phase_url)
+        else:
+            logging.warning("No moon phase image for %s.", day)
+            if checkpoint:
+                checkpoint.mark_failed(f"moon_phase_{day}")
+
+    return [{"day": str(day), "url": phase_urls[day]}
+            for day in days if phase_urls[day]]
 
 
 def fill_region_time_dict(times_list: list[str],
@@ -292,38 +454,131 @@ def save_to_file(filename: str, data: list[dict]) -> None:
         json.dump(data, f_obj, indent=4)
 
 
-async def extract_weekly_astronomy_data():
-    """Main function for extracting astronomical data for a week"""
+def get_position_times() -> list[str]:
+    """Returns the times of night to get body positions for. The local
+    engine can use any hourly resolution set in POSITION_TIMES."""
 
-    logging.info("Data extraction started.")
+    if ENV.get("POSITION_TIMES"):
+        return [time.strip() for time in ENV["POSITION_TIMES"].split(",")]
+
+    return POSITION_TIMES
+
+
+def get_week_start() -> date:
+    """Returns the first day of the week to extract."""
+
+    return date.today() + timedelta(days=7)
+
+
+async def extract_astronomy_week(client: AstronomyAPIClient, start_date: date,
+                                 regions: list[dict],
+                                 checkpoint: Checkpoint = None) -> dict:
+    """Extracts one week's astronomical data through the given client, so
+    several weeks can share its connections and rate limit."""
 
-    start_date = date.today() + timedelta(days=7)
     end_date = start_date + timedelta(days=6)
 
-    times = ["18:00:00", "21:00:00", "00:00:00", "03:00:00", "06:00:00"]
+    times = get_position_times()
+    use_local_positions = ENV.get("POSITION_SOURCE", "api").lower() == "local"
 
-    regions = get_db_regions()
     output_dict = fill_region_time_dict(times, regions)
 
-    position_data = get_position_data(
-        output_dict, times, regions, start_date, end_date)
-    logging.info("Body position data extracted and refined.")
+    if use_local_positions:
+        position_data = get_local_position_data(
+            output_dict, times, regions, start_date, end_date)
+        logging.info("Body position data computed locally.")
+    else:
+        position_data = await get_position_data(
+            client, output_dict, times, regions, start_date, end_date,
+            checkpoint=checkpoint)
+        logging.info("Body position data extracted and refined.")
 
     final_dict = {}
     final_dict["body_positions"] = position_data
-    final_dict["moon_phase_urls"] = get_moon_urls(start_date)
+    # The lookup blocks, so it runs in a thread to keep other weeks' requests going
+    loaded = await asyncio.to_thread(get_loaded_moon_phase_dates, start_date, end_date)
+    final_dict["moon_phase_urls"] = await get_moon_urls(client, start_date, checkpoint, loaded)
     logging.info("Moon phase data extracted.")
 
-    final_dict["star_chart_urls"] = await get_star_chart_urls(start_date)
+    final_dict["star_chart_urls"] = await get_star_chart_urls(
+        client, start_date, checkpoint, get_visible_constellations(position_data))
     logging.info("Star chart data extracted.")
 
     return final_dict
 
 
+async def extract_weekly_astronomy_data(start_date: date = None,
+                                        checkpoint: Checkpoint = None):
+    """Main function for extracting astronomical data for a week.
+    Work saved in the checkpoint by an earlier attempt is not repeated."""
+
+    logging.info("Data extraction started.")
+
+    start_date = start_date or get_week_start()
+    regions = get_db_regions()
+
+    async with AstronomyAPIClient(get_auth_string(), ASTRO_URL,
+                                  cache=ResponseCache.from_env()) as client:
+
+        final_dict = await extract_astronomy_week(client, start_date, regions, checkpoint)
+
+        logging.info("Astronomy API requests sent: %s", client.request_count)
+
+    return final_dict
+
+
+async def stream_weekly_astronomy_data(start_date: date = None,
+                                       checkpoint: Checkpoint = None):
+    """Yields the week's astronomical data as (key, batch) pairs, using the
+    keys of extract_weekly_astronomy_data, so each batch can be
+    transformed and loaded while the rest are still being fetched."""
+
+    logging.info("Streaming data extraction started.")
+
+    start_date = start_date or get_week_start()
+    end_date = start_date + timedelta(days=6)
+
+    times = get_position_times()
+    use_local_positions = ENV.get("POSITION_SOURCE", "api").lower() == "local"
+
+    regions = get_db_regions()
+
+    async with AstronomyAPIClient(get_auth_string(), ASTRO_URL,
+                                  cache=ResponseCache.from_env()) as client:
+
+        visible = set()
+
+        if use_local_positions:
+            for region in regions:
+                batch = get_local_position_data(
+                    fill_region_time_dict(times, [region]), times, [region],
+                    start_date, end_date)
+                visible |= get_visible_constellations(batch)
+                yield "body_positions", batch
+        else:
+            async for batch in stream_position_batches(client, times, regions,
+                                                       start_date, end_date,
+                                                       checkpoint=checkpoint):
+                visible |= get_visible_constellations(batch)
+                yield "body_positions", batch
+        logging.info("Body position data streamed.")
+
+        loaded = await asyncio.to_thread(get_loaded_moon_phase_dates, start_date, end_date)
+        yield "moon_phase_urls", await get_moon_urls(client, start_date, checkpoint, loaded)
+        logging.info("Moon phase data streamed.")
+
+        async for batch in stream_star_chart_batches(client, start_date, checkpoint,
+                                                     visible):
+            yield "star_chart_urls", batch
+        logging.info("Star chart data streamed.")
+
+        logging.info("Astronomy API requests sent: %s", client.request_count)
+
+
 if __name__ == "__main__":
 
     time1 = datetime.now()
 
-    res = asyncio.run(get_star_chart_urls(date.today()))
+    res = asyncio.run(extract_weekly_astronomy_data())
 
     print(f"Time: {(datetime.now() - time1).seconds}")
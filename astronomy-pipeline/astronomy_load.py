@@ -1,88 +1,159 @@
 """Load functions to upload nested list data to relevant tables."""
 
+import csv
+import io
 import logging
-
-from psycopg2.extras import execute_values
+import time
 
 from astronomy_extract import get_db_connection
 
+BODY_ASSIGNMENT_COLUMNS = ("at", "distance_km", "azimuth", "altitude",
+                           "region_id", "body_id", "constellation_id")
+IMAGE_COLUMNS = ("image_date", "image_url", "region_id",
+                 "constellation_id", "image_name")
+BODY_ASSIGNMENT_KEY = ("region_id", "body_id", "at")
+IMAGE_KEY = ("image_name", "image_date", "constellation_id", "region_id")
+LOAD_CHUNK_SIZE = 20000
 
-def upload_body_position_data(body_data: list[list]) -> None:
-    '''Uploads the body position data to the database.'''
-    # Positions list order [timestamp, distance_km, azimuth,
-    #                       altitude, region_id, body_id,
-    #                       constellation_id]
-
-    with get_db_connection() as conn:
-        logging.info("Connection established.")
-
-        cur = conn.cursor()
-
-        q_str = """
-                INSERT INTO body_assignment
-                (at, distance_km, azimuth, altitude, region_id, body_id, constellation_id)
-                VALUES
-                %s"""
-
-        execute_values(cur, q_str, body_data)
-        logging.info("Body position data uploaded.")
-
-
-def upload_moon_phase_data(moon_phase_data: list[list]) -> None:
-    '''Uploads the moon phase image data to the database.'''
-    for entry in moon_phase_data:
-        for _ in range(2):
-            entry.append(None)
-        entry.append("moon_phase")
-
-    # Moon phase list order: [date, url, none, none, image_name]
-
-    with get_db_connection() as conn:
-        logging.info("Connection established.")
-
-        cur = conn.cursor()
-
-        q_str = """
-                INSERT INTO image
-                (image_date, image_url, region_id, constellation_id, image_name)
-                VALUES
-                %s"""
-
-        execute_values(cur, q_str, moon_phase_data)
-        logging.info("Moon phase data uploaded.")
-
-
-def upload_star_chart_data(star_chart_data: list[list]) -> None:
-    '''Uploads the star chart image data to the database.'''
-
-    for entry in star_chart_data:
-        entry.append(None)
-        entry.append("star_chart")
 
-    with get_db_connection() as conn:
-        logging.info("Connection established.")
+def copy_rows(cur, table: str, columns: tuple, rows: list[list]) -> int:
+    '''Streams rows into a table with COPY through an in memory CSV
+    buffer, returning the number of rows copied. None becomes NULL.'''
 
-        cur = conn.cursor()
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
 
-        q_str = """
-                INSERT INTO image
-                (image_date, image_url, constellation_id, region_id, image_name)
-                VALUES
-                %s"""
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer)
 
-        execute_values(cur, q_str, star_chart_data)
-        logging.info("Star chart data uploaded.")
+    return len(rows)
 
 
-def upload_astronomy_data(data_dict: dict) -> None:
-    '''Uploads both the position and  moon phase data from the given dict.'''
+def merge_rows(cur, table: str, columns: tuple, key_columns: tuple,
+               rows: list[list]) -> int:
+    '''Copies rows into a temporary staging table and merges them into
+    the table on its natural key, only rewriting rows whose values have
+    changed. Returns the number of rows inserted or updated.'''
 
-    logging.info("Data upload to RDS started.")
+    staging = f"{table}_staging"
+    column_list = ", ".join(columns)
+    key_list = ", ".join(key_columns)
+    value_columns = [column for column in columns if column not in key_columns]
 
-    position_data = data_dict["positions_list"]
-    moon_data = data_dict["moon_phase_list"]
-    star_chart_data = data_dict["star_chart_list"]
+    cur.execute(f"""CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+                    SELECT {column_list} FROM {table} WITH NO DATA;""")
+    copy_rows(cur, staging, columns, rows)
 
-    upload_body_position_data(position_data)
-    upload_moon_phase_data(moon_data)
-    upload_star_chart_data(star_chart_data)
+    cur.execute(f"""
+                INSERT INTO {table} ({column_list})
+                SELECT DISTINCT ON ({key_list}) {column_list} FROM {staging}
+                ON CONFLICT ({key_list}) DO UPDATE SET
+                {", ".join(f"{column} = EXCLUDED.{column}" for column in value_columns)}
+                WHERE ({", ".join(f"{table}.{column}" for column in value_columns)})
+                IS DISTINCT FROM
+                ({", ".join(f"EXCLUDED.{column}" for column in value_columns)});""")
+
+    return cur.rowcount
+
+
+def write_astronomy_rows(cur, data_dict: dict, upsert: bool = False) -> int:
+    '''Writes the position, moon phase and star chart rows of a
+    transformed dict with the given cursor, returning the rows sent.'''
+
+    # Image rows in IMAGE_COLUMNS order
+    image_data = [[day, url, None, None, "moon_phase"]
+                  for day, url in data_dict["moon_phase_list"]]
+    image_data.extend([day, url, None, constellation_id, "star_chart"]
+                      for day, url, constellation_id in data_dict["star_chart_list"])
+
+    if upsert:
+        position_count = merge_rows(cur, "body_assignment", BODY_ASSIGNMENT_COLUMNS,
+                                    BODY_ASSIGNMENT_KEY, data_dict["positions_list"])
+        image_count = merge_rows(cur, "image", IMAGE_COLUMNS, IMAGE_KEY, image_data)
+    else:
+        position_count = copy_rows(cur, "body_assignment", BODY_ASSIGNMENT_COLUMNS,
+                                   data_dict["positions_list"])
+        image_count = copy_rows(cur, "image", IMAGE_COLUMNS, image_data)
+
+    logging.info("Body position rows written: %s", position_count)
+    logging.info("Moon phase and star chart rows written: %s", image_count)
+
+    return len(data_dict["positions_list"]) + len(image_data)
+
+
+def bulk_upload_astronomy_data(data_dict: dict, upsert: bool = False) -> None:
+    '''Copies the position, moon phase and star chart data over a single
+    connection and transaction, logging the rows per second achieved.
+    In upsert mode rows are merged on their natural keys, so reruns for
+    the same week leave the tables the same size.'''
+
+    logging.info("Bulk data upload to RDS started.")
+
+    start_time = time.perf_counter()
+
+    conn = get_db_connection()
+    with conn:
+        row_count = write_astronomy_rows(conn.cursor(), data_dict, upsert)
+
+    conn.close()
+
+    elapsed = time.perf_counter() - start_time
+    logging.info("Loaded %s rows in %.2f seconds (%.0f rows/s).",
+                 row_count, elapsed, row_count / elapsed if elapsed else 0)
+
+
+class ChunkedLoader():
+    """Buffers streamed rows and writes them in bounded chunks over one
+    connection, committing each chunk."""
+
+    def __init__(self, conn, upsert: bool = False,
+                 chunk_size: int = LOAD_CHUNK_SIZE):
+        """Creates a loader writing through the given connection."""
+        self.conn = conn
+        self.upsert = upsert
+        self.chunk_size = chunk_size
+        self.buffers = self.get_empty_buffers()
+        self.row_count = 0
+        self.start_time = time.perf_counter()
+
+    @staticmethod
+    def get_empty_buffers() -> dict:
+        '''Returns empty row lists keyed as in transform_astronomy_data.'''
+        return {"positions_list": [], "moon_phase_list": [], "star_chart_list": []}
+
+    def add(self, key: str, rows: list[list]) -> dict:
+        '''Buffers rows, returning the buffered chunk once it reaches the
+        chunk size, otherwise None.'''
+        self.buffers[key].extend(rows)
+
+        if sum(len(rows) for rows in self.buffers.values()) >= self.chunk_size:
+            return self.take()
+
+        return None
+
+    def take(self) -> dict:
+        '''Returns the buffered rows and starts a new chunk.'''
+        chunk, self.buffers = self.buffers, self.get_empty_buffers()
+        return chunk
+
+    def write(self, chunk: dict) -> None:
+        '''Writes and commits a chunk of rows.'''
+        with self.conn:
+            self.row_count += write_astronomy_rows(self.conn.cursor(), chunk,
+                                                   self.upsert)
+
+    def close(self, flush: bool = True) -> None:
+        '''Writes any remaining rows unless `flush` is False, closes the
+        connection and logs the rows per second achieved.'''
+        try:
+            if flush:
+                self.write(self.take())
+        finally:
+            self.conn.close()
+
+        elapsed = time.perf_counter() - self.start_time
+        logging.info("Streamed %s rows in %.2f seconds (%.0f rows/s).",
+                     self.row_count, elapsed,
+                     self.row_count / elapsed if elapsed else 0)
@@ -2,16 +2,82 @@
 
 # pylint: disable=W0613
 
+from os import environ as ENV
+from datetime import date
 import time
 import logging
 import asyncio
 
-from astronomy_extract import extract_weekly_astronomy_data
-from astronomy_transform import transform_astronomy_data
-from astronomy_load import upload_astronomy_data
+from astronomy_extract import (extract_weekly_astronomy_data, stream_weekly_astronomy_data,
+                               get_week_start, get_db_connection, DIMENSIONS)
+from astronomy_checkpoint import Checkpoint, get_checkpoint_store
+from astronomy_transform import (transform_astronomy_data, transform_astronomy_batch,
+                                  transform_astronomy_files)
+from astronomy_load import bulk_upload_astronomy_data, ChunkedLoader
+from astronomy_backfill import run_backfill
+from instrumentation import track_stage
 
 
-def lambda_handler(event=None, context=None) -> None:
+async def stream_astronomy_pipeline(start_date, checkpoint: Checkpoint,
+                                    upsert: bool) -> int:
+    '''Transforms each extracted batch as it arrives and loads the rows
+    in bounded chunks, writing a chunk in a thread while the next
+    batches are fetched. Returns the number of rows loaded. If the stream
+    fails, the chunk being written is left to finish and the connection
+    is closed without writing the rest.'''
+
+    loader = ChunkedLoader(get_db_connection(), upsert)
+    pending_write = None
+    finished = False
+
+    try:
+        async for key, batch in stream_weekly_astronomy_data(start_date, checkpoint):
+            chunk = loader.add(*transform_astronomy_batch(key, batch))
+
+            if chunk:
+                if pending_write:
+                    await pending_write
+                pending_write = asyncio.create_task(asyncio.to_thread(loader.write, chunk))
+
+        if pending_write:
+            await pending_write
+        finished = True
+
+    finally:
+        if pending_write and not finished:
+            # The write thread cannot be interrupted, so let it commit or
+            # roll back before the connection is closed
+            await asyncio.gather(pending_write, return_exceptions=True)
+
+        loader.close(flush=finished)
+
+    return loader.row_count
+
+
+def save_astronomy_extract(directory: str, extract_data: dict) -> None:
+    '''Saves the extract payload in the columnar format set by
+    EXTRACT_FORMAT, for debugging and for the transform to read back.'''
+
+    # Imported here so pyarrow is only loaded when the format is used
+    from astronomy_columnar import save_extract  # pylint: disable=C0415
+
+    save_extract(directory, extract_data, ENV.get("EXTRACT_FORMAT", "arrow"),
+                 ENV.get("EXTRACT_COMPRESSION"))
+    logging.info("Astronomy extract saved to %s.", directory)
+
+
+def count_extracted_rows(extract_data: dict) -> int:
+    '''Returns the number of positions, moon phases and star charts extracted.'''
+
+    positions = sum(len(columns["timestamp"])
+                    for times in extract_data["body_positions"].values()
+                    for columns in times.values() if columns)
+
+    return (positions + len(extract_data["moon_phase_urls"])
+            + len(extract_data["star_chart_urls"]))
+
+
+def lambda_handler(event=None, context=None) -> dict | None:
     '''Runs the notification pipeline'''
 
     logger = logging.getLogger(__name__)
@@ -20,19 +86,60 @@ def lambda_handler(event=None, context=None) -> None:
 
     start_time = time.time()
 
-    extract_data = asyncio.run(extract_weekly_astronomy_data())
-    logging.info("Astronomy API data extraction complete.")
+    if event and event.get("refresh_dimensions"):
+        DIMENSIONS.invalidate()
+        logging.info("Dimension cache cleared.")
+
+    if event and event.get("backfill"):
+        summary = asyncio.run(run_backfill(
+            date.fromisoformat(event["backfill"]["start_date"]),
+            date.fromisoformat(event["backfill"]["end_date"]),
+            event["backfill"].get("concurrency")))
+        logging.info("Astronomy backfill finished in %s seconds.",
+                     round((time.time() - start_time), 2))
+        return summary
+
+    start_date = get_week_start()
+    checkpoint = Checkpoint(get_checkpoint_store(), str(start_date))
+
+    upsert = ENV.get("LOAD_MODE", "upsert") == "upsert"
+
+    if ENV.get("PIPELINE_MODE", "batch") == "stream":
+        with track_stage("astronomy", "stream") as stage:
+            stage.add_rows(asyncio.run(
+                stream_astronomy_pipeline(start_date, checkpoint, upsert)))
+        logging.info("Astronomy data streamed to the database.")
+
+    else:
+        with track_stage("astronomy", "extract") as stage:
+            extract_data = asyncio.run(
+                extract_weekly_astronomy_data(start_date, checkpoint))
+            stage.add_rows(count_extracted_rows(extract_data))
+        logging.info("Astronomy API data extraction complete.")
+
+        # transform_astronomy_data returns dictionary as follows:
+        # {
+        #   "positions_list": body_position_list,
+        #   "moon_phase_list": moon_phase_list,
+        #   "star_chart_list": star_chart_list
+        # }
+        extract_dir = ENV.get("EXTRACT_DIR")
+        if extract_dir:
+            save_astronomy_extract(extract_dir, extract_data)
+
+        with track_stage("astronomy", "transform") as stage:
+            transformed_data = (transform_astronomy_files(extract_dir) if extract_dir
+                                else transform_astronomy_data(extract_data))
+            stage.add_rows(sum(len(rows) for rows in transformed_data.values()))
+        logging.info("Astronomy data transformation complete.")
 
-    # transform_astronomy_data returns dictionary as follows:
-    # {
-    #   "positions_list": body_position_list,
-    #   "moon_phase_list": moon_phase_list
-    # }
-    transformed_data = transform_astronomy_data(extract_data)
-    logging.info("Astronomy data transformation complete.")
+        with track_stage("astronomy", "load") as stage:
+            bulk_upload_astronomy_data(transformed_data, upsert=upsert)
+            stage.add_rows(sum(len(rows) for rows in transformed_data.values()))
+        logging.info("Astronomy data upload complete.")
 
-    upload_astronomy_data(transformed_data)
-    logging.info("Astronomy data upload complete.")
+    if checkpoint.finish():
+        logging.info("Astronomy checkpoints cleared.")
     logging.info("Astronomy execution time: %s seconds" %
                  round((time.time() - start_time), 2))
 
@@ -0,0 +1,163 @@
+"""Bounded concurrency scheduler for the star chart requests.
+A fixed pool of workers takes (day, constellation) jobs from a priority
+queue, retries failures behind the rest of the queue and stops starting
+requests at a deadline, so the run ends inside the Lambda time limit
+and reports every chart it could not get."""
+
+from os import environ as ENV
+from datetime import date
+from typing import Awaitable, Callable
+import asyncio
+import itertools
+import logging
+import random
+import time
+
+from api_error import APIError
+
+STAR_CHART_CONCURRENCY = 8
+STAR_CHART_ATTEMPTS = 3
+STAR_CHART_TIME_BUDGET = 300
+
+
+class StarChartReport():
+    """Outcome of a scheduler run."""
+
+    def __init__(self):
+        """Creates an empty report."""
+        self.requested = 0
+        self.completed = 0
+        self.retries = 0
+        self.failed = []
+
+    def add_failure(self, day: date, constellation: str, reason: str) -> None:
+        '''Records a chart that could not be fetched.'''
+        self.failed.append({"day": str(day), "constellation": constellation,
+                            "reason": reason})
+
+    def log(self) -> None:
+        '''Logs the coverage achieved and each chart that failed.'''
+        logging.info("Star charts fetched: %s of %s with %s retries.",
+                     self.completed, self.requested, self.retries)
+
+        for failure in self.failed:
+            logging.warning("Star chart for %s on %s failed: %s.",
+                            failure["constellation"], failure["day"], failure["reason"])
+
+
+class StarChartScheduler():
+    """Fetches star charts through a fixed number of concurrent workers."""
+
+    def __init__(self, fetch: Callable[[date, str], Awaitable[dict]],
+                 concurrency: int = STAR_CHART_CONCURRENCY,
+                 max_attempts: int = STAR_CHART_ATTEMPTS,
+                 time_budget: float = STAR_CHART_TIME_BUDGET):
+        """Creates a scheduler for `fetch(day, constellation)`, which returns
+        a chart or raises an APIError. No request is started or left
+        running after `time_budget` seconds from the start of a run."""
+        self.fetch = fetch
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.time_budget = time_budget
+        self.report = StarChartReport()
+
+    @classmethod
+    def from_env(cls, fetch: Callable[[date, str], Awaitable[dict]]):
+        '''Returns a scheduler configured from the environment.'''
+        return cls(fetch,
+                   int(ENV.get("STAR_CHART_CONCURRENCY", STAR_CHART_CONCURRENCY)),
+                   int(ENV.get("STAR_CHART_ATTEMPTS", STAR_CHART_ATTEMPTS)),
+                   float(ENV.get("STAR_CHART_TIME_BUDGET", STAR_CHART_TIME_BUDGET)))
+
+    @staticmethod
+    def get_backoff(attempt: int) -> float:
+        '''Returns the seconds before a failed job is queued again.'''
+        return random.uniform(0, min(10, 2 ** attempt))
+
+    async def stream(self, jobs: dict[date, list[str]], priority: set = frozenset()):
+        """Yields (day, charts) as soon as every job of a day has finished or
+        failed. Days run in order, and within a day the constellations in
+        `priority` (pairs of day and constellation) are requested first."""
+
+        self.report = StarChartReport()
+        self.report.requested = sum(len(constellations) for constellations in jobs.values())
+        deadline = time.monotonic() + self.time_budget
+
+        queue = asyncio.PriorityQueue()
+        settled = asyncio.Queue()
+        remaining = {day: len(constellations) for day, constellations in jobs.items()}
+        charts = {day: [] for day in jobs}
+        order = itertools.count()
+
+        for day_rank, day in enumerate(sorted(jobs)):
+            for constellation in jobs[day]:
+                rank = (day_rank, (day, constellation) not in priority)
+                queue.put_nowait((0, rank, next(order), day, constellation))
+
+        def settle(day: date) -> None:
+            remaining[day] -= 1
+            if not remaining[day]:
+                settled.put_nowait((day, charts[day]))
+
+        async def worker():
+            loop = asyncio.get_running_loop()
+
+            while True:
+                attempt, rank, _, day, constellation = await queue.get()
+                time_left = deadline - time.monotonic()
+
+                if time_left <= 0:
+                    self.report.add_failure(day, constellation, "past the deadline")
+                    settle(day)
+                    continue
+
+                try:
+                    charts[day].append(await asyncio.wait_for(
+                        self.fetch(day, constellation), time_left))
+                    self.report.completed += 1
+                    settle(day)
+                    continue
+
+                except APIError as err:
+                    reason = f"HTTP {err.code}"
+                except asyncio.TimeoutError:
+                    reason = "timed out at the deadline"
+                except Exception as err:  # pylint: disable=W0718
+                    settled.put_nowait(err)
+                    return
+
+                if attempt + 1 < self.max_attempts and time.monotonic() < deadline:
+                    self.report.retries += 1
+                    # Retries go behind every first attempt, after a backoff
+                    delay = min(self.get_backoff(attempt), deadline - time.monotonic())
+                    loop.call_later(delay, queue.put_nowait,
+                                    (attempt + 1, rank, next(order), day, constellation))
+                else:
+                    self.report.add_failure(day, constellation, reason)
+                    settle(day)
+
+        for day in [day for day, count in remaining.items() if not count]:
+            settled.put_nowait((day, []))
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+
+        try:
+            for _ in range(len(jobs)):
+                item = await settled.get()
+
+                if isinstance(item, Exception):
+                    raise item
+
+                yield item
+
+        finally:
+            for task in workers:
+                task.cancel()
+
+            self.report.log()
+
+    async def run(self, jobs: dict[date, list[str]], priority: set = frozenset()) -> list:
+        """Returns every chart fetched for the jobs."""
+
+        return [chart async for _, day_charts in self.stream(jobs, priority)
+                for chart in day_charts]
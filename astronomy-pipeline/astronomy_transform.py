@@ -2,12 +2,16 @@
 for upload to the RDS database."""
 
 import json
-from datetime import datetime
 import logging
 
+import numpy as np
 import pandas as pd
 
-from astronomy_extract import get_db_connection
+from astronomy_extract import DIMENSIONS, POSITION_COLUMNS
+
+NUMERIC_COLUMNS = ("distance_km", "azimuth", "altitude")
+POSITION_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+DATE_FORMAT = "%Y-%m-%d"
 
 
 def load_from_file(filename: str) -> dict:
@@ -18,63 +22,43 @@ def load_from_file(filename: str) -> dict:
 
 
 def get_data_into_dataframe(raw_data: dict) -> pd.DataFrame:
-    """Converts a list of body position dictionaries into a dataframe."""
-
-    regions = list(raw_data["body_positions"].keys())
-    times = list(raw_data["body_positions"][1].keys())
-
-    df_list = []
-    for r in regions:
-        for t in times:
-            time_list = raw_data["body_positions"][r][t]
-            df = pd.DataFrame(time_list)
-            df["region_id"] = int(r)
-            df_list.append(df)
+    """Converts the body position columns of every region and time into
+    one dataframe, filling preallocated columns instead of concatenating
+    a frame per slot."""
 
-    return pd.concat(df_list, ignore_index=True)
+    slots = [(int(region), columns)
+             for region, times in raw_data["body_positions"].items()
+             for columns in times.values() if columns]
 
+    total = sum(len(columns["timestamp"]) for _, columns in slots)
+    data = {name: np.empty(total, dtype=float if name in NUMERIC_COLUMNS else object)
+            for name in POSITION_COLUMNS}
+    region_ids = np.empty(total, dtype=int)
 
-def get_body_mapping() -> dict:
-    """Returns body name to ID mapping from the RDS database."""
-
-    with get_db_connection() as conn:
+    start = 0
+    for region, columns in slots:
+        end = start + len(columns["timestamp"])
+        for name in POSITION_COLUMNS:
+            data[name][start:end] = columns[name]
+        region_ids[start:end] = region
+        start = end
 
-        cur = conn.cursor()
+    data["region_id"] = pd.Categorical(region_ids)
 
-        cur.execute("SELECT body_id, body_name from body;")
+    return pd.DataFrame(data)
 
-        results = cur.fetchall()
 
-    b_mapping = {}
-
-    for body in results:
-        body_name = body["body_name"].lower()
-        body_id = body["body_id"]
-        b_mapping[body_name] = body_id
+def get_body_mapping() -> dict:
+    """Returns body name to ID mapping from the cached body table."""
 
-    return b_mapping
+    return DIMENSIONS.get_body_mapping()
 
 
 def get_constellation_mapping() -> dict:
-    """Returns constellation name to ID mapping from the RDS database."""
-
-    with get_db_connection() as conn:
-
-        cur = conn.cursor()
+    """Returns constellation name to ID mapping from the cached
+    constellation table."""
 
-        cur.execute(
-            "SELECT constellation_id, constellation_short_name from constellation;")
-
-        results = cur.fetchall()
-
-    c_mapping = {}
-
-    for body in results:
-        const_name = body["constellation_short_name"].lower()
-        const_id = body["constellation_id"]
-        c_mapping[const_name] = const_id
-
-    return c_mapping
+    return DIMENSIONS.get_constellation_mapping()
 
 
 def clean_position_data(df: pd.DataFrame) -> list:
@@ -112,12 +96,22 @@ def get_moon_list(phase_data: list["dict"]) -> list:
     return df.values.tolist()
 
 
+def parse_datetime_column(values: list[str], time_format: str,
+                          utc: bool = False) -> np.ndarray:
+    """Parses a whole column of time strings in one vectorised call.
+    Rows with differing UTC offsets need utc=True."""
+
+    return pd.to_datetime(values, format=time_format, utc=utc).to_pydatetime()
+
+
 def convert_positions_datetime(position_list: list) -> list:
     """Converts body position time string to a datetime object."""
 
-    for entry in position_list:
+    times = parse_datetime_column([entry[0] for entry in position_list],
+                                  POSITION_TIME_FORMAT, utc=True)
 
-        entry[0] = datetime.strptime(entry[0], "%Y-%m-%dT%H:%M:%S.%f%z")
+    for entry, time in zip(position_list, times):
+        entry[0] = time
 
     return position_list
 
@@ -125,9 +119,10 @@ def convert_positions_datetime(position_list: list) -> list:
 def convert_moon_datetime(moon_list: list) -> list:
     """Converts moon phase time string to a datetime object."""
 
-    for entry in moon_list:
+    days = parse_datetime_column([entry[0] for entry in moon_list], DATE_FORMAT)
 
-        entry[0] = datetime.strptime(entry[0], "%Y-%m-%d")
+    for entry, day in zip(moon_list, days):
+        entry[0] = day
 
     return moon_list
 
@@ -143,16 +138,11 @@ def convert_star_chart_data(chart_list: list) -> list:
 
     c_mapping = get_constellation_mapping()
 
-    output_list = []
-    for entry in chart_list:
-
-        entry['day'] = datetime.strptime(entry['day'], "%Y-%m-%d")
-        entry['constellation_id'] = c_mapping[entry["constellation"]]
+    days = parse_datetime_column([entry["day"] for entry in chart_list], DATE_FORMAT)
+    urls = [entry["url"] for entry in chart_list]
+    constellation_ids = [c_mapping[entry["constellation"]] for entry in chart_list]
 
-        output_list.append(
-            [entry["day"], entry["url"], entry["constellation_id"]])
-
-    return output_list
+    return [list(row) for row in zip(days, urls, constellation_ids)]
 
 
 def transform_astronomy_data(raw_data: dict) -> list:
@@ -179,3 +169,42 @@ def transform_astronomy_data(raw_data: dict) -> list:
         "moon_phase_list": moon_phase_list,
         "star_chart_list": star_chart_list
     }
+
+
+def transform_astronomy_files(directory: str) -> dict:
+    """Transforms an extract saved in the columnar format, reading only
+    the position columns the transform needs straight into a dataframe."""
+
+    # Imported here so pyarrow is only loaded when the format is used
+    from astronomy_columnar import read_positions_frame, read_records  # pylint: disable=C0415
+
+    logging.info("Columnar data cleaning started.")
+
+    position_list = clean_position_data(read_positions_frame(directory))
+    position_list = convert_positions_datetime(position_list)
+
+    return {
+        "positions_list": position_list,
+        "moon_phase_list": convert_moon_datetime(
+            get_moon_list(read_records(directory, "moon_phase_urls"))),
+        "star_chart_list": convert_star_chart_data(
+            read_records(directory, "star_chart_urls"))
+    }
+
+
+def transform_astronomy_batch(key: str, batch) -> tuple[str, list]:
+    """Transforms one streamed batch, returning the key of its rows in
+    the output of transform_astronomy_data along with the rows."""
+
+    if key == "body_positions":
+        position_list = clean_position_data(
+            get_data_into_dataframe({"body_positions": batch}))
+        return "positions_list", convert_positions_datetime(position_list)
+
+    if key == "moon_phase_urls":
+        return "moon_phase_list", convert_moon_datetime(get_moon_list(batch))
+
+    if key == "star_chart_urls":
+        return "star_chart_list", convert_star_chart_data(batch)
+
+    raise ValueError(f"Unknown astronomy batch: {key}")
@@ -4,6 +4,17 @@
 import pytest
 import pandas as pd
 
+from astronomy_extract import DIMENSIONS
+
+
+@pytest.fixture(autouse=True)
+def empty_dimension_cache():
+    """Stops cached dimension tables leaking between tests."""
+
+    DIMENSIONS.invalidate()
+    yield
+    DIMENSIONS.invalidate()
+
 
 @pytest.fixture
 def sample_raw_body_data():
@@ -95,63 +106,6 @@ def sample_moon_urls():
     return data
 
 
-@pytest.fixture
-def sample_raw_positions():
-    """Fake sample of raw body position data."""
-
-    return {
-        "data": {
-            "table": {
-                "rows": [
-                    {"cells": [
-                        {"position": {
-                            "horizontal": {
-                                "altitude": {
-                                    "degrees": "23.5"
-                                }
-                            }
-                        }}
-                    ]}
-                ]
-            }
-        }
-    }
-
-
-@pytest.fixture
-def upload_body_data_query():
-    '''Body data sql query for testing.'''
-    q_str = """
-                INSERT INTO body_assignment
-                (at, distance_km, azimuth, altitude, region_id, body_id, constellation_id)
-                VALUES
-                %s"""
-
-    return q_str
-
-
-@pytest.fixture
-def upload_moon_data_query():
-    '''Moon phase data sql query for testing.'''
-    q_str = """
-                INSERT INTO image
-                (image_date, image_url, region_id, constellation_id, image_name)
-                VALUES
-                %s"""
-
-    return q_str
-
-
-@pytest.fixture
-def astronomy_data_dict():
-    '''Test dictionary for testing the upload astronomy data.'''
-    astronomy_data = {'positions_list': [
-        'positions'], 'moon_phase_list': ['moon'],
-        'star_chart_list': ['24-03-03']}
-
-    return astronomy_data
-
-
 @pytest.fixture
 def position_dataframe_example():
     '''Test dataframe for testing the cleaning of position data.'''
@@ -0,0 +1,132 @@
+"""Tests for the astronomy backfill."""
+
+from datetime import date
+from unittest import mock
+import asyncio
+
+import pytest
+
+from astronomy_backfill import (get_week_windows, BackfillProgress, backfill_week,
+                                run_backfill, load_week)
+
+
+class TestGetWeekWindows():
+    """Tests for the get_week_windows function."""
+
+    def test_get_week_windows_covers_range(self):
+        """Tests that the weeks start every 7 days and cover the end date."""
+
+        weeks = get_week_windows(date(2024, 9, 1), date(2024, 9, 15))
+
+        assert weeks == [date(2024, 9, 1), date(2024, 9, 8), date(2024, 9, 15)]
+
+    def test_get_week_windows_single_day(self):
+        """Tests that a one day range is backfilled as one week."""
+
+        assert get_week_windows(date(2024, 9, 1), date(2024, 9, 1)) == [date(2024, 9, 1)]
+
+    def test_get_week_windows_rejects_reversed_range(self):
+        """Tests that an end before the start raises."""
+
+        with pytest.raises(ValueError):
+            get_week_windows(date(2024, 9, 8), date(2024, 9, 1))
+
+
+class TestBackfillProgress():
+    """Tests for the BackfillProgress class."""
+
+    def test_progress_summary(self, caplog):
+        """Tests that loaded and failed weeks are counted and logged."""
+
+        progress = BackfillProgress([date(2024, 9, 1), date(2024, 9, 8)])
+
+        with caplog.at_level("INFO"):
+            progress.week_loaded(date(2024, 9, 8), 10)
+            progress.week_failed(date(2024, 9, 1), KeyError("data"))
+
+        assert progress.to_dict() == {
+            "weeks": 2, "loaded": ["2024-09-08"], "rows": 10,
+            "failed": [{"week": "2024-09-01", "error": "KeyError('data')"}]}
+        assert "1 of 2 weeks done" in caplog.text
+        assert "2 of 2 weeks done" in caplog.text
+
+
+class TestBackfillWeek():
+    """Tests for backfilling weeks."""
+
+    @mock.patch("astronomy_backfill.bulk_upload_astronomy_data")
+    @mock.patch("astronomy_backfill.transform_astronomy_data")
+    def test_load_week_upserts(self, fake_transform, fake_upload):
+        """Tests that a week is always loaded in upsert mode."""
+
+        fake_transform.return_value = {"positions_list": [[1], [2]], "moon_phase_list": [[3]]}
+
+        assert load_week({}) == 3
+        fake_upload.assert_called_once_with(fake_transform.return_value, upsert=True)
+
+    @mock.patch("astronomy_backfill.get_checkpoint_store")
+    @mock.patch("astronomy_backfill.load_week", return_value=5)
+    @mock.patch("astronomy_backfill.extract_astronomy_week")
+    @pytest.mark.asyncio
+    async def test_backfill_week_clears_checkpoint(self, fake_extract, fake_load,
+                                                   fake_store):
+        """Tests that a loaded week clears its checkpoints and is recorded."""
+
+        fake_store.return_value.list.return_value = set()
+        progress = BackfillProgress([date(2024, 9, 1)])
+
+        await backfill_week(mock.AsyncMock(), date(2024, 9, 1), [], asyncio.Semaphore(1),
+                            progress)
+
+        fake_store.return_value.delete.assert_called_once_with("2024-09-01")
+        assert progress.loaded == ["2024-09-01"]
+        assert progress.rows == 5
+
+    @mock.patch("astronomy_backfill.get_checkpoint_store")
+    @mock.patch("astronomy_backfill.load_week", side_effect=ConnectionError("db"))
+    @mock.patch("astronomy_backfill.extract_astronomy_week")
+    @pytest.mark.asyncio
+    async def test_backfill_week_keeps_checkpoint_on_failure(self, fake_extract, fake_load,
+                                                             fake_store):
+        """Tests that a failed week keeps its checkpoints so it can resume."""
+
+        fake_store.return_value.list.return_value = set()
+        progress = BackfillProgress([date(2024, 9, 1)])
+
+        await backfill_week(mock.AsyncMock(), date(2024, 9, 1), [], asyncio.Semaphore(1),
+                            progress)
+
+        fake_store.return_value.delete.assert_not_called()
+        assert progress.failed[0]["week"] == "2024-09-01"
+
+    @mock.patch.dict("astronomy_backfill.ENV", {"ASTRONOMY_CACHE": "off"})
+    @mock.patch("astronomy_backfill.get_auth_string", return_value="auth")
+    @mock.patch("astronomy_backfill.get_db_regions", return_value=[])
+    @mock.patch("astronomy_backfill.get_checkpoint_store")
+    @mock.patch("astronomy_backfill.load_week", return_value=1)
+    @mock.patch("astronomy_backfill.extract_astronomy_week")
+    @pytest.mark.asyncio
+    async def test_run_backfill_shares_client_and_limits_weeks(self, fake_extract,
+                                                               fake_load, fake_store,
+                                                               fake_regions, fake_auth):
+        """Tests that every week uses one client, at most `concurrency` at once."""
+
+        fake_store.return_value.list.return_value = set()
+        running = []
+        peak = []
+
+        async def extract(client, week, regions, checkpoint):
+            running.append(week)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(week)
+            return client
+
+        fake_extract.side_effect = extract
+
+        summary = await run_backfill(date(2024, 9, 1), date(2024, 9, 28), concurrency=2)
+
+        assert summary["weeks"] == 4
+        assert len(summary["loaded"]) == 4
+        assert max(peak) == 2
+        assert len({id(call.args[0]) for call in fake_load.call_args_list}) == 1
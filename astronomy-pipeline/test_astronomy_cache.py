@@ -0,0 +1,93 @@
+"""Tests for the Astronomy API response cache."""
+# pylint: disable=R0801
+
+from unittest import mock
+
+from astronomy_cache import ResponseCache, make_cache_key
+
+
+class TestMakeCacheKey():
+    """Tests for the make cache key function."""
+
+    def test_key_ignores_key_order(self):
+        """Tests that equal bodies hash to the same key."""
+
+        key1 = make_cache_key("/studio/moon-phase", {"a": 1, "b": {"c": 2}})
+        key2 = make_cache_key("/studio/moon-phase", {"b": {"c": 2}, "a": 1})
+
+        assert key1 == key2
+
+    def test_key_depends_on_path(self):
+        """Tests that the same body on different endpoints does not collide."""
+
+        body = {"observer": {"date": "2024-10-10"}}
+
+        assert (make_cache_key("/studio/moon-phase", body)
+                != make_cache_key("/studio/star-chart", body))
+
+
+class TestResponseCache():
+    """Tests for the response cache class."""
+
+    def test_set_then_get(self, tmp_path):
+        """Tests that a stored response is returned."""
+
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+        cache.set("key", {"data": {"imageUrl": "url"}})
+
+        assert cache.get("key") == {"data": {"imageUrl": "url"}}
+        assert cache.hits == 1
+
+    def test_get_missing(self, tmp_path):
+        """Tests that a missing key is a miss."""
+
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+
+        assert cache.get("key") is None
+        assert cache.misses == 1
+
+    def test_persists_between_instances(self, tmp_path):
+        """Tests that responses survive reopening the cache file."""
+
+        path = str(tmp_path / "cache.sqlite")
+        cache = ResponseCache(path)
+        cache.set("key", {"data": 1})
+        cache.close()
+
+        assert ResponseCache(path).get("key") == {"data": 1}
+
+    @mock.patch("astronomy_cache.time.time")
+    def test_expired_entries_missed(self, fake_time, tmp_path):
+        """Tests that entries older than the TTL are not returned."""
+
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl=10)
+
+        fake_time.return_value = 100
+        cache.set("key", {"data": 1})
+        fake_time.return_value = 111
+
+        assert cache.get("key") is None
+
+    @mock.patch("astronomy_cache.time.time")
+    def test_least_recently_used_evicted(self, fake_time, tmp_path):
+        """Tests that the least recently used entry is evicted first."""
+
+        cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+
+        fake_time.return_value = 1
+        cache.set("old", {"data": 1})
+        fake_time.return_value = 2
+        cache.set("new", {"data": 2})
+        fake_time.return_value = 3
+        cache.get("old")
+        fake_time.return_value = 4
+        cache.set("newest", {"data": 3})
+
+        assert cache.get("new") is None
+        assert cache.get("old") == {"data": 1}
+
+    @mock.patch.dict("astronomy_cache.ENV", {"ASTRONOMY_CACHE": "off"})
+    def test_from_env_disabled(self):
+        """Tests that caching can be switched off."""
+
+        assert ResponseCache.from_env() is None
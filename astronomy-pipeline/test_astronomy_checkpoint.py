@@ -0,0 +1,152 @@
+"""Tests for the astronomy run checkpoints."""
+
+import io
+import json
+from unittest import mock
+
+from astronomy_checkpoint import (LocalCheckpointStore, S3CheckpointStore,
+                                  Checkpoint, get_checkpoint_store)
+
+
+class TestLocalCheckpointStore():
+    """Tests for the local checkpoint store."""
+
+    def test_write_then_read(self, tmp_path):
+        """Tests that written data is read back."""
+
+        store = LocalCheckpointStore(str(tmp_path))
+        store.write("2024-10-10", "positions_1_18", [{"body_name": "moon"}])
+
+        assert store.read("2024-10-10", "positions_1_18") == [{"body_name": "moon"}]
+        assert store.list("2024-10-10") == {"positions_1_18"}
+
+    def test_list_missing_run(self, tmp_path):
+        """Tests that a run with no checkpoints lists nothing."""
+
+        assert LocalCheckpointStore(str(tmp_path)).list("2024-10-10") == set()
+
+    def test_delete(self, tmp_path):
+        """Tests that a run's checkpoints are removed."""
+
+        store = LocalCheckpointStore(str(tmp_path))
+        store.write("2024-10-10", "moon_phase_2024-10-10", "url")
+        store.delete("2024-10-10")
+
+        assert store.list("2024-10-10") == set()
+
+
+class TestS3CheckpointStore():
+    """Tests for the S3 checkpoint store."""
+
+    def test_write_puts_object(self):
+        """Tests that data is written as a json object under the run prefix."""
+
+        fake_s3 = mock.MagicMock()
+        store = S3CheckpointStore("bucket", s3_client=fake_s3)
+
+        store.write("2024-10-10", "moon_phase_2024-10-10", "url")
+
+        fake_s3.put_object.assert_called_once_with(
+            Bucket="bucket",
+            Key="astronomy-checkpoints/2024-10-10/moon_phase_2024-10-10.json",
+            Body=b'"url"')
+
+    def test_read_gets_object(self):
+        """Tests that an object is decoded from json."""
+
+        fake_s3 = mock.MagicMock()
+        fake_s3.get_object.return_value = {"Body": io.BytesIO(json.dumps([1]).encode())}
+        store = S3CheckpointStore("bucket", s3_client=fake_s3)
+
+        assert store.read("2024-10-10", "positions_1_18") == [1]
+
+    def test_list_strips_prefix(self):
+        """Tests that listed keys are returned as checkpoint names."""
+
+        fake_s3 = mock.MagicMock()
+        fake_s3.get_paginator.return_value.paginate.return_value = [
+            {"Contents": [{"Key": "astronomy-checkpoints/2024-10-10/positions_1_18.json"}]}]
+        store = S3CheckpointStore("bucket", s3_client=fake_s3)
+
+        assert store.list("2024-10-10") == {"positions_1_18"}
+
+
+class TestCheckpoint():
+    """Tests for the checkpoint class."""
+
+    def test_load_unsaved_returns_none(self):
+        """Tests that an unsaved name is not read from the store."""
+
+        store = mock.MagicMock()
+        store.list.return_value = set()
+
+        checkpoint = Checkpoint(store, "2024-10-10")
+
+        assert checkpoint.load("positions_1_18") is None
+        assert not store.read.called
+
+    def test_save_then_load(self, tmp_path):
+        """Tests that saved data is loaded back in the same run."""
+
+        checkpoint = Checkpoint(LocalCheckpointStore(str(tmp_path)), "2024-10-10")
+        checkpoint.save("moon_phase_2024-10-10", "url")
+
+        assert checkpoint.load("moon_phase_2024-10-10") == "url"
+
+    def test_resumes_from_store(self, tmp_path):
+        """Tests that a new run picks up earlier checkpoints."""
+
+        store = LocalCheckpointStore(str(tmp_path))
+        Checkpoint(store, "2024-10-10").save("positions_1_18", [1, 2])
+
+        assert Checkpoint(store, "2024-10-10").load("positions_1_18") == [1, 2]
+
+    def test_clear(self, tmp_path):
+        """Tests that clearing removes the run's checkpoints."""
+
+        store = LocalCheckpointStore(str(tmp_path))
+        checkpoint = Checkpoint(store, "2024-10-10")
+        checkpoint.save("positions_1_18", [1, 2])
+        checkpoint.clear()
+
+        assert Checkpoint(store, "2024-10-10").load("positions_1_18") is None
+
+    def test_finish_keeps_failed_runs(self, tmp_path):
+        """Tests that a run with failed work keeps its checkpoints."""
+
+        store = LocalCheckpointStore(str(tmp_path))
+        checkpoint = Checkpoint(store, "2024-10-10")
+        checkpoint.save("positions_1_18", [1, 2])
+        checkpoint.mark_failed("positions_1_21")
+
+        assert not checkpoint.finish()
+        assert Checkpoint(store, "2024-10-10").load("positions_1_18") == [1, 2]
+
+    def test_finish_clears_complete_runs(self, tmp_path):
+        """Tests that a run without failures clears its checkpoints."""
+
+        store = LocalCheckpointStore(str(tmp_path))
+        checkpoint = Checkpoint(store, "2024-10-10")
+        checkpoint.save("positions_1_18", [1, 2])
+
+        assert checkpoint.finish()
+        assert not store.list("2024-10-10")
+
+
+class TestGetCheckpointStore():
+    """Tests for the checkpoint store factory."""
+
+    @mock.patch.dict("astronomy_checkpoint.ENV", {}, clear=True)
+    def test_local_by_default(self):
+        """Tests that a local store is used without a bucket."""
+
+        assert isinstance(get_checkpoint_store(), LocalCheckpointStore)
+
+    @mock.patch.dict("astronomy_checkpoint.ENV", {"CHECKPOINT_BUCKET": "bucket"})
+    @mock.patch("astronomy_checkpoint.S3CheckpointStore")
+    def test_s3_with_bucket(self, fake_store):
+        """Tests that an S3 store is used when a bucket is configured."""
+
+        get_checkpoint_store()
+
+        fake_store.assert_called_once_with("bucket")
@@ -0,0 +1,169 @@
+"""Tests for the shared Astronomy API client."""
+# pylint: disable=W0212
+
+from unittest import mock
+import json
+
+import pytest
+
+from api_error import APIError
+from astronomy_cache import ResponseCache
+from astronomy_client import AstronomyAPIClient, TokenBucket
+
+
+def make_response(status: int, data: dict = None, headers: dict = None):
+    """Returns a mock aiohttp response usable as an async context manager."""
+
+    response = mock.AsyncMock()
+    response.status = status
+    response.read.return_value = json.dumps(data).encode()
+    response.headers = headers or {}
+
+    context = mock.MagicMock()
+    context.__aenter__.return_value = response
+
+    return context
+
+
+class TestTokenBucket():
+    """Tests for the token bucket rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_acquire_consumes_token(self):
+        """Tests that acquiring a token reduces the available tokens."""
+
+        bucket = TokenBucket(rate=1, capacity=2)
+
+        await bucket.acquire()
+
+        assert bucket._tokens < 2
+
+    @pytest.mark.asyncio
+    @mock.patch("astronomy_client.asyncio.sleep")
+    async def test_acquire_waits_when_empty(self, fake_sleep):
+        """Tests that an empty bucket waits for a refill."""
+
+        bucket = TokenBucket(rate=1, capacity=1)
+        bucket._tokens = 0
+
+        async def refill(_):
+            bucket._tokens = 1
+
+        fake_sleep.side_effect = refill
+
+        await bucket.acquire()
+
+        assert fake_sleep.called
+
+
+class TestAstronomyAPIClient():
+    """Tests for the Astronomy API client."""
+
+    def test_auth_header_cached(self):
+        """Tests that the auth header is built once from the auth string."""
+
+        client = AstronomyAPIClient("abc", "http://test")
+
+        assert client.headers == {"Authorization": "Basic abc"}
+
+    def test_get_backoff_honours_retry_after(self):
+        """Tests that a numeric Retry-After header is used as the wait."""
+
+        assert AstronomyAPIClient.get_backoff(0, "3") == 3.0
+
+    def test_get_backoff_jittered(self):
+        """Tests that the backoff is bounded by the exponential cap."""
+
+        assert 0 <= AstronomyAPIClient.get_backoff(2) <= 4
+
+    @pytest.mark.asyncio
+    async def test_request_returns_json(self):
+        """Tests that a successful request returns the decoded json."""
+
+        client = AstronomyAPIClient("abc", "http://test", rate=100, burst=10)
+        client.session = mock.MagicMock()
+        client.session.request.return_value = make_response(200, {"data": 1})
+
+        res = await client.get("/bodies/positions", {"time": "18:00:00"})
+
+        assert res == {"data": 1}
+        client.session.request.assert_called_once_with(
+            "GET", "http://test/bodies/positions", params={"time": "18:00:00"})
+
+    @pytest.mark.asyncio
+    @mock.patch("astronomy_client.asyncio.sleep")
+    async def test_request_retries_rate_limited(self, fake_sleep):
+        """Tests that a 429 response is retried."""
+
+        client = AstronomyAPIClient("abc", "http://test", rate=100, burst=10)
+        client.session = mock.MagicMock()
+        client.session.request.side_effect = [make_response(429),
+                                              make_response(200, {"data": 1})]
+
+        res = await client.post("/studio/star-chart", {})
+
+        assert res == {"data": 1}
+        assert client.request_count == 2
+        assert fake_sleep.called
+
+    @pytest.mark.asyncio
+    async def test_request_raises_on_client_error(self):
+        """Tests that a non retryable status raises without retrying."""
+
+        client = AstronomyAPIClient("abc", "http://test", rate=100, burst=10)
+        client.session = mock.MagicMock()
+        client.session.request.return_value = make_response(404)
+
+        with pytest.raises(APIError):
+            await client.post("/studio/star-chart", {})
+
+        assert client.request_count == 1
+
+    @pytest.mark.asyncio
+    @mock.patch("astronomy_client.asyncio.sleep")
+    async def test_request_raises_after_retries(self, fake_sleep):
+        """Tests that an APIError is raised once the retries run out."""
+
+        client = AstronomyAPIClient("abc", "http://test", rate=100, burst=10,
+                                    max_retries=2)
+        client.session = mock.MagicMock()
+        client.session.request.side_effect = [make_response(503)
+                                              for _ in range(3)]
+
+        with pytest.raises(APIError):
+            await client.get("/bodies/positions")
+
+        assert client.request_count == 3
+        assert fake_sleep.call_count == 2
+
+    @pytest.mark.asyncio
+    @mock.patch("astronomy_client.asyncio.sleep")
+    async def test_request_retries_override(self, fake_sleep):
+        """Tests that a request can turn off the client's own retries."""
+
+        client = AstronomyAPIClient("abc", "http://test", rate=100, burst=10)
+        client.session = mock.MagicMock()
+        client.session.request.return_value = make_response(503)
+
+        with pytest.raises(APIError):
+            await client.post("/studio/star-chart", {}, retries=0)
+
+        assert client.request_count == 1
+        assert not fake_sleep.called
+
+    @pytest.mark.asyncio
+    async def test_cacheable_post_served_from_cache(self, tmp_path):
+        """Tests that a repeated cacheable request is only sent once."""
+
+        client = AstronomyAPIClient("abc", "http://test", rate=100, burst=10,
+                                    cache=ResponseCache(str(tmp_path / "c.sqlite")))
+        client.session = mock.MagicMock()
+        client.session.request.return_value = make_response(200, {"data": 1})
+
+        first = await client.post("/studio/moon-phase", {"date": "2024-10-10"},
+                                  cacheable=True)
+        second = await client.post("/studio/moon-phase", {"date": "2024-10-10"},
+                                   cacheable=True)
+
+        assert first == second == {"data": 1}
+        assert client.request_count == 1
@@ -0,0 +1,85 @@
+"""Tests for the columnar extract format."""
+
+import pytest
+
+from astronomy_columnar import (positions_to_table, table_to_positions, save_extract,
+                                load_extract, read_positions_frame, find_extract_format)
+from astronomy_transform import get_data_into_dataframe
+
+
+@pytest.fixture
+def extract_data():
+    """An extract payload with two regions and an empty time slot."""
+
+    return {
+        "body_positions": {
+            1: {"18": {"timestamp": ["2024-10-10T18:00:00.000+01:00",
+                                     "2024-10-11T18:00:00.000+01:00"],
+                       "body_name": ["moon", "mars"],
+                       "distance_km": [384400.0, 1.2e8],
+                       "azimuth": [120.5, 200.25],
+                       "altitude": [10.0, 35.5],
+                       "constellation_name": ["ori", "tau"]},
+                "21": {}},
+            2: {"18": {"timestamp": ["2024-10-10T18:00:00.000+01:00"],
+                       "body_name": ["sun"],
+                       "distance_km": [1.49e8],
+                       "azimuth": [250.0],
+                       "altitude": [6.5],
+                       "constellation_name": ["vir"]}}
+        },
+        "moon_phase_urls": [{"day": "2024-10-10", "url": "moon_url"},
+                            {"day": "2024-10-11", "url": None}],
+        "star_chart_urls": [{"day": "2024-10-10", "url": "chart_url",
+                             "constellation": "ori"}]
+    }
+
+
+class TestColumnarFormat():
+    """Tests for saving and loading the extract as columnar files."""
+
+    def test_positions_round_trip(self, extract_data):
+        """Tests that positions survive conversion to a table and back."""
+
+        table = positions_to_table(extract_data["body_positions"])
+
+        assert table.num_rows == 3
+        assert table_to_positions(table) == {
+            region: {slot: columns for slot, columns in times.items() if columns}
+            for region, times in extract_data["body_positions"].items()}
+
+    @pytest.mark.parametrize("file_format,compression",
+                             [("arrow", None), ("arrow", "zstd"), ("parquet", None)])
+    def test_save_and_load_extract(self, extract_data, tmp_path, file_format, compression):
+        """Tests that a saved extract loads back the same in every format."""
+
+        save_extract(str(tmp_path), extract_data, file_format, compression)
+        loaded = load_extract(str(tmp_path))
+
+        assert find_extract_format(str(tmp_path)) == file_format
+        assert loaded["moon_phase_urls"] == extract_data["moon_phase_urls"]
+        assert loaded["star_chart_urls"] == extract_data["star_chart_urls"]
+        assert loaded["body_positions"][2]["18"] == extract_data["body_positions"][2]["18"]
+
+    def test_save_extract_rejects_unknown_format(self, extract_data, tmp_path):
+        """Tests that only the supported formats can be written."""
+
+        with pytest.raises(ValueError):
+            save_extract(str(tmp_path), extract_data, "csv")
+
+    def test_load_extract_missing(self, tmp_path):
+        """Tests that loading from an empty directory raises."""
+
+        with pytest.raises(FileNotFoundError):
+            load_extract(str(tmp_path))
+
+    def test_read_positions_frame_matches_dataframe(self, extract_data, tmp_path):
+        """Tests that the frame read from file matches the one built in memory."""
+
+        save_extract(str(tmp_path), extract_data)
+
+        frame = read_positions_frame(str(tmp_path))
+        expected = get_data_into_dataframe(extract_data)
+
+        assert list(frame.columns) == list(expected.columns)
+        assert frame.astype(str).values.tolist() == expected.astype(str).values.tolist()
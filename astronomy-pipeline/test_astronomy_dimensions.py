@@ -0,0 +1,69 @@
+"""Tests for the dimension table cache."""
+
+from unittest import mock
+
+from astronomy_dimensions import DimensionCache
+
+
+def make_cache(rows: list[dict]) -> tuple:
+    """Returns a cache whose connection returns the given rows, and the cursor."""
+
+    mock_cursor = mock.MagicMock()
+    mock_cursor.fetchall.return_value = rows
+    mock_factory = mock.MagicMock()
+    mock_factory.return_value.__enter__.return_value.cursor.return_value = mock_cursor
+
+    return DimensionCache(mock_factory), mock_factory, mock_cursor
+
+
+class TestDimensionCache():
+    """Tests for the DimensionCache class."""
+
+    def test_table_queried_once(self):
+        """Tests that repeated lookups reuse the cached rows."""
+
+        cache, mock_factory, _ = make_cache([{"body_id": 1, "body_name": "Sun"}])
+
+        cache.get_body_mapping()
+        cache.get_body_mapping()
+
+        assert mock_factory.call_count == 1
+
+    def test_body_mapping(self):
+        """Tests body names are lower cased and mapped to their IDs."""
+
+        cache, _, mock_cursor = make_cache([{"body_id": 1, "body_name": "Sun"}])
+
+        assert cache.get_body_mapping() == {"sun": 1}
+        mock_cursor.execute.assert_called_once_with(
+            "SELECT body_id, body_name from body;")
+
+    def test_constellation_mapping(self):
+        """Tests constellation short names are mapped to their IDs."""
+
+        cache, _, _ = make_cache([{"constellation_id": 4,
+                                   "constellation_short_name": "Sgr"}])
+
+        assert cache.get_constellation_mapping() == {"sgr": 4}
+
+    def test_invalidate_reloads_table(self):
+        """Tests that an invalidated table is queried again."""
+
+        cache, mock_factory, _ = make_cache([{"region_id": 1}])
+
+        cache.get_regions()
+        cache.invalidate("region")
+        cache.get_regions()
+
+        assert mock_factory.call_count == 2
+
+    def test_invalidate_all(self):
+        """Tests that invalidating without a table clears every table."""
+
+        cache, mock_factory, _ = make_cache([{"region_id": 1}])
+
+        cache.get_regions()
+        cache.invalidate()
+        cache.get_regions()
+
+        assert mock_factory.call_count == 2
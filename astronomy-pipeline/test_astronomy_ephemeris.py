@@ -0,0 +1,112 @@
+"""Tests for the local ephemeris engine."""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from astronomy_ephemeris import (to_julian_date, solve_kepler, get_constellations,
+                                 compute_body_positions, get_local_position_data,
+                                 BODIES)
+from astronomy_extract import fill_region_time_dict, POSITION_COLUMNS
+
+
+LONDON = (np.array([51.51]), np.array([-0.13]))
+
+
+def get_position(stamp: str, body: str) -> dict:
+    """Returns the position of a body seen from London at a UTC time."""
+
+    positions = compute_body_positions(np.array([stamp], dtype="datetime64[ms]"),
+                                       *LONDON)
+    index = BODIES.index(body)
+
+    return {key: value[index, 0, 0] for key, value in positions.items()}
+
+
+class TestHelpers():
+    """Tests for the ephemeris helper functions."""
+
+    def test_to_julian_date_j2000(self):
+        """Tests the J2000 epoch converts to its Julian date."""
+
+        res = to_julian_date(np.array(["2000-01-01T12:00"], dtype="datetime64[ms]"))
+
+        assert res[0] == 2451545.0
+
+    def test_solve_kepler(self):
+        """Tests the eccentric anomaly satisfies Kepler's equation."""
+
+        mean_anomaly = np.array([0.5, 2.0])
+        ecc = solve_kepler(mean_anomaly, np.array([0.2, 0.2]))
+
+        assert np.allclose(ecc - 0.2 * np.sin(ecc), mean_anomaly)
+
+    def test_get_constellations(self):
+        """Tests longitudes map to zodiacal constellations, wrapping Pisces."""
+
+        res = get_constellations(np.array([10.0, 100.0, 250.0, 355.0]))
+
+        assert list(res) == ["psc", "gem", "oph", "psc"]
+
+
+class TestComputeBodyPositions():
+    """Tests against known positions."""
+
+    def test_output_shape(self):
+        """Tests arrays cover every body, timestamp and observer."""
+
+        res = compute_body_positions(
+            np.array(["2024-10-10T18:00", "2024-10-10T21:00"], dtype="datetime64[ms]"),
+            np.array([51.5, 55.9, 54.6]), np.array([-0.1, -3.2, -5.9]))
+
+        assert res["altitude"].shape == (len(BODIES), 2, 3)
+        assert res["constellation_name"].shape == (len(BODIES), 2, 3)
+
+    def test_summer_solstice_noon_sun(self):
+        """Tests the Sun is high in the south at midsummer noon."""
+
+        sun = get_position("2024-06-21T12:00", "sun")
+
+        assert sun["altitude"] == pytest.approx(61.9, abs=0.5)
+        assert sun["azimuth"] == pytest.approx(180, abs=2)
+        assert sun["distance_km"] == pytest.approx(152.0e6, rel=0.005)
+
+    def test_jupiter_opposition(self):
+        """Tests Jupiter at its December 2024 opposition in Taurus."""
+
+        jupiter = get_position("2024-12-07T00:00", "jupiter")
+
+        assert jupiter["distance_km"] == pytest.approx(611e6, rel=0.01)
+        assert jupiter["constellation_name"] == "tau"
+
+    def test_full_moon_perigee(self):
+        """Tests the October 2024 supermoon distance."""
+
+        moon = get_position("2024-10-17T11:26", "moon")
+
+        assert moon["distance_km"] == pytest.approx(357_200, abs=1500)
+
+
+class TestGetLocalPositionData():
+    """Tests for the local position data function."""
+
+    def test_fills_region_time_dict(self):
+        """Tests visible bodies land in the region/hour dictionary with
+        the same keys as the API path."""
+
+        regions = [{"region_id": 1, "latitude": 51.51, "longitude": -0.13},
+                   {"region_id": 2, "latitude": 56.49, "longitude": -4.20}]
+        times = ["18:00:00", "00:00:00"]
+
+        res = get_local_position_data(fill_region_time_dict(times, regions), times,
+                                      regions, date(2024, 12, 7), date(2024, 12, 13))
+
+        columns = res[1]["00"]
+        assert columns["timestamp"]
+        assert set(columns) == set(POSITION_COLUMNS)
+        assert len({len(column) for column in columns.values()}) == 1
+        assert all(altitude > 5.0 for altitude in columns["altitude"])
+        assert "2024-12-07T00:00:00.000+00:00" in columns["timestamp"]
+        assert "jupiter" in columns["body_name"]
+        assert "sun" not in columns["body_name"]
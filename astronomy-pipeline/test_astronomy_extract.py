@@ -6,13 +6,21 @@ import pytest
 from unittest import mock
 from datetime import date
 import asyncio
+import copy
 
 from psycopg2 import extras
 
 from astronomy_extract import (get_db_connection, get_auth_string, get_db_regions,
-                               get_all_body_positions, make_clean_body_dict, get_moon_urls,
-                               refine_bodies_data, get_position_data, fill_region_time_dict,
-                               extract_weekly_astronomy_data)
+                               get_all_body_positions, get_moon_urls,
+                               refine_bodies_columns, POSITION_COLUMNS,
+                               get_position_data, fill_region_time_dict,
+                               extract_weekly_astronomy_data, fetch_body_positions,
+                               get_moon_phase, request_star_chart, get_pending_star_charts,
+                               get_loaded_moon_phase_dates,
+                               get_visible_constellations, get_star_chart_urls,
+                               stream_position_batches, stream_star_chart_batches)
+from api_error import APIError
+from astronomy_checkpoint import Checkpoint, LocalCheckpointStore
 
 
 class TestExtractFunctions():
@@ -111,33 +119,17 @@ class TestExtractFunctions():
 
         assert isinstance(res, list)
 
-    @mock.patch("astronomy_extract.get_auth_string")
-    @mock.patch("astronomy_extract.requests.get")
-    def test_get_all_bodies_returns_json_dict(self, mock_get, mock_auth_string):
+    @pytest.mark.asyncio
+    async def test_get_all_bodies_returns_json_dict(self):
         """Asserts that a dictionary is returned by the body function."""
 
-        mock_auth_string.return_value = "fake_string"
-
-        class MockResponse():
-            """Simple mock class for creating object that returns a
-            dict when .json() method is used."""
-
-            def __init__(self, data: dict):
-                """Init functions for mock class."""
-                self._data = data
-                self.status_code = 200
-
-            def json(self):
-                """Function to make mock class json compatible."""
-                return self._data
-
         mock_data = {"key1": "value1", "key2": "value2"}
 
-        mock_response = MockResponse(mock_data)
-
-        mock_get.return_value = mock_response
+        mock_client = mock.AsyncMock()
+        mock_client.get.return_value = mock_data
 
-        res = get_all_body_positions(
+        res = await get_all_body_positions(
+            mock_client,
             start_date=date(2024, 1, 1),
             end_date=date(2024, 1, 10),
             lat=40.7128,
@@ -145,37 +137,62 @@ class TestExtractFunctions():
             time="12:00")
 
         assert res == mock_data
+        mock_client.get.assert_awaited_once_with(
+            "/bodies/positions",
+            {"latitude": 40.7128, "longitude": -74.0060, "elevation": 50,
+             "from_date": "2024-01-01", "to_date": "2024-01-10", "time": "12:00"})
 
-    def test_make_clean_body_dict_expected_outcome(self, sample_raw_body_data,
-                                                   sample_filtered_body_data):
-        """Test dictionary is filtered properly."""
+    def test_refine_bodies_columns_visible_only(self, sample_raw_body_data):
+        """Tests that only bodies above 5 degrees are kept, in position column order."""
 
-        sample_dict = sample_raw_body_data
+        low_body = copy.deepcopy(sample_raw_body_data)
+        low_body["id"] = "moon"
+        low_body["position"]["horizontal"]["altitude"]["degrees"] = "5.0"
+        bodies = {"data": {"table": {"rows": [
+            {"cells": [sample_raw_body_data, low_body]}]}}}
 
-        expected = sample_filtered_body_data
+        res = refine_bodies_columns(bodies)
 
-        res = make_clean_body_dict(sample_dict)
+        assert list(res) == POSITION_COLUMNS
+        assert res["body_name"] == ["sun"]
+        assert res["altitude"] == [10.04]
+        assert res["distance_km"] == [float(sample_raw_body_data["distance"]["fromEarth"]["km"])]
 
-        assert res == expected
+    @pytest.mark.asyncio
+    async def test_fetch_body_positions_returns_json_dict(self):
+        """Asserts that the decoded json is returned on a successful request."""
 
-    @mock.patch("astronomy_extract.make_clean_body_dict")
-    def test_refine_bodies_data_creates_list_of_dicts(self, fake_clean, sample_raw_positions):
-        """Asserts that the function returns a list of dicts."""
+        mock_client = mock.AsyncMock()
+        mock_client.get.return_value = {"key1": "value1"}
 
-        fake_clean.return_value = {"key": "val"}
+        res = await fetch_body_positions(mock_client, asyncio.Semaphore(1),
+                                         date(2024, 1, 1), date(2024, 1, 7),
+                                         40.7128, -74.0060, "18:00:00")
 
-        res = refine_bodies_data(sample_raw_positions)
+        assert res == {"key1": "value1"}
 
-        assert isinstance(res, list)
+    @pytest.mark.asyncio
+    async def test_fetch_body_positions_returns_none_on_failure(self):
+        """Asserts that an unsuccessful request does not raise."""
+
+        mock_client = mock.AsyncMock()
+        mock_client.get.side_effect = APIError("Unsuccessful request.", 500)
+
+        res = await fetch_body_positions(mock_client, asyncio.Semaphore(1),
+                                         date(2024, 1, 1), date(2024, 1, 7),
+                                         40.7128, -74.0060, "18:00:00")
+
+        assert res is None
 
-    @mock.patch("astronomy_extract.refine_bodies_data")
-    @mock.patch("astronomy_extract.get_all_body_positions")
-    def test_get_position_data_returns_dict(self, fake_body_pos, fake_refine):
+    @mock.patch("astronomy_extract.refine_bodies_columns")
+    @mock.patch("astronomy_extract.fetch_body_positions")
+    @pytest.mark.asyncio
+    async def test_get_position_data_returns_dict(self, fake_fetch, fake_refine):
         """Tests that the correct data types are returned by the
         named function."""
 
-        fake_refine.return_value = [1, 2, 3]
-        fake_body_pos.return_value = None
+        fake_refine.return_value = {"altitude": [1, 2, 3]}
+        fake_fetch.return_value = {"data": {}}
 
         input_dict = {1: {}, 2: {}}
 
@@ -186,38 +203,168 @@ class TestExtractFunctions():
 
         start_date, end_date = date.today(), date.today()
 
-        res = get_position_data(input_dict, times, regions,
-                                start_date, end_date)
+        res = await get_position_data(mock.AsyncMock(), input_dict, times,
+                                      regions, start_date, end_date)
 
         assert isinstance(res, dict)
         assert isinstance(res[1], dict)
-        assert isinstance(res[1]["18"], list)
-
-    @mock.patch("astronomy_extract.refine_bodies_data")
-    @mock.patch("astronomy_extract.get_all_body_positions")
-    def test_get_position_data_returns_correct_vals(self, fake_body_pos, fake_refine):
-        """Tests that the correct data values are returned
-        in the output of the named function"""
+        assert isinstance(res[1]["18"], dict)
 
-        fake_refine.return_value = [1, 2, 3]
-        fake_body_pos.return_value = None
+    @mock.patch("astronomy_extract.refine_bodies_columns")
+    @mock.patch("astronomy_extract.fetch_body_positions")
+    @pytest.mark.asyncio
+    async def test_get_position_data_fills_region_time_dict(self, fake_fetch,
+                                                            fake_refine):
+        """Tests that every region and time slot is fetched and lands
+        in the region/hour dictionary."""
 
-        input_dict = {1: {}, 2: {}}
+        fake_fetch.return_value = {"data": {}}
+        fake_refine.return_value = {"altitude": [1, 2, 3]}
 
         regions = [{"region_id": 1, "latitude": 1.2, "longitude": 1.3},
                    {"region_id": 2, "latitude": 1.4, "longitude": 1.5}]
-
         times = ["18:00:00", "21:00:00", "00:00:00"]
+        input_dict = fill_region_time_dict(times, regions)
 
-        start_date, end_date = date.today(), date.today()
+        res = await get_position_data(mock.AsyncMock(), input_dict, times,
+                                      regions, date.today(), date.today())
+
+        assert fake_fetch.call_count == 6
+        assert res[2]["00"]["altitude"][2] == 3
+
+    @mock.patch("astronomy_extract.fetch_body_positions")
+    @pytest.mark.asyncio
+    async def test_get_position_data_skips_failed_slots(self, fake_fetch):
+        """Tests that a failed request leaves its slot empty."""
+
+        fake_fetch.return_value = None
+
+        regions = [{"region_id": 1, "latitude": 1.2, "longitude": 1.3}]
+        times = ["18:00:00"]
+        input_dict = fill_region_time_dict(times, regions)
+
+        res = await get_position_data(mock.AsyncMock(), input_dict, times,
+                                      regions, date.today(), date.today())
+
+        assert not res[1]["18"]
+
+    @mock.patch("astronomy_extract.fetch_body_positions")
+    @pytest.mark.asyncio
+    async def test_get_position_data_resumes_from_checkpoint(self, fake_fetch, tmp_path):
+        """Tests that checkpointed slots are not fetched again."""
+
+        fake_fetch.return_value = None
+
+        regions = [{"region_id": 1, "latitude": 1.2, "longitude": 1.3}]
+        times = ["18:00:00", "21:00:00"]
+        checkpoint = Checkpoint(LocalCheckpointStore(str(tmp_path)), "2024-10-10")
+        checkpoint.save("positions_1_18", [{"body_name": "moon"}])
+
+        res = await get_position_data(mock.AsyncMock(), fill_region_time_dict(times, regions),
+                                      times, regions, date.today(), date.today(),
+                                      checkpoint=checkpoint)
 
-        res = get_position_data(input_dict, times, regions,
-                                start_date, end_date)
+        assert fake_fetch.call_count == 1
+        assert res[1]["18"] == [{"body_name": "moon"}]
+        assert checkpoint.failed == {"positions_1_21"}
 
-        assert res[1]["18"][2] == 3
+    def test_get_pending_star_charts_requests_missing_only(self, tmp_path):
+        """Tests that only constellations missing from the checkpoint are pending."""
+
+        checkpoint = Checkpoint(LocalCheckpointStore(str(tmp_path)), "2024-10-10")
+        checkpoint.save("star_charts_2024-10-10",
+                        [{"day": "2024-10-10", "url": "url1", "constellation": "and"}])
+
+        saved, pending = get_pending_star_charts(date(2024, 10, 10), ["and", "ori"],
+                                                 checkpoint)
+
+        assert len(pending) == 7
+        assert pending[date(2024, 10, 10)] == ["ori"]
+        assert pending[date(2024, 10, 11)] == ["and", "ori"]
+        assert saved[date(2024, 10, 10)][0]["url"] == "url1"
+
+    def test_get_pending_star_charts_demand_only(self):
+        """Tests that only demanded pairs are pending when a demand set is given."""
+
+        saved, pending = get_pending_star_charts(
+            date(2024, 10, 10), ["and", "ori"],
+            demand={(date(2024, 10, 11), "ori"), (date(2024, 10, 30), "and")})
+
+        assert pending[date(2024, 10, 11)] == ["ori"]
+        assert sum(len(consts) for consts in pending.values()) == 1
+        assert not any(saved.values())
+
+    def test_get_visible_constellations(self):
+        """Tests that each visible body's day and constellation is returned."""
+
+        positions = {1: {"18": {"timestamp": ["2024-10-10T18:00:00.000+01:00",
+                                              "2024-10-11T18:00:00.000+01:00"],
+                                "constellation_name": ["ori", "tau"]},
+                         "21": {}},
+                     2: {"18": {"timestamp": ["2024-10-10T18:00:00.000+01:00"],
+                                "constellation_name": ["ori"]}}}
+
+        assert get_visible_constellations(positions) == {(date(2024, 10, 10), "ori"),
+                                                         (date(2024, 10, 11), "tau")}
+
+    def test_get_visible_constellations_after_midnight(self):
+        """Tests that positions after midnight count towards the evening before."""
+
+        positions = {1: {"03": {"timestamp": ["2024-10-11T03:00:00.000+01:00"],
+                                "constellation_name": ["leo"]},
+                         "06": {"timestamp": ["2024-10-11T06:00:00.000+01:00"],
+                                "constellation_name": ["cnc"]}}}
+
+        assert get_visible_constellations(positions) == {(date(2024, 10, 10), "leo"),
+                                                         (date(2024, 10, 10), "cnc")}
+
+    @mock.patch.dict("astronomy_extract.ENV", {"STAR_CHART_CONCURRENCY": "2"})
+    @mock.patch("astronomy_extract.get_const_list")
+    @mock.patch("astronomy_extract.request_star_chart")
+    @pytest.mark.asyncio
+    async def test_get_star_chart_urls_checkpoints_each_day(self, fake_chart, fake_consts,
+                                                            tmp_path):
+        """Tests that every chart is fetched once and saved with its day."""
+
+        fake_consts.return_value = ["and", "ori"]
+        fake_chart.side_effect = lambda client, day, const, retries: {
+            "day": day, "url": "url", "constellation": const}
+        checkpoint = Checkpoint(LocalCheckpointStore(str(tmp_path)), "2024-10-10")
+
+        res = await get_star_chart_urls(mock.AsyncMock(), date(2024, 10, 10), checkpoint)
+
+        assert len(res) == 14
+        assert fake_chart.call_count == 14
+        assert all(call.kwargs == {"retries": 0} for call in fake_chart.call_args_list)
+        assert len(checkpoint.load("star_charts_2024-10-16")) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_moon_phase_returns_url(self):
+        """Tests that the image url is pulled from the response."""
+
+        mock_client = mock.AsyncMock()
+        mock_client.post.return_value = {"data": {"imageUrl": "url_string"}}
+
+        res = await get_moon_phase(mock_client, date(2024, 1, 1))
+
+        assert res == "url_string"
+        assert mock_client.post.call_args.args[0] == "/studio/moon-phase"
+
+    @pytest.mark.asyncio
+    async def test_request_star_chart_raises_on_failure(self):
+        """Tests that a failed star chart request raises for the scheduler to retry."""
+
+        mock_client = mock.AsyncMock()
+        mock_client.post.side_effect = APIError("Unsuccessful request.", 429)
+
+        with pytest.raises(APIError):
+            await request_star_chart(mock_client, "2024-01-01", "ori", retries=0)
+
+        assert mock_client.post.call_args.kwargs == {"cacheable": True, "retries": 0}
 
     @mock.patch("astronomy_extract.get_moon_phase")
-    def test_get_moon_urls_returns_list_of_dicts(self, fake_moon_phase):
+    @pytest.mark.asyncio
+    async def test_get_moon_urls_returns_list_of_dicts(self, fake_moon_phase):
         """tests that the get moon url function outputs
         a list"""
 
@@ -225,13 +372,60 @@ class TestExtractFunctions():
 
         test_date = date.today()
 
-        res = get_moon_urls(test_date)
+        res = await get_moon_urls(mock.AsyncMock(), test_date)
 
         assert isinstance(res, list)
         assert isinstance(res[0], dict)
         assert isinstance(res[0].get("day"), str)
         assert isinstance(res[0].get("url"), str)
 
+    @mock.patch("astronomy_extract.get_moon_phase")
+    @pytest.mark.asyncio
+    async def test_get_moon_urls_skips_loaded_and_missing_days(self, fake_moon_phase):
+        """Tests that days already loaded are not requested and days
+        without a URL are left out."""
+
+        start = date(2024, 10, 10)
+        fake_moon_phase.side_effect = lambda client, day: (
+            None if day == date(2024, 10, 16) else f"url_{day}")
+
+        res = await get_moon_urls(mock.AsyncMock(), start,
+                                  loaded={date(2024, 10, 10), date(2024, 10, 11)})
+
+        assert fake_moon_phase.call_count == 5
+        assert [row["day"] for row in res] == ["2024-10-12", "2024-10-13",
+                                               "2024-10-14", "2024-10-15"]
+        assert res[0]["url"] == "url_2024-10-12"
+
+    @mock.patch("astronomy_extract.get_moon_phase")
+    @pytest.mark.asyncio
+    async def test_get_moon_urls_uses_checkpoint(self, fake_moon_phase, tmp_path):
+        """Tests that checkpointed moon phases are not requested again."""
+
+        start = date(2024, 10, 10)
+        checkpoint = Checkpoint(LocalCheckpointStore(str(tmp_path)), "week")
+        checkpoint.save("moon_phase_2024-10-10", "saved_url")
+        fake_moon_phase.return_value = "url_string"
+
+        res = await get_moon_urls(mock.AsyncMock(), start, checkpoint)
+
+        assert fake_moon_phase.call_count == 6
+        assert res[0] == {"day": "2024-10-10", "url": "saved_url"}
+        assert checkpoint.load("moon_phase_2024-10-16") == "url_string"
+
+    @mock.patch("astronomy_extract.get_db_connection")
+    def test_get_loaded_moon_phase_dates(self, fake_connection):
+        """Tests that the days with a moon phase image are returned as a set."""
+
+        fake_cursor = fake_connection.return_value.__enter__.return_value.cursor.return_value
+        fake_cursor.fetchall.return_value = [{"image_date": date(2024, 10, 10)}]
+
+        res = get_loaded_moon_phase_dates(date(2024, 10, 10), date(2024, 10, 16))
+
+        assert res == {date(2024, 10, 10)}
+        assert fake_cursor.execute.call_args.args[1] == (date(2024, 10, 10),
+                                                         date(2024, 10, 16))
+
     def test_fill_region_time_dict_returns_correct_data_types(self):
         """Tests that the correct data types are returned for the
         named function."""
@@ -248,15 +442,16 @@ class TestExtractFunctions():
         assert isinstance(res[1]["00"], dict)
         assert not res[1]["00"]
 
-    @mock.patch.dict("astronomy_extract.ENV", ENV)
-    @mock.patch("astronomy_extract.connect")
+    @mock.patch("astronomy_extract.get_loaded_moon_phase_dates", mock.Mock(return_value=set()))
+    @mock.patch.dict("astronomy_extract.ENV", {**ENV, "ASTRONOMY_CACHE": "off"})
+    @mock.patch("astronomy_extract.get_star_chart_urls")
     @mock.patch("astronomy_extract.get_moon_urls")
     @mock.patch("astronomy_extract.get_position_data")
     @mock.patch("astronomy_extract.fill_region_time_dict")
     @mock.patch("astronomy_extract.get_db_regions")
     @pytest.mark.asyncio
-    async def test_extract_astronomy_data(fake_regions, fake_fill_dict, fake_positions,
-                                          fake_moon_urls, fake_urls,
+    async def test_extract_astronomy_data(self, fake_regions, fake_fill_dict,
+                                          fake_positions, fake_moon_urls, fake_urls,
                                           sample_filtered_body_data, sample_moon_urls):
         """Tests core functionality of main extract function."""
 
@@ -264,10 +459,146 @@ class TestExtractFunctions():
             {"region_id": 1, "latitude": 1.2, "longitude": 1.3},
             {"region_id": 2, "latitude": 1.4, "longitude": 1.5}]
 
-        fake_positions.return_value = sample_filtered_body_data
+        fake_positions.return_value = {1: {"09": {
+            name: [value] for name, value in sample_filtered_body_data.items()}}}
         fake_moon_urls.return_value = sample_moon_urls
+        fake_urls.return_value = []
 
         # Call the asynchronous function directly without asyncio.run
         res = await extract_weekly_astronomy_data()
 
         assert isinstance(res, dict)
+        assert fake_urls.call_args.args[3] == {(date(2020, 12, 19), "sgr")}
+
+    @mock.patch("astronomy_extract.get_loaded_moon_phase_dates", mock.Mock(return_value=set()))
+    @mock.patch.dict("astronomy_extract.ENV", {**ENV, "POSITION_SOURCE": "local",
+                                               "ASTRONOMY_CACHE": "off"})
+    @mock.patch("astronomy_extract.get_star_chart_urls")
+    @mock.patch("astronomy_extract.get_moon_urls")
+    @mock.patch("astronomy_extract.get_position_data")
+    @mock.patch("astronomy_extract.get_local_position_data")
+    @mock.patch("astronomy_extract.get_db_regions")
+    @pytest.mark.asyncio
+    async def test_extract_uses_local_positions(self, fake_regions, fake_local,
+                                                fake_remote, fake_moon, fake_charts):
+        """Tests that the local engine replaces the API when configured."""
+
+        fake_regions.return_value = [
+            {"region_id": 1, "latitude": 1.2, "longitude": 1.3}]
+        fake_local.return_value = {1: {}}
+
+        res = await extract_weekly_astronomy_data(date(2024, 10, 10))
+
+        assert fake_local.called
+        assert not fake_remote.called
+        assert res["body_positions"] == {1: {}}
+
+
+class TestStreaming():
+    """Tests for the streaming extract generators."""
+
+    @mock.patch("astronomy_extract.get_region_time_positions")
+    @pytest.mark.asyncio
+    async def test_stream_position_batches_yields_each_slot(self, fake_positions):
+        """Tests that every fetched slot is yielded once as its own batch."""
+
+        fake_positions.side_effect = lambda client, sem, region, time, *args: (
+            None if region["region_id"] == 2 and time == "21:00:00"
+            else {"altitude": [1]})
+
+        regions = [{"region_id": 1}, {"region_id": 2}]
+        times = ["18:00:00", "21:00:00"]
+
+        batches = [batch async for batch in stream_position_batches(
+            mock.AsyncMock(), times, regions, date.today(), date.today(),
+            max_concurrent=2)]
+
+        slots = {(region, hour) for batch in batches
+                 for region, hours in batch.items() for hour in hours}
+        assert slots == {(1, "18"), (1, "21"), (2, "18")}
+
+    @mock.patch("astronomy_extract.get_region_time_positions")
+    @pytest.mark.asyncio
+    async def test_stream_position_batches_raises_worker_errors(self, fake_positions):
+        """Tests that an unexpected worker error stops the stream."""
+
+        fake_positions.side_effect = KeyError("latitude")
+
+        with pytest.raises(KeyError):
+            async for _ in stream_position_batches(mock.AsyncMock(), ["18:00:00"],
+                                                   [{"region_id": 1}], date.today(),
+                                                   date.today()):
+                pass
+
+    @mock.patch("astronomy_extract.get_const_list")
+    @mock.patch("astronomy_extract.request_star_chart")
+    @pytest.mark.asyncio
+    async def test_stream_star_chart_batches_yields_each_day(self, fake_chart,
+                                                             fake_consts):
+        """Tests that one batch is yielded for each day of the week."""
+
+        fake_consts.return_value = ["ori"]
+        fake_chart.return_value = {"constellation": "ori"}
+
+        batches = [batch async for batch in stream_star_chart_batches(
+            mock.AsyncMock(), date(2024, 1, 1))]
+
+        assert len(batches) == 7
+
+    @mock.patch("astronomy_extract.get_const_list")
+    @mock.patch("astronomy_extract.request_star_chart")
+    @pytest.mark.asyncio
+    async def test_stream_star_chart_batches_yields_saved_first(self, fake_chart,
+                                                                fake_consts, tmp_path):
+        """Tests that checkpointed charts are yielded without a request."""
+
+        fake_consts.return_value = ["ori"]
+        fake_chart.return_value = {"constellation": "ori"}
+        checkpoint = Checkpoint(LocalCheckpointStore(str(tmp_path)), "2024-01-01")
+        checkpoint.save("star_charts_2024-01-01", [{"constellation": "ori"}])
+
+        batches = [batch async for batch in stream_star_chart_batches(
+            mock.AsyncMock(), date(2024, 1, 1), checkpoint)]
+
+        assert len(batches) == 7
+        assert fake_chart.call_count == 6
+
+    @mock.patch.dict("astronomy_extract.ENV", {"STAR_CHART_ATTEMPTS": "1"})
+    @mock.patch("astronomy_extract.get_const_list")
+    @mock.patch("astronomy_extract.request_star_chart")
+    @pytest.mark.asyncio
+    async def test_stream_star_chart_batches_records_failures(self, fake_chart,
+                                                              fake_consts, tmp_path):
+        """Tests that charts the scheduler could not get are marked failed."""
+
+        fake_consts.return_value = ["ori"]
+        def fake_request(client, day, const, retries):
+            if day == "2024-01-02":
+                raise APIError("Unsuccessful request.", 500)
+            return {"constellation": const}
+
+        fake_chart.side_effect = fake_request
+        checkpoint = Checkpoint(LocalCheckpointStore(str(tmp_path)), "2024-01-01")
+
+        batches = [batch async for batch in stream_star_chart_batches(
+            mock.AsyncMock(), date(2024, 1, 1), checkpoint)]
+
+        assert len(batches) == 6
+        assert checkpoint.failed == {"star_chart_2024-01-02_ori"}
+
+    @mock.patch.dict("astronomy_extract.ENV", {"STAR_CHART_MODE": "visible"})
+    @mock.patch("astronomy_extract.get_const_list")
+    @mock.patch("astronomy_extract.request_star_chart")
+    @pytest.mark.asyncio
+    async def test_stream_star_chart_batches_visible_mode(self, fake_chart, fake_consts):
+        """Tests that visible mode only requests constellations hosting a body."""
+
+        fake_consts.return_value = ["and", "ori", "tau"]
+        fake_chart.side_effect = lambda client, day, const, retries: {"constellation": const}
+
+        batches = [batch async for batch in stream_star_chart_batches(
+            mock.AsyncMock(), date(2024, 1, 1),
+            visible={(date(2024, 1, 1), "ori"), (date(2024, 1, 3), "tau")})]
+
+        assert fake_chart.call_count == 2
+        assert batches == [[{"constellation": "ori"}], [{"constellation": "tau"}]]
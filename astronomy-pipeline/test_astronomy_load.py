@@ -2,114 +2,138 @@
 # pylint: disable=W0613,R0801
 
 from unittest.mock import patch, MagicMock
+from datetime import datetime, timezone
+import pytest
 
-from astronomy_load import upload_body_position_data, upload_astronomy_data, upload_moon_phase_data
+from astronomy_load import copy_rows, merge_rows, bulk_upload_astronomy_data, ChunkedLoader
 
 
-class TestUploadBodyPositionData():
-    '''Tests for the upload body position data function.'''
+class TestCopyRows():
+    '''Tests for the copy rows function.'''
 
-    @patch('astronomy_load.execute_values')
-    @patch('astronomy_load.get_db_connection')
-    def test_upload_body_position_data_success_functions(self, mock_get_db_connection,
-                                                         mock_execute_values):
-        '''Tests that the correct functions and methods are called.'''
-        mock_conn = MagicMock()
+    def test_copy_rows_streams_csv(self):
+        '''Tests that rows are written as CSV with None as an empty field.'''
         mock_cursor = MagicMock()
-        mock_get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cursor
-        upload_body_position_data([[]])
+        copied = {}
+        mock_cursor.copy_expert.side_effect = lambda sql, buffer: copied.update(
+            sql=sql, body=buffer.read())
 
-        assert mock_get_db_connection.called
-        assert mock_execute_values.called
-        assert mock_conn.cursor.called
+        res = copy_rows(mock_cursor, 'image', ('image_date', 'region_id'),
+                        [[datetime(2024, 10, 9), None], [datetime(2024, 10, 10), 3]])
 
-    @patch('astronomy_load.execute_values')
-    @patch('astronomy_load.get_db_connection')
-    def test_upload_body_position_data_success_calls(self, mock_get_db_connection,
-                                                     mock_execute_values, upload_body_data_query):
-        '''Tests that the execute values method is called with the correct inputs.'''
-        mock_conn = MagicMock()
+        assert res == 2
+        assert copied['sql'] == ('COPY image (image_date, region_id) '
+                                 'FROM STDIN WITH (FORMAT csv)')
+        assert copied['body'] == '2024-10-09 00:00:00,\r\n2024-10-10 00:00:00,3\r\n'
+
+
+class TestMergeRows():
+    '''Tests for the merge rows function.'''
+
+    @patch('astronomy_load.copy_rows')
+    def test_merge_rows_stages_then_upserts(self, mock_copy_rows):
+        '''Tests that rows are copied to staging and merged on the key.'''
         mock_cursor = MagicMock()
-        mock_get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cursor
+        mock_cursor.rowcount = 1
 
-        upload_body_position_data([[]])
+        res = merge_rows(mock_cursor, 'image', ('image_date', 'image_url', 'image_name'),
+                         ('image_name', 'image_date'), [['day', 'url', 'moon_phase']])
 
-        mock_execute_values.assert_called_once_with(
-            mock_cursor, upload_body_data_query, [[]])
+        assert res == 1
+        assert mock_copy_rows.call_args.args[1] == 'image_staging'
+        create_sql, merge_sql = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert 'CREATE TEMP TABLE image_staging ON COMMIT DROP' in create_sql
+        assert 'ON CONFLICT (image_name, image_date) DO UPDATE SET' in merge_sql
+        assert 'image_url = EXCLUDED.image_url' in merge_sql
+        assert 'IS DISTINCT FROM' in merge_sql
 
 
-class TestUploadMoonPhaseData():
-    '''Tests for the upload moon phase data function.'''
+class TestBulkUploadAstronomyData():
+    '''Tests for the bulk upload astronomy data function.'''
 
-    @patch('astronomy_load.execute_values')
+    @patch('astronomy_load.copy_rows')
     @patch('astronomy_load.get_db_connection')
-    def test_upload_moon_phase_data_success_functions(self, mock_get_db_connection,
-                                                      mock_execute_values):
-        '''Tests that the correct functions and methods are called.'''
+    def test_bulk_upload_single_connection(self, mock_get_db_connection, mock_copy_rows):
+        '''Tests that every table is copied over one connection.'''
+        mock_copy_rows.return_value = 1
+        at = datetime(2024, 10, 9, tzinfo=timezone.utc)
+
+        bulk_upload_astronomy_data({'positions_list': [[at, 1.0, 2.0, 3.0, 1, 2, 3]],
+                                    'moon_phase_list': [['day', 'moon_url']],
+                                    'star_chart_list': [['day', 'chart_url', 5]]})
+
+        mock_get_db_connection.assert_called_once()
+        assert mock_copy_rows.call_count == 2
+        assert mock_copy_rows.call_args.args[3] == [
+            ['day', 'moon_url', None, None, 'moon_phase'],
+            ['day', 'chart_url', None, 5, 'star_chart']]
+
+    @patch('astronomy_load.merge_rows')
+    @patch('astronomy_load.copy_rows')
+    @patch('astronomy_load.get_db_connection')
+    def test_bulk_upload_upsert_merges(self, mock_get_db_connection, mock_copy_rows,
+                                       mock_merge_rows):
+        '''Tests that upsert mode merges on the natural keys instead of copying.'''
+        mock_merge_rows.return_value = 0
+
+        bulk_upload_astronomy_data({'positions_list': [], 'moon_phase_list': [],
+                                    'star_chart_list': []}, upsert=True)
+
+        assert not mock_copy_rows.called
+        assert [call.args[3] for call in mock_merge_rows.call_args_list] == [
+            ('region_id', 'body_id', 'at'),
+            ('image_name', 'image_date', 'constellation_id', 'region_id')]
+
+
+class TestChunkedLoader():
+    '''Tests for the chunked loader.'''
+
+    def test_add_returns_chunk_when_full(self):
+        '''Tests that a chunk is handed back once the buffer is full.'''
+        loader = ChunkedLoader(MagicMock(), chunk_size=2)
+
+        assert loader.add('positions_list', [[1]]) is None
+        chunk = loader.add('moon_phase_list', [['day', 'url']])
+
+        assert chunk == {'positions_list': [[1]], 'moon_phase_list': [['day', 'url']],
+                         'star_chart_list': []}
+        assert loader.buffers == ChunkedLoader.get_empty_buffers()
+
+    @patch('astronomy_load.write_astronomy_rows')
+    def test_close_writes_remaining_rows(self, mock_write_astronomy_rows):
+        '''Tests that closing writes the rest of the buffer and the connection.'''
         mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cursor
-        upload_moon_phase_data([[]])
+        mock_write_astronomy_rows.return_value = 1
+        loader = ChunkedLoader(mock_conn, upsert=True)
+        loader.add('positions_list', [[1]])
 
-        assert mock_get_db_connection.called
-        assert mock_execute_values.called
-        assert mock_conn.cursor.called
+        loader.close()
 
-    @patch('astronomy_load.execute_values')
-    @patch('astronomy_load.get_db_connection')
-    def test_upload_moon_phase_data_success_calls(self, mock_get_db_connection,
-                                                  mock_execute_values, upload_moon_data_query):
-        '''Tests that the execute values method is called with the correct inputs.'''
+        assert mock_write_astronomy_rows.call_args.args[1]['positions_list'] == [[1]]
+        assert mock_write_astronomy_rows.call_args.args[2] is True
+        assert loader.row_count == 1
+        assert mock_conn.close.called
+
+    @patch('astronomy_load.write_astronomy_rows')
+    def test_close_without_flush(self, mock_write_astronomy_rows):
+        '''Tests that a failed stream closes the connection without writing the buffer.'''
         mock_conn = MagicMock()
-        mock_cursor = MagicMock()
-        mock_get_db_connection.return_value.__enter__.return_value = mock_conn
-        mock_conn.cursor.return_value = mock_cursor
-
-        upload_moon_phase_data([[]])
-
-        mock_execute_values.assert_called_once_with(
-            mock_cursor, upload_moon_data_query, [[None, None, 'moon_phase']])
-
-
-class TestUploadAstronomyData():
-    '''Tests for the upload astronomy data function.'''
-
-    @patch('astronomy_load.upload_star_chart_data')
-    @patch('astronomy_load.upload_moon_phase_data')
-    @patch('astronomy_load.upload_body_position_data')
-    def test_upload_astronomy_data_success_functions(self, mock_upload_body_position_data,
-                                                     mock_upload_moon_phase_data,
-                                                     mock_upload_star_data,
-                                                     astronomy_data_dict):
-        '''Tests that the correct functions are called.'''
-        upload_astronomy_data(astronomy_data_dict)
-
-        assert mock_upload_body_position_data.called
-        assert mock_upload_moon_phase_data.called
-
-    @patch('astronomy_load.upload_star_chart_data')
-    @patch('astronomy_load.upload_moon_phase_data')
-    @patch('astronomy_load.upload_body_position_data')
-    def test_upload_astronomy_data_success_calls_moon(self, mock_upload_body_position_data,
-                                                      mock_upload_moon_phase_data,
-                                                      mock_upload_star_data,
-                                                      astronomy_data_dict):
-        '''Tests that upload moon phase data is called with the correct values.'''
-        upload_astronomy_data(astronomy_data_dict)
-
-        mock_upload_moon_phase_data.assert_called_once_with(['moon'])
-
-    @patch('astronomy_load.upload_star_chart_data')
-    @patch('astronomy_load.upload_moon_phase_data')
-    @patch('astronomy_load.upload_body_position_data')
-    def test_upload_astronomy_data_success_calls_body(self, mock_upload_body_position_data,
-                                                      mock_upload_moon_phase_data,
-                                                      mock_upload_star_data,
-                                                      astronomy_data_dict):
-        '''Tests that upload body position data is called with the correct values.'''
-        upload_astronomy_data(astronomy_data_dict)
-
-        mock_upload_body_position_data.assert_called_once_with(['positions'])
+        loader = ChunkedLoader(mock_conn)
+        loader.add('positions_list', [[1]])
+
+        loader.close(flush=False)
+
+        assert not mock_write_astronomy_rows.called
+        assert mock_conn.close.called
+
+    @patch('astronomy_load.write_astronomy_rows')
+    def test_close_after_failed_write(self, mock_write_astronomy_rows):
+        '''Tests that the connection is closed even if the last write fails.'''
+        mock_conn = MagicMock()
+        mock_write_astronomy_rows.side_effect = ValueError
+        loader = ChunkedLoader(mock_conn)
+
+        with pytest.raises(ValueError):
+            loader.close()
+
+        assert mock_conn.close.called
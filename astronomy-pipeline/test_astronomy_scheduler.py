@@ -0,0 +1,156 @@
+"""Tests for the star chart scheduler."""
+
+from datetime import date
+from unittest import mock
+import asyncio
+
+import pytest
+
+from api_error import APIError
+from astronomy_scheduler import StarChartScheduler, StarChartReport
+
+DAY_ONE = date(2024, 10, 10)
+DAY_TWO = date(2024, 10, 11)
+
+
+def make_fetch(failures: dict = None, delay: float = 0):
+    """Returns a fake fetch recording its calls, which raises the given
+    number of APIErrors for a (day, constellation) before succeeding."""
+
+    failures = dict(failures or {})
+    calls = []
+
+    async def fetch(day, constellation):
+        calls.append((day, constellation))
+        await asyncio.sleep(delay)
+
+        if failures.get((day, constellation)):
+            failures[(day, constellation)] -= 1
+            raise APIError("Unsuccessful request.", 503)
+
+        return {"day": str(day), "constellation": constellation}
+
+    fetch.calls = calls
+    return fetch
+
+
+class TestStarChartScheduler():
+    """Tests for the StarChartScheduler class."""
+
+    @pytest.mark.asyncio
+    async def test_run_fetches_every_job(self):
+        """Tests that every job is fetched once and reported complete."""
+
+        fetch = make_fetch()
+        scheduler = StarChartScheduler(fetch, concurrency=3)
+
+        charts = await scheduler.run({DAY_ONE: ["and", "ori"], DAY_TWO: ["ori"]})
+
+        assert len(charts) == 3
+        assert len(fetch.calls) == 3
+        assert scheduler.report.completed == 3
+        assert not scheduler.report.failed
+
+    @pytest.mark.asyncio
+    async def test_stream_orders_by_day_then_priority(self):
+        """Tests that earlier days and priority constellations go first."""
+
+        fetch = make_fetch()
+        scheduler = StarChartScheduler(fetch, concurrency=1)
+
+        await scheduler.run({DAY_TWO: ["and", "ori"], DAY_ONE: ["and", "ori"]},
+                            priority={(DAY_ONE, "ori")})
+
+        assert fetch.calls == [(DAY_ONE, "ori"), (DAY_ONE, "and"),
+                               (DAY_TWO, "and"), (DAY_TWO, "ori")]
+
+    @mock.patch("astronomy_scheduler.StarChartScheduler.get_backoff", return_value=0)
+    @pytest.mark.asyncio
+    async def test_stream_retries_failures(self, fake_backoff):
+        """Tests that a failed request is retried until it succeeds."""
+
+        fetch = make_fetch({(DAY_ONE, "ori"): 2})
+        scheduler = StarChartScheduler(fetch, concurrency=2, max_attempts=3)
+
+        charts = await scheduler.run({DAY_ONE: ["and", "ori"]})
+
+        assert len(charts) == 2
+        assert scheduler.report.retries == 2
+        assert not scheduler.report.failed
+
+    @mock.patch("astronomy_scheduler.StarChartScheduler.get_backoff", return_value=0)
+    @pytest.mark.asyncio
+    async def test_stream_reports_exhausted_retries(self, fake_backoff):
+        """Tests that a job failing every attempt is reported, not dropped silently."""
+
+        fetch = make_fetch({(DAY_ONE, "ori"): 5})
+        scheduler = StarChartScheduler(fetch, concurrency=2, max_attempts=2)
+
+        batches = [batch async for batch in scheduler.stream({DAY_ONE: ["and", "ori"]})]
+
+        assert batches == [(DAY_ONE, [{"day": str(DAY_ONE), "constellation": "and"}])]
+        assert scheduler.report.failed == [{"day": str(DAY_ONE), "constellation": "ori",
+                                            "reason": "HTTP 503"}]
+
+    @pytest.mark.asyncio
+    async def test_stream_stops_at_deadline(self):
+        """Tests that requests running past the time budget are cut off and reported."""
+
+        fetch = make_fetch(delay=0.2)
+        scheduler = StarChartScheduler(fetch, concurrency=1, time_budget=0.05)
+
+        charts = await asyncio.wait_for(scheduler.run({DAY_ONE: ["and", "ori"]}), 1)
+
+        assert not charts
+        assert len(fetch.calls) == 1
+        assert [failure["reason"] for failure in scheduler.report.failed] == [
+            "timed out at the deadline", "past the deadline"]
+
+    @pytest.mark.asyncio
+    async def test_stream_raises_unexpected_errors(self):
+        """Tests that an error other than a failed request stops the run."""
+
+        async def fetch(day, constellation):
+            raise KeyError("imageUrl")
+
+        with pytest.raises(KeyError):
+            await StarChartScheduler(fetch).run({DAY_ONE: ["ori"]})
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_days_with_no_jobs(self):
+        """Tests that a day with nothing to request is still yielded."""
+
+        scheduler = StarChartScheduler(make_fetch())
+
+        batches = [batch async for batch in scheduler.stream({DAY_ONE: [], DAY_TWO: ["ori"]})]
+
+        assert (DAY_ONE, []) in batches
+        assert len(batches) == 2
+
+    @mock.patch.dict("astronomy_scheduler.ENV", {"STAR_CHART_CONCURRENCY": "4",
+                                                 "STAR_CHART_ATTEMPTS": "5",
+                                                 "STAR_CHART_TIME_BUDGET": "60"})
+    def test_from_env(self):
+        """Tests that the scheduler settings are read from the environment."""
+
+        scheduler = StarChartScheduler.from_env(make_fetch())
+
+        assert (scheduler.concurrency, scheduler.max_attempts,
+                scheduler.time_budget) == (4, 5, 60.0)
+
+
+class TestStarChartReport():
+    """Tests for the StarChartReport class."""
+
+    def test_log_warns_each_failure(self, caplog):
+        """Tests that the coverage and every failure are logged."""
+
+        report = StarChartReport()
+        report.requested, report.completed = 2, 1
+        report.add_failure(DAY_ONE, "ori", "HTTP 503")
+
+        with caplog.at_level("INFO"):
+            report.log()
+
+        assert "1 of 2" in caplog.text
+        assert "ori on 2024-10-10 failed: HTTP 503" in caplog.text
@@ -10,7 +10,8 @@ from astronomy_transform import (transform_astronomy_data, load_from_file,
                                  get_data_into_dataframe, get_body_mapping,
                                  get_constellation_mapping, clean_position_data,
                                  convert_positions_datetime, get_moon_list,
-                                 convert_moon_datetime)
+                                 convert_moon_datetime, convert_star_chart_data,
+                                 transform_astronomy_batch, transform_astronomy_files)
 
 
 class TestLoadFromFile():
@@ -59,11 +60,34 @@ class TestGetDataIntoDataFrame():
     @patch('pandas.concat')
     @patch('pandas.DataFrame')
     def test_get_data_into_dataframe_correct_methods(self, mock_dataframe, mock_concat):
-        '''Tests that the correct pandas methods are called when the function runs.'''
-        get_data_into_dataframe({'body_positions': {1: {1: 'test'}}})
+        '''Tests that one dataframe is built without concatenating slots.'''
+        get_data_into_dataframe({'body_positions': {1: {'18': {}}}})
 
-        assert mock_dataframe.called
-        assert mock_concat.called
+        mock_dataframe.assert_called_once()
+        assert not mock_concat.called
+
+    def test_get_data_into_dataframe_from_columns(self):
+        '''Tests that position columns become one row per body.'''
+        columns = {'timestamp': ['a', 'b'], 'body_name': ['sun', 'moon'],
+                   'distance_km': [1.0, 2.0], 'azimuth': [3.0, 4.0],
+                   'altitude': [10.0, 20.0], 'constellation_name': ['sgr', 'leo']}
+
+        res = get_data_into_dataframe({'body_positions': {1: {'18': columns, '21': {}}}})
+
+        assert res['body_name'].tolist() == ['sun', 'moon']
+        assert res['region_id'].tolist() == [1, 1]
+
+    def test_get_data_into_dataframe_any_region_ids(self):
+        '''Tests that region ids other than 1 and string keys are handled.'''
+        columns = {'timestamp': ['a'], 'body_name': ['sun'], 'distance_km': [1.0],
+                   'azimuth': [3.0], 'altitude': [10.0], 'constellation_name': ['sgr']}
+
+        res = get_data_into_dataframe({'body_positions': {'4': {'18': columns},
+                                                          7: {'21': columns}}})
+
+        assert res['region_id'].tolist() == [4, 7]
+        assert res['region_id'].dtype == 'category'
+        assert res['altitude'].dtype == float
 
     def test_get_data_into_dataframe_missing_body_positions(self):
         """Test get_data_into_dataframe with missing body positions."""
@@ -74,7 +98,7 @@ class TestGetDataIntoDataFrame():
 class TestGetBodyMapping():
     '''Tests for the get body mapping function.'''
 
-    @patch('astronomy_transform.get_db_connection')
+    @patch('astronomy_extract.get_db_connection')
     def test_get_body_mapping_correct_methods(self, mock_get_db_connection):
         '''Tests that the correct function and methods are 
         called within the function.'''
@@ -89,7 +113,7 @@ class TestGetBodyMapping():
         assert mock_get_db_connection.called
         assert mock_conn.cursor.called
 
-    @patch('astronomy_transform.get_db_connection')
+    @patch('astronomy_extract.get_db_connection')
     def test_get_body_mapping_correct_call(self, mock_get_db_connection):
         '''Tests that the correct input is used for the execute method.'''
         mock_conn = MagicMock()
@@ -102,7 +126,7 @@ class TestGetBodyMapping():
         mock_cursor.execute.assert_called_once_with(
             'SELECT body_id, body_name from body;')
 
-    @patch('astronomy_transform.get_db_connection')
+    @patch('astronomy_extract.get_db_connection')
     def test_get_body_mapping_returns_dict(self, mock_get_db_connection):
         '''Tests that a dict object is returned from the function.'''
         mock_conn = MagicMock()
@@ -118,7 +142,7 @@ class TestGetBodyMapping():
 class TestGetConstellationMapping():
     '''Tests for the get constellation mapping function.'''
 
-    @patch('astronomy_transform.get_db_connection')
+    @patch('astronomy_extract.get_db_connection')
     def test_get_constellation_mapping_correct_methods(self, mock_get_db_connection):
         '''Tests that the correct function and methods are 
         called within the function.'''
@@ -133,7 +157,7 @@ class TestGetConstellationMapping():
         assert mock_get_db_connection.called
         assert mock_conn.cursor.called
 
-    @patch('astronomy_transform.get_db_connection')
+    @patch('astronomy_extract.get_db_connection')
     def test_get_constellation_mapping_correct_call(self, mock_get_db_connection):
         '''Tests that the correct input is used for the execute method.'''
         mock_conn = MagicMock()
@@ -146,7 +170,7 @@ class TestGetConstellationMapping():
         mock_cursor.execute.assert_called_once_with(
             'SELECT constellation_id, constellation_short_name from constellation;')
 
-    @patch('astronomy_transform.get_db_connection')
+    @patch('astronomy_extract.get_db_connection')
     def test_get_constellation_mapping_returns_dict(self, mock_get_db_connection):
         '''Tests that a dict object is returned from the function.'''
         mock_conn = MagicMock()
@@ -222,6 +246,16 @@ class TestConvertPositionsDatetime():
         result = convert_positions_datetime(position_list)
         assert result == expected_output
 
+    def test_convert_positions_datetime_api_offsets(self):
+        '''Test that rows with differing ISO offsets keep their instant.'''
+        position_list = [['2020-12-20T09:00:00.000-05:00', 'position1'],
+                         ['2020-12-20T14:00:00.000+00:00', 'position2']]
+
+        result = convert_positions_datetime(position_list)
+
+        assert result[0][0] == result[1][0] == datetime(2020, 12, 20, 14,
+                                                         tzinfo=timezone.utc)
+
     def test_convert_positions_datetime_invalid_datetime_format(self):
         '''Test handling of invalid datetime format strings.'''
         position_list = [['10-10-2024 12:30:45', 'position1', 100.0]]
@@ -252,6 +286,20 @@ class TestConvertMoonDatetime():
             convert_moon_datetime(position_list)
 
 
+class TestConvertStarChartData():
+    '''Tests for the convert star chart data function.'''
+
+    @patch('astronomy_transform.get_constellation_mapping')
+    def test_convert_star_chart_data_valid_data(self, mock_get_constellation_mapping):
+        '''Test that days are parsed and constellations mapped to IDs.'''
+        mock_get_constellation_mapping.return_value = {'sgr': 4}
+        chart_list = [{'day': '2024-10-09', 'url': 'url1', 'constellation': 'sgr'}]
+
+        result = convert_star_chart_data(chart_list)
+
+        assert result == [[datetime(2024, 10, 9), 'url1', 4]]
+
+
 class TestTransformAstronomyData():
     '''Tests for the transform astronomy data function.'''
 
@@ -338,3 +386,63 @@ class TestTransformAstronomyData():
 
         assert 'positions_list' in result
         assert 'moon_phase_list' in result
+
+
+class TestTransformAstronomyBatch():
+    '''Tests for the transform astronomy batch function.'''
+
+    def test_transform_astronomy_batch_moon(self):
+        '''Tests that a moon phase batch becomes moon phase rows.'''
+        result = transform_astronomy_batch('moon_phase_urls',
+                                           [{'day': '2024-10-09', 'url': 'url1'}])
+
+        assert result == ('moon_phase_list', [[datetime(2024, 10, 9), 'url1']])
+
+    @patch('astronomy_transform.get_body_mapping')
+    @patch('astronomy_transform.get_constellation_mapping')
+    def test_transform_astronomy_batch_positions(self, mock_get_constellation_mapping,
+                                                 mock_get_body_mapping):
+        '''Tests that a position batch becomes position rows.'''
+        mock_get_body_mapping.return_value = {'sun': 2}
+        mock_get_constellation_mapping.return_value = {'sgr': 3}
+        columns = {'timestamp': ['2020-12-20T09:00:00.000+00:00'], 'body_name': ['sun'],
+                   'distance_km': [1.0], 'azimuth': [3.0], 'altitude': [10.0],
+                   'constellation_name': ['sgr']}
+
+        key, rows = transform_astronomy_batch('body_positions', {1: {'18': columns}})
+
+        assert key == 'positions_list'
+        assert rows == [[datetime(2020, 12, 20, 9, tzinfo=timezone.utc),
+                         1.0, 3.0, 10.0, 1, 2, 3]]
+
+    def test_transform_astronomy_batch_unknown_key(self):
+        '''Tests that an unknown batch key raises an error.'''
+        with pytest.raises(ValueError):
+            transform_astronomy_batch('comets', [])
+
+
+class TestTransformAstronomyFiles():
+    '''Tests for the transform astronomy files function.'''
+
+    @patch('astronomy_transform.get_body_mapping')
+    @patch('astronomy_transform.get_constellation_mapping')
+    def test_transform_astronomy_files_matches_dict(self, mock_get_constellation_mapping,
+                                                    mock_get_body_mapping, tmp_path):
+        '''Tests that a saved columnar extract transforms to the same rows.'''
+        pytest.importorskip('pyarrow')
+        from astronomy_columnar import save_extract  # pylint: disable=C0415
+
+        mock_get_body_mapping.return_value = {'sun': 2}
+        mock_get_constellation_mapping.return_value = {'sgr': 3}
+        raw_data = {
+            'body_positions': {1: {'18': {
+                'timestamp': ['2020-12-20T09:00:00.000+00:00'], 'body_name': ['sun'],
+                'distance_km': [1.0], 'azimuth': [3.0], 'altitude': [10.0],
+                'constellation_name': ['sgr']}}},
+            'moon_phase_urls': [{'day': '2020-12-20', 'url': 'url1'}],
+            'star_chart_urls': [{'day': '2020-12-20', 'url': 'url2', 'constellation': 'sgr'}]}
+        save_extract(str(tmp_path), raw_data)
+
+        result = transform_astronomy_files(str(tmp_path))
+
+        assert result == transform_astronomy_data(raw_data)
@@ -0,0 +1,72 @@
+"""Tests for the stage instrumentation module."""
+
+import json
+from unittest import mock
+
+import pytest
+
+from instrumentation import StageMetrics, track_stage, record_request
+
+
+class TestStageMetrics():
+    """Tests for the StageMetrics class."""
+
+    def test_rows_per_second(self):
+        """Tests throughput is rows over the stage duration."""
+
+        metrics = StageMetrics("astronomy", "load")
+        metrics.add_rows(100)
+        metrics.duration = 2.0
+
+        assert metrics.rows_per_second == 50.0
+
+    def test_rows_per_second_no_duration(self):
+        """Tests an untimed stage reports no throughput."""
+
+        assert StageMetrics("astronomy", "load").rows_per_second == 0.0
+
+    def test_to_emf(self):
+        """Tests the document declares every metric under the stage dimensions."""
+
+        metrics = StageMetrics("astronomy", "extract")
+        metrics.add_request(512)
+
+        res = metrics.to_emf()
+
+        directive = res["_aws"]["CloudWatchMetrics"][0]
+        assert directive["Dimensions"] == [["Pipeline", "Stage"]]
+        assert {metric["Name"] for metric in directive["Metrics"]} <= set(res)
+        assert res["Requests"] == 1
+        assert res["BytesReceived"] == 512
+
+
+class TestTrackStage():
+    """Tests for the track_stage context manager."""
+
+    @mock.patch("instrumentation.get_metrics_logger")
+    def test_logs_json_line(self, fake_logger):
+        """Tests one JSON line is logged with requests made inside the stage."""
+
+        with track_stage("quadhoral", "extract") as stage:
+            record_request(10)
+            stage.add_rows(5)
+
+        line = json.loads(fake_logger.return_value.info.call_args.args[0])
+        assert line["Stage"] == "extract"
+        assert line["Requests"] == 1
+        assert line["Rows"] == 5
+
+    @mock.patch("instrumentation.get_metrics_logger")
+    def test_logs_failed_stage(self, fake_logger):
+        """Tests a stage that raises is still logged."""
+
+        with pytest.raises(ValueError):
+            with track_stage("quadhoral", "load"):
+                raise ValueError("Bad data")
+
+        assert fake_logger.return_value.info.called
+
+    def test_record_request_outside_stage(self):
+        """Tests recording a request with no running stage does nothing."""
+
+        record_request(10)
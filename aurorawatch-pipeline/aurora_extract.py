@@ -5,6 +5,8 @@ import logging
 
 import requests
 
+from instrumentation import record_request
+
 AURORA_WATCH_URL = 'http://aurorawatch-api.lancs.ac.uk/0.2/status/current-status.xml'
 
 
@@ -13,6 +15,7 @@ def make_request() -> bytes:
     get request made to the AuroraWatchUK API.'''
     response = requests.get(url=AURORA_WATCH_URL, timeout=10)
     logging.info('AuroraWatchUK request sent')
+    record_request(len(response.content or b''))
 
     if response.status_code == 200:
         logging.info('AuroraWatchUK request successful')
@@ -5,18 +5,26 @@ import logging
 from aurora_extract import extract
 from aurora_transform import transform
 from aurora_load import load_data
+from instrumentation import track_stage
 
 
 def lambda_handler(event, context):
     '''Orchestrates ETL pipeline for the AuroraWatch UK API data.'''
     logging.basicConfig(level=logging.INFO)
-    data = extract()
+
+    with track_stage('aurorawatch', 'extract') as stage:
+        data = extract()
+        stage.add_rows(1 if data else 0)
 
     if data:
-        clean_data = transform(data)
+        with track_stage('aurorawatch', 'transform') as stage:
+            clean_data = transform(data)
+            stage.add_rows(1 if clean_data else 0)
 
     if clean_data:
-        load_data(clean_data)
+        with track_stage('aurorawatch', 'load') as stage:
+            load_data(clean_data)
+            stage.add_rows(1)
 
 
 if __name__ == '__main__':
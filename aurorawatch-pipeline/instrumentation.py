@@ -0,0 +1,103 @@
+"""Stage level timing and throughput metrics for the Lambda pipelines.
+Each extract, transform and load stage logs one JSON line in the
+CloudWatch Embedded Metric Format, so stages can be graphed per pipeline."""
+
+from contextlib import contextmanager
+import json
+import logging
+import sys
+import time
+
+NAMESPACE = "StarWatch"
+METRICS = [("Duration", "Seconds"), ("Requests", "Count"),
+           ("BytesReceived", "Bytes"), ("Rows", "Count"),
+           ("RowsPerSecond", "Count/Second")]
+
+_active_stages = []
+
+
+def get_metrics_logger() -> logging.Logger:
+    """Returns a logger writing bare JSON lines to stdout, as the
+    Embedded Metric Format needs each line to be a JSON document."""
+
+    logger = logging.getLogger("starwatch.metrics")
+
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    return logger
+
+
+class StageMetrics():
+    """Measurements recorded for one stage of a pipeline run."""
+
+    def __init__(self, pipeline: str, stage: str):
+        """Creates empty measurements for a pipeline stage."""
+        self.pipeline = pipeline
+        self.stage = stage
+        self.duration = 0.0
+        self.requests = 0
+        self.bytes_received = 0
+        self.rows = 0
+
+    def add_request(self, bytes_received: int = 0) -> None:
+        '''Records one request and the size of its response.'''
+        self.requests += 1
+        self.bytes_received += bytes_received
+
+    def add_rows(self, rows: int) -> None:
+        '''Records rows produced by the stage.'''
+        self.rows += rows
+
+    @property
+    def rows_per_second(self) -> float:
+        '''Returns the stage's throughput.'''
+        return self.rows / self.duration if self.duration else 0.0
+
+    def to_emf(self) -> dict:
+        '''Returns the measurements as an Embedded Metric Format document.'''
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": NAMESPACE,
+                    "Dimensions": [["Pipeline", "Stage"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, unit in METRICS]
+                }]
+            },
+            "Pipeline": self.pipeline,
+            "Stage": self.stage,
+            "Duration": round(self.duration, 4),
+            "Requests": self.requests,
+            "BytesReceived": self.bytes_received,
+            "Rows": self.rows,
+            "RowsPerSecond": round(self.rows_per_second, 2)
+        }
+
+
+@contextmanager
+def track_stage(pipeline: str, stage: str):
+    """Times the enclosed block as a pipeline stage and logs its metrics
+    on exit, including when the stage fails."""
+
+    metrics = StageMetrics(pipeline, stage)
+    _active_stages.append(metrics)
+    start = time.perf_counter()
+
+    try:
+        yield metrics
+    finally:
+        metrics.duration = time.perf_counter() - start
+        _active_stages.remove(metrics)
+        get_metrics_logger().info(json.dumps(metrics.to_emf()))
+
+
+def record_request(bytes_received: int = 0) -> None:
+    """Records a request against the innermost running stage, if any."""
+
+    if _active_stages:
+        _active_stages[-1].add_request(bytes_received)
@@ -0,0 +1,162 @@
+"""Throwaway Postgres database for benchmarks, built from database/schema.sql.
+Either creates a temporary database on an existing server given by a
+connection URL, or starts a temporary cluster with initdb and pg_ctl."""
+
+from contextlib import closing
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+from psycopg2 import connect
+from psycopg2.extensions import parse_dsn, ISOLATION_LEVEL_AUTOCOMMIT
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "..", "database", "schema.sql")
+DYNAMIC_TABLES = "solar_feature, aurora_alert, image, forecast, body_assignment"
+
+# Bounding box of the UK used to place synthetic regions and counties
+UK_LATITUDES = (50.0, 58.5)
+UK_LONGITUDES = (-7.5, 1.7)
+
+
+def get_free_port() -> int:
+    """Returns a free local TCP port."""
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_grid_point(n: int, total: int) -> tuple[float, float]:
+    """Returns the n-th of `total` points spread over the UK bounding box."""
+
+    columns = max(1, int(total ** 0.5))
+    row, column = divmod(n, columns)
+    rows = max(1, -(-total // columns))
+
+    latitude = UK_LATITUDES[0] + (UK_LATITUDES[1] - UK_LATITUDES[0]) * (row + 0.5) / rows
+    longitude = (UK_LONGITUDES[0]
+                 + (UK_LONGITUDES[1] - UK_LONGITUDES[0]) * (column + 0.5) / columns)
+
+    return round(latitude, 2), round(longitude, 2)
+
+
+class ThrowawayPostgres():
+    """Temporary database created from the project schema, used as a
+    context manager and removed on exit."""
+
+    def __init__(self, server_url: str = None):
+        """Uses the server at server_url if given, otherwise starts a
+        temporary local cluster."""
+        self.server_url = server_url
+        self.data_dir = None
+        self.server = {}
+        self.dbname = f"starwatch_bench_{os.getpid()}"
+
+    def __enter__(self):
+        '''Starts the server if needed and creates the schema.'''
+        if self.server_url:
+            self.server = parse_dsn(self.server_url)
+        else:
+            self.start_cluster()
+
+        with closing(self.connect_server()) as conn:
+            conn.cursor().execute(f"CREATE DATABASE {self.dbname};")
+
+        with closing(self.connect()) as conn, conn:
+            with open(SCHEMA_PATH, "r", encoding="utf-8") as f_obj:
+                conn.cursor().execute(f_obj.read())
+
+        logging.info("Benchmark database %s created.", self.dbname)
+        return self
+
+    def __exit__(self, *exc_info):
+        '''Drops the database and stops any temporary cluster.'''
+        with closing(self.connect_server()) as conn:
+            conn.cursor().execute(f"DROP DATABASE IF EXISTS {self.dbname} WITH (FORCE);")
+
+        if self.data_dir:
+            subprocess.run(["pg_ctl", "-D", self.data_dir, "-m", "fast", "stop"],
+                           check=True, capture_output=True)
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def start_cluster(self) -> None:
+        '''Initialises and starts a temporary cluster with trust auth.'''
+        if not shutil.which("initdb") or not shutil.which("pg_ctl"):
+            raise RuntimeError("initdb and pg_ctl were not found on PATH; "
+                               "pass --database-url to use an existing server.")
+
+        self.data_dir = tempfile.mkdtemp(prefix="starwatch_pg_")
+        port = get_free_port()
+
+        subprocess.run(["initdb", "-D", self.data_dir, "-U", "postgres",
+                        "--auth=trust"], check=True, capture_output=True)
+        subprocess.run(["pg_ctl", "-D", self.data_dir, "-w", "-l",
+                        os.path.join(self.data_dir, "server.log"),
+                        "-o", f"-p {port} -c listen_addresses=127.0.0.1 "
+                              f"-k {self.data_dir}", "start"],
+                       check=True, capture_output=True)
+
+        self.server = {"host": "127.0.0.1", "port": str(port), "user": "postgres",
+                       "password": "benchmark", "dbname": "postgres"}
+
+    def connect_server(self):
+        '''Returns an autocommit connection to the server's own database.'''
+        conn = connect(**self.server)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        return conn
+
+    def connect(self):
+        '''Returns a connection to the benchmark database.'''
+        return connect(**{**self.server, "dbname": self.dbname})
+
+    def get_env(self) -> dict:
+        '''Returns the DB_ environment variables the pipelines read.'''
+        return {"DB_HOST": self.server.get("host", "localhost"),
+                "DB_PORT": self.server.get("port", "5432"),
+                "DB_USER": self.server.get("user", "postgres"),
+                "DB_PASSWORD": self.server.get("password") or "benchmark",
+                "DB_NAME": self.dbname}
+
+    def scale(self, regions: int, counties: int) -> None:
+        '''Adds synthetic regions and counties until the tables hold at
+        least the given numbers of rows.'''
+        with closing(self.connect()) as conn, conn:
+            cur = conn.cursor()
+
+            cur.execute("SELECT COUNT(*) FROM region;")
+            existing = cur.fetchone()[0]
+            for n in range(existing, regions):
+                cur.execute("""INSERT INTO region (region_name, latitude, longitude)
+                               VALUES (%s, %s, %s);""",
+                            (f"Synthetic region {n + 1}", *get_grid_point(n, regions)))
+
+            cur.execute("SELECT COUNT(*) FROM region;")
+            region_count = cur.fetchone()[0]
+
+            cur.execute("SELECT COUNT(*) FROM county;")
+            existing = cur.fetchone()[0]
+            for n in range(existing, counties):
+                cur.execute("""INSERT INTO county (county_name, latitude, longitude, region_id)
+                               VALUES (%s, %s, %s, %s);""",
+                            (f"Synthetic county {n + 1}", *get_grid_point(n, counties),
+                             n % region_count + 1))
+
+    def truncate(self) -> None:
+        '''Empties the tables the pipelines write to.'''
+        with closing(self.connect()) as conn, conn:
+            conn.cursor().execute(f"TRUNCATE TABLE {DYNAMIC_TABLES};")
+
+    def count_rows(self) -> dict:
+        '''Returns the number of rows in each table the pipelines write to.'''
+        with closing(self.connect()) as conn, conn:
+            cur = conn.cursor()
+            counts = {}
+            for table in DYNAMIC_TABLES.split(", "):
+                cur.execute(f"SELECT COUNT(*) FROM {table};")
+                counts[table] = cur.fetchone()[0]
+
+        return counts
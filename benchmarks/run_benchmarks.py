@@ -0,0 +1,113 @@
+"""Benchmarks each pipeline offline. Starts the stub API server and a
+throwaway Postgres database, runs every pipeline in its own process and
+reports per stage timings, rows/s and peak RSS."""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+from bench_db import ThrowawayPostgres
+from run_pipeline import PIPELINES
+from stub_server import start_stub_server
+
+RUN_PIPELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_pipeline.py")
+
+
+def get_pipeline_env(db_env: dict, args: argparse.Namespace, run_dir: str) -> dict:
+    """Returns the environment a pipeline process runs with."""
+
+    return {**os.environ, **db_env,
+            "ASTRONOMY_ID": "benchmark",
+            "ASTRONOMY_SECRET": "benchmark",
+            "ASTRONOMY_CACHE": "off",
+            "OPENMETEO_CACHE": "off",
+            "ASTRONOMY_RATE_LIMIT": str(args.rate_limit),
+            "ASTRONOMY_RATE_BURST": str(args.rate_limit),
+            "CHECKPOINT_DIR": os.path.join(run_dir, "checkpoints"),
+            "PIPELINE_MODE": args.astronomy_mode,
+            "STAR_CHART_MODE": args.star_chart_mode}
+
+
+def run_benchmark(name: str, stub_url: str, env: dict) -> dict:
+    """Runs one pipeline in a fresh process and returns its results."""
+
+    process = subprocess.run([sys.executable, RUN_PIPELINE, name, stub_url],
+                             env=env, capture_output=True, text=True, check=False)
+
+    if process.returncode != 0 or not process.stdout.strip():
+        return {"pipeline": name, "stages": [], "peak_rss_mb": None,
+                "error": process.stderr[-2000:]}
+
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def print_results(results: list[dict]) -> None:
+    """Prints a table of every pipeline stage."""
+
+    header = (f"{'pipeline':<12}{'stage':<12}{'seconds':>10}{'requests':>10}"
+              f"{'MB in':>9}{'rows':>10}{'rows/s':>12}{'peak RSS MB':>13}")
+    print(header)
+    print("-" * len(header))
+
+    for result in results:
+        for stage in result["stages"]:
+            print(f"{result['pipeline']:<12}{stage['Stage']:<12}"
+                  f"{stage['Duration']:>10.3f}{stage['Requests']:>10}"
+                  f"{stage['BytesReceived'] / 1024 ** 2:>9.2f}{stage['Rows']:>10}"
+                  f"{stage['RowsPerSecond']:>12.0f}{result['peak_rss_mb'] or 0:>13.1f}")
+
+        if result["error"]:
+            print(f"{result['pipeline']:<12}failed:\n{result['error']}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Benchmark the StarWatch pipelines.")
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES,
+                        default=list(PIPELINES))
+    parser.add_argument("--regions", type=int, default=12,
+                        help="regions in the database, synthetic beyond the 12 seeded")
+    parser.add_argument("--counties", type=int, default=106,
+                        help="counties in the database, synthetic beyond the 106 seeded")
+    parser.add_argument("--days", type=int, default=7,
+                        help="days returned by the stub for each location")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--rate-limit", type=float, default=1000,
+                        help="Astronomy API requests per second allowed")
+    parser.add_argument("--astronomy-mode", choices=["batch", "stream"], default="batch")
+    parser.add_argument("--star-chart-mode", choices=["all", "visible"], default="all")
+    parser.add_argument("--database-url", default=os.environ.get("BENCHMARK_DATABASE_URL"),
+                        help="existing server to create the database on, "
+                             "otherwise a temporary cluster is started")
+    parser.add_argument("--output", help="file to write the results to as json")
+    args = parser.parse_args()
+
+    stub = start_stub_server(0, args.latency_ms, args.jitter_ms, args.days)
+    stub_url = f"http://127.0.0.1:{stub.server_port}"
+    results = []
+
+    with ThrowawayPostgres(args.database_url) as db, \
+            tempfile.TemporaryDirectory() as temp_dir:
+        db.scale(args.regions, args.counties)
+        env = get_pipeline_env(db.get_env(), args, temp_dir)
+
+        for pipeline in args.pipelines:
+            db.truncate()
+            logging.info("Benchmarking %s.", pipeline)
+            result = run_benchmark(pipeline, stub_url, env)
+            result["table_rows"] = db.count_rows()
+            results.append(result)
+
+    stub.shutdown()
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f_obj:
+            json.dump({"settings": vars(args), "results": results}, f_obj, indent=4)
@@ -0,0 +1,88 @@
+"""Runs one pipeline's Lambda handler against the stub server and prints
+its stage metrics and peak RSS as one JSON line. Started in its own
+process by run_benchmarks.py so each pipeline's memory is measured alone."""
+
+import argparse
+import importlib
+import json
+import logging
+import os
+import resource
+import sys
+import traceback
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Folder, handler module and the module constants holding each API's URL
+PIPELINES = {
+    "astronomy": ("astronomy-pipeline", "astronomy_pipeline",
+                  {"astronomy_extract": ("ASTRO_URL", "/api/v2")}),
+    "quadhoral": ("quadhoral-openmeteo", "quadhoral_lambda",
+                  {"quadhoral_extract": ("URL", "/v1/forecast")}),
+    "weekly": ("weekly-openmeteo", "pipeline",
+               {"extract": ("URL", "/v1/forecast")}),
+    "aurorawatch": ("aurorawatch-pipeline", "aurora_pipeline",
+                    {"aurora_extract": ("AURORA_WATCH_URL",
+                                        "/0.2/status/current-status.xml")})
+}
+
+
+class MetricsCollector(logging.Handler):
+    """Keeps the Embedded Metric Format lines logged by each stage."""
+
+    def __init__(self):
+        """Creates an empty collector."""
+        super().__init__()
+        self.stages = []
+
+    def emit(self, record):
+        '''Stores a stage's metrics.'''
+        self.stages.append(json.loads(record.getMessage()))
+
+
+def get_peak_rss_mb() -> float:
+    """Returns the peak resident set size of this process in MB."""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_pipeline(name: str, stub_url: str) -> dict:
+    """Runs a pipeline's handler with its API URLs pointed at the stub
+    server, returning the stage metrics collected."""
+
+    folder, handler_module, urls = PIPELINES[name]
+    pipeline_dir = os.path.join(ROOT, folder)
+    sys.path.insert(0, pipeline_dir)
+    os.chdir(pipeline_dir)
+
+    collector = MetricsCollector()
+    metrics_logger = logging.getLogger("starwatch.metrics")
+    metrics_logger.addHandler(collector)
+    metrics_logger.setLevel(logging.INFO)
+    metrics_logger.propagate = False
+
+    result = {"pipeline": name, "stages": collector.stages, "error": None}
+
+    try:
+        for module_name, (constant, path) in urls.items():
+            setattr(importlib.import_module(module_name), constant, f"{stub_url}{path}")
+
+        importlib.import_module(handler_module).lambda_handler({}, None)
+
+    except Exception:  # pylint: disable=W0718
+        result["error"] = traceback.format_exc(limit=3)
+
+    result["peak_rss_mb"] = round(get_peak_rss_mb(), 1)
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one pipeline for benchmarking.")
+    parser.add_argument("pipeline", choices=PIPELINES)
+    parser.add_argument("stub_url")
+    args = parser.parse_args()
+
+    print(json.dumps(run_pipeline(args.pipeline, args.stub_url)))
@@ -0,0 +1,178 @@
+"""Local stand-in for the Astronomy API, Open-Meteo and AuroraWatch UK.
+Replays the payloads in fixtures/ with a configurable latency, repeating
+them to the number of days and locations each request asks for."""
+
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name: str):
+    """Returns a fixture file, decoded if it is json."""
+
+    with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f_obj:
+        if name.endswith(".json"):
+            return json.load(f_obj)
+        return f_obj.read()
+
+
+def get_positions_payload(template: dict, params: dict, days: int) -> dict:
+    """Returns a body positions response with one cell per body per day,
+    varying the altitude so some bodies fall below the horizon."""
+
+    start = date.fromisoformat(params.get("from_date", [str(date.today())])[0])
+    at = params.get("time", ["18:00:00"])[0]
+
+    payload = copy.deepcopy(template)
+    for row in payload["data"]["table"]["rows"]:
+        base_cell = row["cells"][0]
+        cells = []
+
+        for n in range(days):
+            cell = copy.deepcopy(base_cell)
+            cell["date"] = f"{start + timedelta(days=n)}T{at}.000+00:00"
+            altitude = cell["position"]["horizontal"]["altitude"]
+            altitude["degrees"] = f"{float(altitude['degrees']) + (n * 7) % 21 - 10:.2f}"
+            cells.append(cell)
+
+        row["cells"] = cells
+
+    return payload
+
+
+def get_forecast_payload(hourly_template: dict, daily_template: dict,
+                         params: dict, days: int):
+    """Returns an Open-Meteo forecast for every requested location. Like the
+    real API, a single location gives an object and several give a list."""
+
+    latitudes = params.get("latitude", [])
+    longitudes = params.get("longitude", [])
+    today = datetime.combine(date.today(), datetime.min.time())
+
+    locations = []
+    for lat, long in zip(latitudes, longitudes):
+        if "hourly" in params:
+            location = copy.deepcopy(hourly_template)
+            hourly = location["hourly"]
+            for key, values in hourly.items():
+                hourly[key] = [values[n % len(values)] for n in range(24 * days)]
+            hourly["time"] = [(today + timedelta(hours=n)).strftime("%Y-%m-%dT%H:%M")
+                              for n in range(24 * days)]
+        else:
+            location = copy.deepcopy(daily_template)
+            daily = location["daily"]
+            sunrise = datetime.fromisoformat(daily["sunrise"][0]).time()
+            sunset = datetime.fromisoformat(daily["sunset"][0]).time()
+            day_list = [date.today() + timedelta(days=n) for n in range(days)]
+            daily["time"] = [str(day) for day in day_list]
+            daily["sunrise"] = [datetime.combine(day, sunrise).strftime("%Y-%m-%dT%H:%M")
+                                for day in day_list]
+            daily["sunset"] = [datetime.combine(day, sunset).strftime("%Y-%m-%dT%H:%M")
+                               for day in day_list]
+
+        location["latitude"] = float(lat)
+        location["longitude"] = float(long)
+        locations.append(location)
+
+    return locations if len(locations) != 1 else locations[0]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers requests from the fixtures of the server it belongs to."""
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        '''Keeps request logging out of the benchmark output.'''
+
+    def send_payload(self, payload, content_type: str = "application/json") -> None:
+        '''Waits for the configured latency, then sends the payload.'''
+        latency = self.server.latency + random.uniform(0, self.server.jitter)
+        time.sleep(latency)
+
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        body = body.encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):  # pylint: disable=C0103
+        '''Routes get requests to the matching fixture.'''
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        fixtures = self.server.fixtures
+
+        if url.path.endswith("/bodies/positions"):
+            self.send_payload(get_positions_payload(fixtures["positions"], params,
+                                                    self.server.days))
+        elif url.path.endswith("/forecast"):
+            self.send_payload(get_forecast_payload(fixtures["hourly"], fixtures["daily"],
+                                                   params, self.server.days))
+        elif url.path.endswith("current-status.xml"):
+            self.send_payload(fixtures["aurora"], "application/xml")
+        else:
+            self.send_error(404)
+
+    def do_POST(self):  # pylint: disable=C0103
+        '''Routes post requests to the matching fixture.'''
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if self.path.endswith("/studio/moon-phase"):
+            self.send_payload(self.server.fixtures["moon_phase"])
+        elif self.path.endswith("/studio/star-chart"):
+            self.send_payload(self.server.fixtures["star_chart"])
+        else:
+            self.send_error(404)
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 0, jitter_ms: float = 0,
+                      days: int = 7) -> ThreadingHTTPServer:
+    """Starts the stub server in a background thread and returns it.
+    Port 0 picks a free port, available as server.server_port."""
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency_ms / 1000
+    server.jitter = jitter_ms / 1000
+    server.days = days
+    server.fixtures = {
+        "positions": load_fixture("astronomy_positions.json"),
+        "moon_phase": load_fixture("astronomy_moon_phase.json"),
+        "star_chart": load_fixture("astronomy_star_chart.json"),
+        "hourly": load_fixture("openmeteo_hourly.json"),
+        "daily": load_fixture("openmeteo_daily.json"),
+        "aurora": load_fixture("aurorawatch_status.xml")
+    }
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info("Stub server listening on port %s.", server.server_port)
+
+    return server
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Serve recorded API payloads locally.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args()
+
+    stub = start_stub_server(args.port, args.latency_ms, args.jitter_ms, args.days)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        stub.shutdown()
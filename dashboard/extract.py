@@ -5,6 +5,7 @@ from dotenv import load_dotenv
 from psycopg2 import connect
 from requests import get
 from api_error import APIError
+from openmeteo_cache import ResponseCache
 
 URL = "https://api.open-meteo.com/v1/forecast"
 
@@ -34,9 +35,12 @@ def convert_to_params(long: list[int], lat: list[int]):
     raise TypeError('Queried data is wrong datatype')
 
 
-def request_solar_data(params: dict) -> list:
-    '''Returns the solar data for the given set of coordinates'''
-    response = get(URL, params=params, timeout=10)
+def request_solar_data(params: dict, cache: ResponseCache = None) -> list:
+    '''Returns the solar data for the given set of coordinates, through the cache if given'''
+    if cache:
+        response = cache.get(get, URL, params, timeout=10)
+    else:
+        response = get(URL, params=params, timeout=10)
     logging.info('Request sent.')
 
     if response.status_code == 200:
@@ -59,10 +63,15 @@ def request_solar_data(params: dict) -> list:
 
 
 def extract() -> list:
-    '''Runs extract pipeline'''
+    '''Runs extract pipeline, closing the response cache afterwards'''
     longitude, latitude = get_county_coordinates()
     parameters = convert_to_params(longitude, latitude)
-    return request_solar_data(parameters)
+    cache = ResponseCache.from_env()
+    try:
+        return request_solar_data(parameters, cache)
+    finally:
+        if cache:
+            cache.close()
 
 
 if __name__ == '__main__':
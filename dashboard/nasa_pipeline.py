@@ -4,9 +4,10 @@ from os import environ as ENV
 import sys
 import os
 import logging
-from datetime import datetime as dt
+from datetime import datetime as dt, date
 from dotenv import load_dotenv
 from requests import get
+import streamlit as st
 
 sys.path.append(os.path.abspath(os.path.join(
     os.path.dirname(__file__), '..', 'weekly-openmeteo')))
@@ -14,6 +15,7 @@ from api_error import APIError
 from extract import get_connection
 
 KEYS = ['data','title','url']
+MOON_PHASE_TTL = 600
 
 def get_image_of_the_day() -> str:
     query = """SELECT image_name,image_url FROM image
@@ -25,16 +27,20 @@ def get_image_of_the_day() -> str:
             data = cur.fetchone()
     return data
 
-def get_moon_phase() -> str:
-    '''Returns todays moon phase'''
+@st.cache_data(ttl=MOON_PHASE_TTL, show_spinner=False)
+def get_moon_phase(day: date = None) -> str:
+    '''Returns the moon phase image for a day, by default today in the
+    database's time zone. Results are cached for ten minutes, as one
+    image serves every region and session.'''
     query = """SELECT image_url FROM image
     WHERE image_name = 'moon_phase' AND
-    image_date = CURRENT_DATE"""
+    image_date = COALESCE(%s, CURRENT_DATE)"""
     with get_connection() as conn:
         with conn.cursor() as cur:
-            cur.execute(query)
+            cur.execute(query,(day,))
             data = cur.fetchone()
-    return data[0]
+
+    return data[0] if data else None
 
 
 def has_nasa_image() -> bool:
@@ -0,0 +1,185 @@
+'''Persistent HTTP cache for Open-Meteo responses. A response is reused
+until the expiry given by its Cache-Control or Expires headers, then
+revalidated with its ETag. Responses without caching headers expire when
+the next weather model run is expected to be published. The cache also
+keeps the hash of the last payload each pipeline loaded, so an unchanged
+forecast can skip the transform and load.'''
+from os import environ as ENV
+from email.utils import parsedate_to_datetime
+from typing import Callable
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from requests import Response
+
+CACHE_PATH = '/tmp/openmeteo_cache.sqlite'
+# Model runs start every MODEL_RUN_INTERVAL hours from 00 UTC and are
+# published about MODEL_RUN_DELAY hours later
+MODEL_RUN_INTERVAL = 6
+MODEL_RUN_DELAY = 2
+
+
+def make_cache_key(url: str, params: dict) -> str:
+    '''Returns a content hash for a request'''
+    payload = json.dumps({'url': url, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_payload_hash(data: list[dict], section: str) -> str:
+    '''Returns a hash of each county's id and `section` values, leaving out
+    fields such as generationtime_ms that change on every request'''
+    payload = json.dumps([[county.get('county_id'), county[section]] for county in data],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def get_model_run_expiry(now: float, interval: float = MODEL_RUN_INTERVAL,
+                         delay: float = MODEL_RUN_DELAY) -> float:
+    '''Returns when the model run after the latest published one is expected'''
+    interval, delay = interval * 3600, delay * 3600
+    latest_run = (now - delay) // interval * interval
+    return latest_run + interval + delay
+
+def parse_cache_control(header: str) -> dict:
+    '''Returns the directives of a Cache-Control header'''
+    directives = {}
+    for directive in header.split(','):
+        name, _, value = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+class ResponseCache:
+    '''SQLite backed HTTP response cache, safe to share between threads'''
+
+    def __init__(self, path: str = CACHE_PATH, interval: float = MODEL_RUN_INTERVAL,
+                 delay: float = MODEL_RUN_DELAY):
+        '''Opens the cache file, creating the tables if needed'''
+        self.interval = interval
+        self.delay = delay
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS response (
+                             cache_key TEXT PRIMARY KEY,
+                             body BLOB NOT NULL,
+                             etag TEXT,
+                             last_modified TEXT,
+                             expires_at REAL NOT NULL)''')
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS run (
+                             pipeline TEXT PRIMARY KEY,
+                             payload_hash TEXT NOT NULL,
+                             loaded_at REAL NOT NULL)''')
+        self.conn.commit()
+
+    @classmethod
+    def from_env(cls):
+        '''Returns a cache configured from the environment, or None if
+        caching is disabled'''
+        if ENV.get('OPENMETEO_CACHE', 'on').lower() == 'off':
+            return None
+
+        return cls(ENV.get('OPENMETEO_CACHE_PATH', CACHE_PATH),
+                   float(ENV.get('OPENMETEO_MODEL_RUN_INTERVAL', MODEL_RUN_INTERVAL)),
+                   float(ENV.get('OPENMETEO_MODEL_RUN_DELAY', MODEL_RUN_DELAY)))
+
+    def get_expiry(self, response: Response, now: float) -> float:
+        '''Returns when a response expires, or None if it must not be stored'''
+        directives = parse_cache_control(response.headers.get('Cache-Control', ''))
+
+        if 'no-store' in directives:
+            return None
+        if 'no-cache' in directives:
+            return now
+        if directives.get('max-age', '').isdigit():
+            return now + int(directives['max-age']) - int(response.headers.get('Age', 0))
+        if 'Expires' in response.headers:
+            try:
+                return parsedate_to_datetime(response.headers['Expires']).timestamp()
+            except (TypeError, ValueError):
+                return now
+
+        return get_model_run_expiry(now, self.interval, self.delay)
+
+    @staticmethod
+    def make_response(url: str, body: bytes) -> Response:
+        '''Returns a successful response holding a cached body'''
+        response = Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body  # pylint: disable=W0212
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    def store(self, key: str, response: Response, body: bytes, now: float,
+              validators: tuple = (None, None)) -> None:
+        '''Stores or refreshes a response body unless it must not be stored,
+        keeping the given ETag and Last-Modified if the response has none'''
+        expires_at = self.get_expiry(response, now)
+        with self.lock:
+            if expires_at is None:
+                self.conn.execute('DELETE FROM response WHERE cache_key = ?', (key,))
+            else:
+                self.conn.execute('INSERT OR REPLACE INTO response VALUES (?, ?, ?, ?, ?)',
+                                  (key, body, response.headers.get('ETag', validators[0]),
+                                   response.headers.get('Last-Modified', validators[1]),
+                                   expires_at))
+            self.conn.commit()
+
+    def get(self, send: Callable, url: str, params: dict, timeout: float) -> Response:
+        '''Returns the response for a GET request sent through `send`, from the
+        cache while it is fresh and revalidated with its ETag once stale'''
+        key = make_cache_key(url, params)
+        now = time.time()
+
+        with self.lock:
+            row = self.conn.execute('''SELECT body, etag, last_modified, expires_at
+                                       FROM response WHERE cache_key = ?''', (key,)).fetchone()
+
+        if row and now < row[3]:
+            self.hits += 1
+            return self.make_response(url, row[0])
+
+        headers = {}
+        if row and row[1]:
+            headers['If-None-Match'] = row[1]
+        if row and row[2]:
+            headers['If-Modified-Since'] = row[2]
+
+        response = send(url, params=params, timeout=timeout, headers=headers)
+
+        if response.status_code == 304 and row:
+            self.revalidated += 1
+            self.store(key, response, row[0], now, (row[1], row[2]))
+            return self.make_response(url, row[0])
+
+        self.misses += 1
+        if response.status_code == 200:
+            self.store(key, response, response.content, now)
+
+        return response
+
+    def get_run_hash(self, pipeline: str) -> str:
+        '''Returns the hash of the payload the pipeline last loaded'''
+        with self.lock:
+            row = self.conn.execute('SELECT payload_hash FROM run WHERE pipeline = ?',
+                                    (pipeline,)).fetchone()
+        return row[0] if row else None
+
+    def set_run_hash(self, pipeline: str, payload_hash: str) -> None:
+        '''Records the hash of the payload the pipeline has loaded'''
+        with self.lock:
+            self.conn.execute('INSERT OR REPLACE INTO run VALUES (?, ?, ?)',
+                              (pipeline, payload_hash, time.time()))
+            self.conn.commit()
+
+    def close(self) -> None:
+        '''Logs the hit rate and closes the cache file'''
+        logging.info('Open-Meteo cache hits: %s, revalidated: %s, misses: %s',
+                     self.hits, self.revalidated, self.misses)
+        self.conn.close()
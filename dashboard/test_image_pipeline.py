@@ -1,10 +1,11 @@
 '''Contains tests for the image pipeline'''
 # pylint: disable=C0121,R0903
 from unittest.mock import patch, MagicMock
-from datetime import datetime as dt
+from datetime import datetime as dt, date
 import pytest
 from nasa_pipeline import (has_nasa_image, extract_time, get_nasa_image,
-                           load_image, nasa_pipeline, get_iss_location)
+                           load_image, nasa_pipeline, get_iss_location,
+                           get_moon_phase)
 from api_error import APIError
 
 NASA_API_URL = 'https://api.nasa.gov/planetary/apod?api_key=YOUR_API_KEY'
@@ -36,6 +37,40 @@ class TestHasNasaImage:
         assert has_nasa_image() == False
 
 
+class TestGetMoonPhase:
+    '''Contains tests for the get moon phase function'''
+    def setup_method(self):
+        '''Empties the moon phase cache'''
+        get_moon_phase.clear()
+
+    @patch('nasa_pipeline.get_connection')
+    def test_get_moon_phase_reuses_found_image(self, mock_get_connection):
+        '''Tests that a day's image is queried once and then reused'''
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = ['moon_url']
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_get_connection.return_value.__enter__.return_value = mock_conn
+
+        assert get_moon_phase(date(2024, 10, 10)) == 'moon_url'
+        assert get_moon_phase(date(2024, 10, 10)) == 'moon_url'
+        assert mock_cursor.execute.call_count == 1
+        assert mock_cursor.execute.call_args.args[1] == (date(2024, 10, 10),)
+
+    @patch('nasa_pipeline.get_connection')
+    def test_get_moon_phase_today_from_database(self, mock_get_connection):
+        '''Tests that today is left to the database's CURRENT_DATE'''
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = None
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_get_connection.return_value.__enter__.return_value = mock_conn
+
+        assert get_moon_phase() is None
+        assert 'CURRENT_DATE' in mock_cursor.execute.call_args.args[0]
+        assert mock_cursor.execute.call_args.args[1] == (None,)
+
+
 class TestExtractTime:
     '''Contains tests for the extract time function'''
 
@@ -0,0 +1,428 @@
+"""Synthetic data generator for the dynamic tables. Fills the database with
+production scale history (hourly forecasts, body positions and aurora
+alerts, daily sunrise and sunset times, and subscribers) drawn from
+realistic distributions, loading each table with COPY."""
+
+from os import environ as ENV
+from datetime import datetime, timedelta
+from typing import Callable, Iterator
+import argparse
+import csv
+import io
+import logging
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from psycopg2 import connect, extensions
+
+HOUR = np.timedelta64(1, "h")
+J2000 = np.datetime64("2000-01-01T12:00")
+OBLIQUITY = np.radians(23.44)
+VISIBLE_ALTITUDE = 5
+KM_PER_AU = 149_597_871
+
+# Orbital period in days, ecliptic longitude at J2000 in degrees and
+# distance from Earth in km (mean, variation over the period)
+BODY_ORBITS = {
+    "Sun": (365.256, 280.5, (149_598_000, -2_500_000)),
+    "Moon": (27.322, 218.3, (384_400, 21_000)),
+    "Mercury": (115.88, 252.3, (0.39 * KM_PER_AU, 0.39 * KM_PER_AU)),
+    "Venus": (583.92, 181.98, (1.0 * KM_PER_AU, 0.72 * KM_PER_AU)),
+    "Mars": (686.98, 355.4, (1.52 * KM_PER_AU, 1.0 * KM_PER_AU)),
+    "Jupiter": (4332.6, 34.4, (5.2 * KM_PER_AU, 1.0 * KM_PER_AU)),
+    "Saturn": (10759.2, 50.1, (9.54 * KM_PER_AU, 1.0 * KM_PER_AU)),
+    "Uranus": (30688.5, 314.0, (19.2 * KM_PER_AU, 1.0 * KM_PER_AU)),
+    "Neptune": (60182.0, 304.9, (30.1 * KM_PER_AU, 1.0 * KM_PER_AU)),
+    "Pluto": (90560.0, 238.9, (39.5 * KM_PER_AU, 1.0 * KM_PER_AU))
+}
+# Zodiac constellations in 30 degree steps of ecliptic longitude from 0
+ZODIAC = ["Psc", "Ari", "Tau", "Gem", "Cnc", "Leo",
+          "Vir", "Lib", "Sco", "Sgr", "Cap", "Aqr"]
+# Chance of moving from each aurora colour (row) to each colour (column)
+AURORA_TRANSITIONS = np.array([[0.97, 0.027, 0.0025, 0.0005],
+                               [0.35, 0.55, 0.09, 0.01],
+                               [0.10, 0.40, 0.42, 0.08],
+                               [0.05, 0.15, 0.40, 0.40]])
+# Shares of subscribers with a phone and email, only a phone, only an email
+CONTACT_SHARES = [0.6, 0.25, 0.15]
+MAX_COUNTIES_PER_SUBSCRIBER = 5
+
+FORECAST_COLUMNS = ("county_id", "temperature_c", "precipitation_probability_percent",
+                    "precipitation_mm", "cloud_coverage_percent", "visibility_m", "at")
+BODY_ASSIGNMENT_COLUMNS = ("region_id", "body_id", "at", "azimuth", "altitude",
+                           "distance_km", "constellation_id")
+SOLAR_FEATURE_COLUMNS = ("county_id", "sunrise_timestamp", "sunset_timestamp")
+AURORA_ALERT_COLUMNS = ("alert_time", "aurora_colour_id")
+SUBSCRIBER_COLUMNS = ("subscriber_username", "subscriber_phone", "subscriber_email")
+SUBSCRIBER_COUNTY_COLUMNS = ("subscriber_id", "county_id")
+
+load_dotenv()
+
+
+def get_db_connection() -> extensions.connection:
+    """Reusable function for getting a database connection."""
+
+    return connect(dbname=ENV["DB_NAME"],
+                   host=ENV["DB_HOST"],
+                   password=ENV.get("DB_PASSWORD"),
+                   user=ENV["DB_USER"],
+                   port=ENV["DB_PORT"])
+
+
+def get_dimensions(cur) -> dict:
+    """Returns the static rows the generators build on, the number of
+    synthetic subscribers already loaded and the ids of those not yet
+    assigned any county."""
+
+    cur.execute("SELECT county_id, latitude, longitude FROM county ORDER BY county_id;")
+    counties = np.array(cur.fetchall(), dtype=float).reshape(-1, 3)
+    cur.execute("SELECT region_id, latitude, longitude FROM region ORDER BY region_id;")
+    regions = np.array(cur.fetchall(), dtype=float).reshape(-1, 3)
+    cur.execute("SELECT body_name, body_id FROM body;")
+    bodies = dict(cur.fetchall())
+    cur.execute("SELECT constellation_short_name, constellation_id FROM constellation;")
+    constellations = dict(cur.fetchall())
+    cur.execute("""SELECT subscriber_id FROM subscriber
+                   WHERE subscriber_username LIKE 'synthetic%'
+                   AND NOT EXISTS (SELECT 1 FROM subscriber_county_assignment
+                                   WHERE subscriber_county_assignment.subscriber_id
+                                         = subscriber.subscriber_id)
+                   ORDER BY subscriber_id;""")
+    subscribers = np.array([row[0] for row in cur.fetchall()], dtype=np.int64)
+    cur.execute("""SELECT COUNT(*) FROM subscriber
+                   WHERE subscriber_username LIKE 'synthetic%';""")
+
+    return {"counties": counties, "regions": regions, "bodies": bodies,
+            "constellations": constellations, "subscribers": subscribers,
+            "synthetic_subscribers": cur.fetchone()[0]}
+
+
+def get_hours(start: np.datetime64, end: np.datetime64) -> Iterator[np.ndarray]:
+    """Yields the hourly timestamps between start and end a day at a time."""
+
+    day_start = start.astype("datetime64[h]")
+    end = end.astype("datetime64[h]")
+
+    while day_start < end:
+        day_end = min(day_start + 24 * HOUR, end)
+        yield np.arange(day_start, day_end, HOUR)
+        day_start = day_end
+
+
+def get_forecast_rows(hours: np.ndarray, counties: np.ndarray,
+                      rng: np.random.Generator) -> list[tuple]:
+    """Returns a forecast for every county at every hour. Temperature follows
+    the season, time of day and latitude; cloud cover persists through the
+    day and drives the chance of rain, rainfall and visibility."""
+
+    shape = (len(counties), len(hours))
+    day_of_year = (hours.astype("datetime64[D]")
+                   - hours.astype("datetime64[Y]")).astype(int)
+    hour_of_day = (hours - hours.astype("datetime64[D]")).astype(int)
+    latitude = counties[:, 1:2]
+
+    temperature = (10 - 0.6 * (latitude - 50)
+                   + 6 * np.cos(2 * np.pi * (day_of_year - 201) / 365.25)
+                   + 3.5 * np.cos(2 * np.pi * (hour_of_day - 15) / 24)
+                   + rng.normal(0, 2, shape))
+
+    daily_cloud = rng.beta(2.2, 1.4, (len(counties), 1)) * 100
+    cloud = np.clip(daily_cloud + rng.normal(0, 10, shape), 0, 100)
+
+    rain_chance = np.clip(0.8 * cloud - 20 + rng.normal(0, 10, shape), 0, 100)
+    raining = rng.random(shape) * 100 < rain_chance
+    rainfall = np.where(raining, rng.gamma(0.7, 1.2, shape), 0)
+
+    visibility = np.exp(rng.normal(np.log(24000), 0.5, shape))
+    visibility = np.clip(np.where(raining, visibility * 0.4, visibility), 100, 50000)
+
+    return list(zip(np.repeat(counties[:, 0].astype(int), len(hours)),
+                    temperature.round(1).ravel(),
+                    rain_chance.astype(int).ravel(),
+                    rainfall.round(1).ravel(),
+                    cloud.astype(int).ravel(),
+                    visibility.astype(int).ravel(),
+                    np.tile(hours.astype("datetime64[m]").astype(str), len(counties))))
+
+
+def get_body_assignment_rows(hours: np.ndarray, regions: np.ndarray, bodies: dict,
+                             constellations: dict) -> list[tuple]:
+    """Returns the position of every body from every region at every hour
+    where it is above the horizon, as the astronomy pipeline stores them.
+    Bodies move along the ecliptic on circular orbits, which gives realistic
+    rising, setting and constellation changes rather than exact ephemerides."""
+
+    days = (hours - J2000) / np.timedelta64(1, "D")
+    sidereal = np.radians(280.46061837 + 360.98564736629 * days)
+    latitude = np.radians(regions[:, 1:2])
+    longitude = np.radians(regions[:, 2:3])
+    timestamps = hours.astype("datetime64[m]").astype(str)
+    rows = []
+
+    for name, (period, epoch_longitude, (distance, variation)) in BODY_ORBITS.items():
+        if name not in bodies:
+            continue
+
+        ecliptic = np.radians(epoch_longitude + 360 * days / period) % (2 * np.pi)
+        right_ascension = np.arctan2(np.sin(ecliptic) * np.cos(OBLIQUITY), np.cos(ecliptic))
+        declination = np.arcsin(np.sin(OBLIQUITY) * np.sin(ecliptic))
+        hour_angle = sidereal + longitude - right_ascension
+
+        altitude = np.degrees(np.arcsin(
+            np.sin(latitude) * np.sin(declination)
+            + np.cos(latitude) * np.cos(declination) * np.cos(hour_angle)))
+        azimuth = np.degrees(np.arctan2(
+            -np.sin(hour_angle),
+            np.tan(declination) * np.cos(latitude)
+            - np.sin(latitude) * np.cos(hour_angle))) % 360
+        distance_km = distance + variation * np.cos(2 * np.pi * days / period)
+        constellation = np.array([constellations.get(ZODIAC[int(value // (np.pi / 6)) % 12])
+                                  for value in ecliptic], dtype=object)
+
+        region_rows, hour_rows = np.nonzero(altitude > VISIBLE_ALTITUDE)
+        rows.extend(zip(regions[region_rows, 0].astype(int).tolist(),
+                        [bodies[name]] * len(region_rows),
+                        timestamps[hour_rows],
+                        azimuth[region_rows, hour_rows].round(2).tolist(),
+                        altitude[region_rows, hour_rows].round(2).tolist(),
+                        distance_km[hour_rows].round(1).tolist(),
+                        constellation[hour_rows]))
+
+    return rows
+
+
+def get_solar_feature_rows(days: np.ndarray, counties: np.ndarray) -> list[tuple]:
+    """Returns each county's sunrise and sunset in UTC for each day, from the
+    sun's declination and the equation of time."""
+
+    day_of_year = (days - days.astype("datetime64[Y]")).astype(int) + 1
+    declination = np.radians(23.44) * np.sin(2 * np.pi * (284 + day_of_year) / 365)
+    angle = 2 * np.pi * (day_of_year - 81) / 364
+    equation_of_time = (9.87 * np.sin(2 * angle) - 7.53 * np.cos(angle)
+                        - 1.5 * np.sin(angle))
+
+    latitude = np.radians(counties[:, 1:2])
+    cos_hour_angle = ((np.sin(np.radians(-0.833)) - np.sin(latitude) * np.sin(declination))
+                      / (np.cos(latitude) * np.cos(declination)))
+    half_day_minutes = np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1))) * 4
+    noon_minutes = 720 - counties[:, 2:3] * 4 - equation_of_time
+
+    midnight = days.astype("datetime64[m]")
+    sunrise = midnight + (noon_minutes - half_day_minutes).astype("timedelta64[m]")
+    sunset = midnight + (noon_minutes + half_day_minutes).astype("timedelta64[m]")
+
+    return list(zip(np.repeat(counties[:, 0].astype(int), len(days)),
+                    sunrise.astype(str).ravel(), sunset.astype(str).ravel()))
+
+
+def get_aurora_colours(count: int, rng: np.random.Generator) -> np.ndarray:
+    """Returns a sequence of aurora colour ids from a Markov chain, so alerts
+    are mostly green with occasional storms that build and fade."""
+
+    cumulative = AURORA_TRANSITIONS.cumsum(axis=1)
+    draws = rng.random(count)
+    colours = np.empty(count, dtype=int)
+    colour = 0
+
+    for n, draw in enumerate(draws):
+        colour = min(int(np.searchsorted(cumulative[colour], draw, side="right")), 3)
+        colours[n] = colour + 1
+
+    return colours
+
+
+def generate_forecasts(settings: dict, dimensions: dict,
+                       rng: np.random.Generator) -> Iterator[list[tuple]]:
+    """Yields a day of hourly forecasts for every county at a time."""
+
+    for hours in get_hours(settings["start"], settings["end"]):
+        yield get_forecast_rows(hours, dimensions["counties"], rng)
+
+
+def generate_body_assignments(settings: dict, dimensions: dict,
+                              rng: np.random.Generator) -> Iterator[list[tuple]]:  # pylint: disable=W0613
+    """Yields a day of hourly body positions for every region at a time."""
+
+    for hours in get_hours(settings["start"], settings["end"]):
+        yield get_body_assignment_rows(hours, dimensions["regions"],
+                                       dimensions["bodies"], dimensions["constellations"])
+
+
+def generate_solar_features(settings: dict, dimensions: dict,
+                            rng: np.random.Generator) -> Iterator[list[tuple]]:  # pylint: disable=W0613
+    """Yields a month of sunrise and sunset times at a time."""
+
+    days = np.arange(settings["start"].astype("datetime64[D]"),
+                     settings["end"].astype("datetime64[D]"))
+
+    for start in range(0, len(days), 31):
+        yield get_solar_feature_rows(days[start:start + 31], dimensions["counties"])
+
+
+def generate_aurora_alerts(settings: dict, dimensions: dict,
+                           rng: np.random.Generator) -> Iterator[list[tuple]]:  # pylint: disable=W0613
+    """Yields one alert an hour, as the aurora pipeline records them, with a
+    few minutes of jitter on each run."""
+
+    hours = np.arange(settings["start"].astype("datetime64[h]"),
+                      settings["end"].astype("datetime64[h]"), HOUR)
+    times = (hours.astype("datetime64[s]")
+             + rng.integers(0, 300, len(hours)).astype("timedelta64[s]"))
+
+    yield list(zip(times.astype(str), get_aurora_colours(len(hours), rng)))
+
+
+def generate_subscribers(settings: dict, dimensions: dict,
+                         rng: np.random.Generator) -> Iterator[list[tuple]]:
+    """Yields subscribers with a UK mobile number, an email or both,
+    numbered on from any synthetic subscribers already loaded."""
+
+    first = dimensions["synthetic_subscribers"]
+    chunk_size = settings["chunk_size"]
+
+    for start in range(first, first + settings["subscribers"], chunk_size):
+        count = min(chunk_size, first + settings["subscribers"] - start)
+        contact = rng.choice(3, count, p=CONTACT_SHARES)
+        numbers = rng.integers(0, 10 ** 9, count)
+
+        rows = []
+        for n, (kind, number) in enumerate(zip(contact, numbers)):
+            username = f"synthetic{start + n}"
+            rows.append((username,
+                         f"+447{number:09d}" if kind in (0, 1) else None,
+                         f"{username}@example.com" if kind in (0, 2) else None))
+        yield rows
+
+
+def generate_subscriber_counties(settings: dict, dimensions: dict,
+                                 rng: np.random.Generator) -> Iterator[list[tuple]]:
+    """Yields one to five distinct counties for every synthetic subscriber
+    without any, so a rerun only assigns the subscribers it generated. Most
+    follow one county, and a few popular counties have most subscribers."""
+
+    county_ids = rng.permutation(dimensions["counties"][:, 0].astype(int))
+    log_popularity = -np.log(np.arange(1, len(county_ids) + 1))
+    subscribers = dimensions["subscribers"]
+    chunk_size = settings["chunk_size"] // MAX_COUNTIES_PER_SUBSCRIBER
+
+    for start in range(0, len(subscribers), chunk_size):
+        chunk = subscribers[start:start + chunk_size]
+        counts = np.minimum(1 + rng.poisson(0.4, len(chunk)),
+                            min(MAX_COUNTIES_PER_SUBSCRIBER, len(county_ids)))
+
+        # Sorting Gumbel perturbed log weights samples without replacement
+        keys = log_popularity + rng.gumbel(size=(len(chunk), len(county_ids)))
+        chosen = np.argsort(-keys, axis=1)[:, :MAX_COUNTIES_PER_SUBSCRIBER]
+
+        yield [(int(subscriber_id), int(county_ids[county]))
+               for subscriber_id, count, counties in zip(chunk, counts, chosen)
+               for county in counties[:count]]
+
+
+# Loaded in order, so subscribers exist before their county assignments
+GENERATORS: dict[str, tuple[tuple, Callable]] = {
+    "aurora_alert": (AURORA_ALERT_COLUMNS, generate_aurora_alerts),
+    "solar_feature": (SOLAR_FEATURE_COLUMNS, generate_solar_features),
+    "forecast": (FORECAST_COLUMNS, generate_forecasts),
+    "body_assignment": (BODY_ASSIGNMENT_COLUMNS, generate_body_assignments),
+    "subscriber": (SUBSCRIBER_COLUMNS, generate_subscribers),
+    "subscriber_county_assignment": (SUBSCRIBER_COUNTY_COLUMNS,
+                                     generate_subscriber_counties)
+}
+
+
+def copy_rows(cur, table: str, columns: tuple, rows: list[tuple]) -> int:
+    '''Streams rows into a table with COPY through an in memory CSV
+    buffer, returning the number of rows copied. None becomes NULL.'''
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer)
+
+    return len(rows)
+
+
+def load_table(conn: extensions.connection, table: str, settings: dict,
+               rng: np.random.Generator) -> int:
+    """Generates and copies a table's rows in chunks, committing once the
+    whole table is loaded. Returns the number of rows loaded."""
+
+    columns, generator = GENERATORS[table]
+    start = time.perf_counter()
+    loaded = 0
+
+    with conn.cursor() as cur:
+        dimensions = get_dimensions(cur)
+        pending = []
+
+        for rows in generator(settings, dimensions, rng):
+            pending.extend(rows)
+            if len(pending) >= settings["chunk_size"]:
+                loaded += copy_rows(cur, table, columns, pending)
+                pending = []
+
+        loaded += copy_rows(cur, table, columns, pending)
+
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    logging.info("Loaded %s rows into %s in %.1fs (%.0f rows/s).",
+                 loaded, table, elapsed, loaded / elapsed if elapsed else 0)
+
+    return loaded
+
+
+def generate_data(settings: dict, tables: list[str], truncate: bool = False) -> dict:
+    """Fills the given tables with synthetic data, returning the number of
+    rows loaded into each."""
+
+    rng = np.random.default_rng(settings["seed"])
+    tables = [table for table in GENERATORS if table in tables]
+
+    with get_db_connection() as conn:
+        if truncate:
+            with conn.cursor() as cur:
+                cur.execute(f"TRUNCATE TABLE {', '.join(tables)} RESTART IDENTITY CASCADE;")
+            logging.info("Truncated %s.", ", ".join(tables))
+
+        loaded = {table: load_table(conn, table, settings, rng) for table in tables}
+
+    conn.close()
+
+    return loaded
+
+
+def get_settings(args: argparse.Namespace) -> dict:
+    """Returns the generator settings for the command line arguments."""
+
+    end = datetime.now().replace(minute=0, second=0, microsecond=0)
+    end += timedelta(days=args.days_ahead)
+    start = end - timedelta(days=round(args.years * 365.25) + args.days_ahead)
+
+    return {"start": np.datetime64(start, "h"), "end": np.datetime64(end, "h"),
+            "subscribers": args.subscribers, "seed": args.seed,
+            "chunk_size": args.chunk_size}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic data.")
+    parser.add_argument("--years", type=float, default=1,
+                        help="years of history to generate up to now")
+    parser.add_argument("--days-ahead", type=int, default=7,
+                        help="days of forecasts and positions after now")
+    parser.add_argument("--subscribers", type=int, default=100_000)
+    parser.add_argument("--tables", nargs="+", choices=GENERATORS, default=list(GENERATORS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="rows sent in each COPY")
+    parser.add_argument("--truncate", action="store_true",
+                        help="empty the tables first, restarting their ids")
+    arguments = parser.parse_args()
+
+    generate_data(get_settings(arguments), arguments.tables, arguments.truncate)
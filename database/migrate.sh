@@ -0,0 +1,7 @@
+source .env
+export PGPASSWORD=$DB_PASSWORD
+if [ -z "$1" ]; then
+  echo "Please provide the path of a migration file as an argument."
+  exit 1
+fi
+psql -h $DB_HOST -p $DB_PORT -U $DB_USER $DB_NAME -v ON_ERROR_STOP=1 -f "$1"
\ No newline at end of file
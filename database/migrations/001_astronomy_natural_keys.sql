@@ -0,0 +1,30 @@
+-- Adds the natural keys used by the astronomy pipeline's upsert load.
+-- Duplicate rows left by earlier reruns are removed first, keeping the latest.
+-- UNIQUE NULLS NOT DISTINCT requires PostgreSQL 15 or later.
+
+BEGIN;
+
+DELETE FROM body_assignment AS a
+USING body_assignment AS b
+WHERE a.region_id = b.region_id
+AND a.body_id = b.body_id
+AND a.at = b.at
+AND a.assignment_id < b.assignment_id;
+
+DELETE FROM image AS a
+USING image AS b
+WHERE a.image_name = b.image_name
+AND a.image_date = b.image_date
+AND a.constellation_id IS NOT DISTINCT FROM b.constellation_id
+AND a.region_id IS NOT DISTINCT FROM b.region_id
+AND a.image_id < b.image_id;
+
+ALTER TABLE body_assignment
+ADD CONSTRAINT body_assignment_region_id_body_id_at_key
+UNIQUE (region_id, body_id, at);
+
+ALTER TABLE image
+ADD CONSTRAINT image_image_name_image_date_constellation_id_region_id_key
+UNIQUE NULLS NOT DISTINCT (image_name, image_date, constellation_id, region_id);
+
+COMMIT;
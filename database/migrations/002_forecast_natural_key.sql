@@ -0,0 +1,16 @@
+-- Adds the natural key used by the quadhoral pipeline's merge load.
+-- Duplicate forecasts left by earlier loads are removed first, keeping the latest.
+
+BEGIN;
+
+DELETE FROM forecast AS a
+USING forecast AS b
+WHERE a.county_id = b.county_id
+AND a.at = b.at
+AND a.forecast_id < b.forecast_id;
+
+ALTER TABLE forecast
+ADD CONSTRAINT forecast_county_id_at_key
+UNIQUE (county_id, at);
+
+COMMIT;
@@ -47,6 +47,7 @@ CREATE TABLE body_assignment (
     distance_km FLOAT NOT NULL,
     constellation_id SMALLINT,
     PRIMARY KEY (assignment_id),
+    UNIQUE (region_id, body_id, at),
     FOREIGN KEY (region_id) REFERENCES region(region_id),
     FOREIGN KEY (body_id) REFERENCES body(body_id),
     FOREIGN KEY (constellation_id) REFERENCES constellation(constellation_id)
@@ -81,6 +82,7 @@ CREATE TABLE forecast (
     visibility_m INT NOT NULL,
     at TIMESTAMP NOT NULL,
     PRIMARY KEY (forecast_id),
+    UNIQUE (county_id, at),
     FOREIGN KEY (county_id) REFERENCES county(county_id)
 );
 
@@ -112,6 +114,7 @@ CREATE TABLE image (
     region_id SMALLINT,
     constellation_id SMALLINT,
     PRIMARY KEY (image_id),
+    UNIQUE NULLS NOT DISTINCT (image_name, image_date, constellation_id, region_id),
     FOREIGN KEY (region_id) REFERENCES region(region_id),
     FOREIGN KEY (constellation_id) REFERENCES constellation(constellation_id)
 );
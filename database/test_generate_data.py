@@ -0,0 +1,157 @@
+'''Contains tests for the synthetic data generator'''
+from unittest import mock
+import numpy as np
+import pytest
+from generate_data import get_hours, get_forecast_rows, get_body_assignment_rows,\
+                          get_solar_feature_rows, get_aurora_colours,\
+                          generate_subscribers, generate_subscriber_counties,\
+                          load_table, BODY_ORBITS, ZODIAC, VISIBLE_ALTITUDE,\
+                          MAX_COUNTIES_PER_SUBSCRIBER
+
+
+@pytest.fixture
+def counties():
+    '''County id, latitude and longitude rows'''
+    return np.array([[1, 54.71, -6.22], [2, 57.15, -2.11], [3, 50.26, -5.05]])
+
+
+@pytest.fixture
+def regions():
+    '''Region id, latitude and longitude rows'''
+    return np.array([[1, 54.61, -6.62], [10, 51.51, -0.13]])
+
+
+@pytest.fixture
+def midsummer():
+    '''Hours of the 21st of June 2024'''
+    return np.arange(np.datetime64("2024-06-21T00", "h"),
+                     np.datetime64("2024-06-22T00", "h"), np.timedelta64(1, "h"))
+
+
+class TestGetHours:
+    '''Tests for the get_hours function'''
+    def test_get_hours_splits_days(self):
+        '''Tests that the range is split into days, with a partial last day'''
+        days = list(get_hours(np.datetime64("2024-01-01T00", "h"),
+                              np.datetime64("2024-01-03T06", "h")))
+        assert [len(day) for day in days] == [24, 24, 6]
+        assert days[1][0] == np.datetime64("2024-01-02T00", "h")
+
+
+class TestGetForecastRows:
+    '''Tests for the get_forecast_rows function'''
+    def test_get_forecast_rows_one_per_county_hour(self, counties, midsummer):
+        '''Tests that there is a row for every county at every hour'''
+        rows = get_forecast_rows(midsummer, counties, np.random.default_rng(0))
+        assert len(rows) == 72
+        assert {(row[0], row[6]) for row in rows} == {
+            (county, str(hour)) for county in (1, 2, 3)
+            for hour in midsummer.astype("datetime64[m]")}
+
+    def test_get_forecast_rows_in_range(self, counties, midsummer):
+        '''Tests that the values fit the forecast table's columns'''
+        rows = np.array(get_forecast_rows(midsummer, counties,
+                                          np.random.default_rng(0)))[:, 1:6].astype(float)
+        assert ((rows[:, 1] >= 0) & (rows[:, 1] <= 100)).all()
+        assert (rows[:, 2] >= 0).all()
+        assert ((rows[:, 3] >= 0) & (rows[:, 3] <= 100)).all()
+        assert ((rows[:, 4] >= 100) & (rows[:, 4] <= 50000)).all()
+
+    def test_get_forecast_rows_seasonal(self, counties):
+        '''Tests that summer is warmer than winter'''
+        rng = np.random.default_rng(0)
+        hours = np.arange(np.datetime64("2024-01-01T00", "h"),
+                          np.datetime64("2024-01-02T00", "h"), np.timedelta64(1, "h"))
+        winter = np.mean([row[1] for row in get_forecast_rows(hours, counties, rng)])
+        summer = np.mean([row[1] for row in get_forecast_rows(hours + np.timedelta64(4392, "h"),
+                                                              counties, rng)])
+        assert summer > winter + 5
+
+
+class TestGetBodyAssignmentRows:
+    '''Tests for the get_body_assignment_rows function'''
+    def test_get_body_assignment_rows_visible_only(self, regions, midsummer):
+        '''Tests that only bodies above the horizon are returned'''
+        bodies = {name: n for n, name in enumerate(BODY_ORBITS, 1)}
+        rows = get_body_assignment_rows(midsummer, regions, bodies, {})
+        assert rows
+        assert all(row[4] > VISIBLE_ALTITUDE for row in rows)
+        assert {row[0] for row in rows} == {1, 10}
+
+    def test_get_body_assignment_rows_sun_at_midsummer(self, regions, midsummer):
+        '''Tests that the sun is up for most of the day, by Gemini, at midsummer'''
+        constellations = {name: n for n, name in enumerate(ZODIAC, 1)}
+        rows = get_body_assignment_rows(midsummer, regions, {"Sun": 9}, constellations)
+        london = [row for row in rows if row[0] == 10]
+        assert 14 <= len(london) <= 17
+        assert {row[6] for row in london} <= {constellations["Tau"], constellations["Gem"]}
+        assert max(row[4] for row in london) > 55
+
+    def test_get_body_assignment_rows_skips_missing_bodies(self, regions, midsummer):
+        '''Tests that bodies not in the body table are not generated'''
+        rows = get_body_assignment_rows(midsummer, regions, {"Moon": 10}, {})
+        assert {row[1] for row in rows} == {10}
+
+
+class TestGetSolarFeatureRows:
+    '''Tests for the get_solar_feature_rows function'''
+    def test_get_solar_feature_rows_midsummer(self, counties):
+        '''Tests that days are longest further north at midsummer'''
+        rows = get_solar_feature_rows(np.array(["2024-06-21"], dtype="datetime64[D]"),
+                                      counties)
+        lengths = {row[0]: np.datetime64(row[2]) - np.datetime64(row[1]) for row in rows}
+        assert lengths[2] > lengths[1] > lengths[3]
+        assert np.timedelta64(16, "h") < lengths[3] < np.timedelta64(17, "h")
+
+
+class TestGetAuroraColours:
+    '''Tests for the get_aurora_colours function'''
+    def test_get_aurora_colours_mostly_green(self):
+        '''Tests that most alerts are green but every colour occurs'''
+        colours = get_aurora_colours(20000, np.random.default_rng(0))
+        counts = np.bincount(colours, minlength=5)
+        assert counts[1] > 0.8 * len(colours)
+        assert (counts[1:] > 0).all()
+
+
+class TestGenerateSubscribers:
+    '''Tests for the subscriber generators'''
+    def test_generate_subscribers_contact(self):
+        '''Tests that every subscriber has a unique name and a contact'''
+        settings = {"subscribers": 250, "chunk_size": 100}
+        chunks = list(generate_subscribers(settings, {"synthetic_subscribers": 5},
+                                           np.random.default_rng(0)))
+        rows = [row for chunk in chunks for row in chunk]
+        assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+        assert rows[0][0] == "synthetic5"
+        assert len({row[0] for row in rows}) == 250
+        assert all(row[1] or row[2] for row in rows)
+        assert all(len(row[1]) == 13 for row in rows if row[1])
+
+    def test_generate_subscriber_counties_distinct(self, counties):
+        '''Tests that subscribers follow between one and five distinct counties'''
+        settings = {"chunk_size": 500}
+        dimensions = {"counties": counties, "subscribers": np.arange(1, 301)}
+        rows = [row for chunk in generate_subscriber_counties(settings, dimensions,
+                                                              np.random.default_rng(0))
+                for row in chunk]
+        assert len(rows) == len(set(rows))
+        assert {row[0] for row in rows} == set(range(1, 301))
+        assert {row[1] for row in rows} <= {1, 2, 3}
+        assert max(np.bincount([row[0] for row in rows])) <= MAX_COUNTIES_PER_SUBSCRIBER
+
+
+class TestLoadTable:
+    '''Tests for the load_table function'''
+    @mock.patch('generate_data.get_dimensions')
+    @mock.patch('generate_data.copy_rows')
+    def test_load_table_chunks(self, mock_copy_rows, mock_get_dimensions):
+        '''Tests that rows are copied in chunks and committed once'''
+        mock_conn = mock.MagicMock()
+        mock_copy_rows.side_effect = lambda cur, table, columns, rows: len(rows)
+        mock_get_dimensions.return_value = {"synthetic_subscribers": 0}
+        settings = {"subscribers": 25, "chunk_size": 10}
+        loaded = load_table(mock_conn, "subscriber", settings, np.random.default_rng(0))
+        assert loaded == 25
+        assert [len(call.args[3]) for call in mock_copy_rows.call_args_list] == [10, 10, 5]
+        mock_conn.commit.assert_called_once()
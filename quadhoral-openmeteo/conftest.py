@@ -1,11 +1,12 @@
 '''Contains the configuration for the tests in this file'''
 from datetime import datetime as dt
 import pytest
+from quadhoral_transform import transform
 
 @pytest.fixture
 def valid_coords():
-    '''Returns valid set of coordinates'''
-    return [(1.0, 51.0),(-1.0, 52.0)]
+    '''Returns valid set of county ids and coordinates'''
+    return [(1, 51.0, 1.0),(2, 52.0, -1.0)]
 
 
 @pytest.fixture
@@ -32,18 +33,6 @@ def invalid_json_data():
               'cloud_cover': [], 'visibility': []}}] * 106
 
 
-@pytest.fixture
-def valid_clean_county_data():
-    '''Returns valid clean county data'''
-    return {
-        'time': [f'2024-10-01T{i:02d}:00' for i in range(24)],
-        'temp': [10 + i for i in range(24)],
-        'prob': [20 + i for i in range(24)],
-        'precip': [0.1 * i for i in range(24)],
-        'clouds': [50 + i for i in range(24)],
-        'visibility': [10000 - (i * 100) for i in range(24)]
-    }
-
 @pytest.fixture
 def incomplete_clean_county_data():
     '''Returns incomplete clean county data'''
@@ -57,23 +46,11 @@ def incomplete_clean_county_data():
     }
 
 
-@pytest.fixture
-def empty_clean_county_data():
-    '''Returns empty clean county data'''
-    return {
-        'time': [],
-        'temp': [],
-        'prob': [],
-        'precip': [],
-        'clouds': [],
-        'visibility': []
-    }
-
-
 @pytest.fixture
 def valid_input_data():
     '''Returns valid input data'''
     return [{
+        'county_id': 1,
         'hourly': {
             'time': [f'2024-10-01T{i:02d}:00' for i in range(24)],
             'temperature_2m': [10 + i for i in range(24)],
@@ -82,13 +59,6 @@ def valid_input_data():
             'cloud_cover': [50 + i for i in range(24)],
             'visibility': [10000 - (i * 100) for i in range(24)]}}]
 
-@pytest.fixture
-def expected_clean_data():
-    '''Returns clean data that matches previous fixtures'''
-    return {'time': ['2024-10-01T00:00', '2024-10-01T01:00'],
-        'temp': [10, 11],'prob': [20, 21],'precip': [0.0, 0.1],
-        'clouds': [50, 51],'visibility': [10000, 9900]}
-
 @pytest.fixture
 def expected_formatted_data():
     '''Returns formatted data that matches previous fixtures'''
@@ -96,6 +66,12 @@ def expected_formatted_data():
             [1, dt(2024, 10, 1, 1, 0), 11, 21, 0.1, 51, 9900]]
 
 
+@pytest.fixture
+def valid_db_frame(valid_input_data):
+    '''Returns a transformed forecast frame'''
+    return transform(valid_input_data)
+
+
 @pytest.fixture
 def valid_db_data():
     '''Returns a valid dataset for the database'''
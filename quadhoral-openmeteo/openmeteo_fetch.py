@@ -0,0 +1,90 @@
+'''Sharded fetching of Open-Meteo locations. Locations are split into
+batches that are requested concurrently through one pooled session with
+retries, and a batch whose URL is too long or whose response is too slow
+is split in half and requested again, so the request size tunes itself
+as locations are added.'''
+from os import environ as ENV
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import logging
+from requests import Session, Timeout
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from api_error import APIError
+from openmeteo_locations import LocationRegistry
+
+OPENMETEO_BATCH_SIZE = 50
+OPENMETEO_WORKERS = 4
+OPENMETEO_ATTEMPTS = 3
+# Status codes for a request too large for the API to accept
+SPLIT_STATUS_CODES = (413, 414)
+
+
+def get_session(workers: int, attempts: int) -> Session:
+    '''Returns a session pooling a connection per worker, retrying failed
+    connections, 429 and 5xx responses with exponential backoff. Read
+    timeouts are not retried but raised as a Timeout, so a batch that is
+    too slow is split instead.'''
+    retry = Retry(total=attempts - 1, read=False, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET',), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retry)
+
+    session = Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ShardedFetcher:
+    '''Fetches locations in concurrent batches'''
+
+    def __init__(self, request: Callable[[LocationRegistry, Session], list[dict]],
+                 batch_size: int = OPENMETEO_BATCH_SIZE, workers: int = OPENMETEO_WORKERS,
+                 attempts: int = OPENMETEO_ATTEMPTS):
+        '''Creates a fetcher for `request(locations, session)`, which returns
+        the responses for a batch of locations matched to their counties'''
+        self.request = request
+        self.batch_size = batch_size
+        self.workers = workers
+        self.attempts = attempts
+
+    @classmethod
+    def from_env(cls, request: Callable[[LocationRegistry, Session], list[dict]]):
+        '''Returns a fetcher configured from the environment'''
+        return cls(request,
+                   int(ENV.get('OPENMETEO_BATCH_SIZE', OPENMETEO_BATCH_SIZE)),
+                   int(ENV.get('OPENMETEO_WORKERS', OPENMETEO_WORKERS)),
+                   int(ENV.get('OPENMETEO_ATTEMPTS', OPENMETEO_ATTEMPTS)))
+
+    def fetch_batch(self, locations: LocationRegistry, session: Session) -> list[dict]:
+        '''Returns the responses for a batch, splitting it in half and
+        requesting each half when it is too large or too slow'''
+        try:
+            return self.request(locations, session)
+
+        except (APIError, Timeout) as err:
+            too_large = isinstance(err, Timeout) or err.code in SPLIT_STATUS_CODES
+            if not too_large or len(locations) == 1:
+                raise
+
+        half = len(locations) // 2
+        logging.warning('Batch of %s locations failed, retrying as batches of %s and %s.',
+                        len(locations), half, len(locations) - half)
+        first, second = locations.split(half)
+        return self.fetch_batch(first, session) + self.fetch_batch(second, session)
+
+    def fetch(self, locations: LocationRegistry) -> list[dict]:
+        '''Returns the responses for every location, in county id order.
+        Raises a ValueError unless every location has been answered.'''
+        batches = locations.batch(self.batch_size)
+        logging.info('Requesting %s locations in %s batches, %s at a time.',
+                     len(locations), len(batches), self.workers)
+
+        with get_session(self.workers, self.attempts) as session, \
+                ThreadPoolExecutor(self.workers) as pool:
+            results = list(pool.map(lambda batch: self.fetch_batch(batch, session), batches))
+
+        responses = [response for result in results for response in result]
+        locations.validate(responses)
+        return responses
@@ -1,10 +1,15 @@
 '''Extracts weather data for each county for the next day'''
 import logging
 from os import environ as ENV
-from requests import get
+from functools import partial
+from requests import get, Session
 from psycopg2 import connect
 from dotenv import load_dotenv
 from api_error import APIError
+from instrumentation import record_request
+from openmeteo_locations import LocationRegistry
+from openmeteo_fetch import ShardedFetcher
+from openmeteo_cache import ResponseCache
 
 URL = "https://api.open-meteo.com/v1/forecast"
 
@@ -13,14 +18,15 @@ def get_connection():
     return connect(f"""dbname={ENV["DB_NAME"]} user={ENV["DB_USER"]}
                  host={ENV["DB_HOST"]} password={ENV["DB_PASSWORD"]} port={ENV["DB_PORT"]}""")
 
-def get_county_coordinates() -> tuple[list[int]]:
-    '''Returns a params dict containing the UK counties coordinates'''
-    query = '''SELECT longitude,latitude FROM county'''
+def get_county_locations() -> list[dict]:
+    '''Returns the id and coordinates of every UK county, ordered by id'''
+    query = '''SELECT county_id, latitude, longitude FROM county ORDER BY county_id'''
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(query)
             counties = cur.fetchall()
-    return [county[0] for county in counties], [county[1] for county in counties]
+    return [{'county_id': county[0], 'latitude': county[1], 'longitude': county[2]}
+            for county in counties]
 
 def convert_to_params(long: list[int], lat: list[int]):
     '''Converts the obtained longitude and latitude values to params'''
@@ -32,19 +38,31 @@ def convert_to_params(long: list[int], lat: list[int]):
 
     raise TypeError('Queried data is wrong datatype')
 
-def request_weather_data(params:dict) -> list[dict]:
-    '''Sends a get request for the weather data'''
-    response = get(URL, params=params, timeout=10)
-    logging.info('Request sent.')
+def request_weather_data(params:dict, session: Session = None,
+                         cache: ResponseCache = None) -> list[dict]:
+    '''Sends a get request for the weather data, through the session and cache if given'''
+    send = session.get if session else get
+    if cache:
+        response = cache.get(send, URL, params, timeout=10)
+    else:
+        response = send(URL, params=params, timeout=10)
+
+    if response.headers.get('X-Cache') == 'HIT':
+        logging.info('Response read from cache.')
+    else:
+        logging.info('Request sent.')
+        record_request(len(response.content or b''))
 
     if response.status_code == 200:
         logging.info('Get request successful.')
         weather_data = response.json()
+        # A single location is returned as an object rather than a list
+        if isinstance(weather_data, dict) and 'latitude' in weather_data:
+            weather_data = [weather_data]
 
         if isinstance(weather_data, list):
 
-            if (len(weather_data) == 106 and
-                all(all(len(region['hourly'][key]) > 0 for key in
+            if (all(all(len(region['hourly'][key]) > 0 for key in
                 ['temperature_2m', 'precipitation_probability',
                  'precipitation', 'cloud_cover', 'visibility'])for region in weather_data)):
                 return weather_data
@@ -57,11 +75,16 @@ def request_weather_data(params:dict) -> list[dict]:
     raise APIError('Unsuccessful request.', response.status_code)
 
 
-def extract() -> list:
-    '''Runs extract pipeline'''
-    longitude, latitude = get_county_coordinates()
-    parameters = convert_to_params(longitude, latitude)
-    return request_weather_data(parameters)
+def request_batch(locations: LocationRegistry, session: Session,
+                  cache: ResponseCache = None) -> list[dict]:
+    '''Returns the weather data for a batch of locations, matched to their counties'''
+    parameters = convert_to_params(locations.longitudes, locations.latitudes)
+    return locations.match(request_weather_data(parameters, session, cache))
+
+def extract(cache: ResponseCache = None) -> list:
+    '''Runs extract pipeline, returning each response with its county_id'''
+    locations = LocationRegistry(get_county_locations())
+    return ShardedFetcher.from_env(partial(request_batch, cache=cache)).fetch(locations)
 
 if __name__ == '__main__':
     logger = logging.getLogger(__name__)
@@ -2,9 +2,13 @@
 # pylint: disable=W0612,W0613,E0606
 import logging
 from dotenv import load_dotenv
+from instrumentation import track_stage
 from quadhoral_extract import extract
 from quadhoral_transform import transform
 from quadhoral_load import load
+from openmeteo_cache import ResponseCache, get_payload_hash
+
+PIPELINE = 'quadhoral-openmeteo'
 
 def lambda_handler(event, context):
     '''Orchestrates ETL pipeline for weekly OpenMeteo data'''
@@ -14,17 +18,35 @@ def lambda_handler(event, context):
     load_dotenv()
     logging.info('Environment loaded.')
 
-    data = extract()
+    cache = ResponseCache.from_env()
+
+    with track_stage(PIPELINE, 'extract') as stage:
+        data = extract(cache)
+        stage.add_rows(len(data))
+
+    payload_hash = get_payload_hash(data, 'hourly')
+    if cache and cache.get_run_hash(PIPELINE) == payload_hash:
+        logging.info('Forecasts unchanged since the last load, skipping transform and load.')
+        cache.close()
+        return
 
     if data:
         logging.info('Data extracted.')
-        clean_data = transform(data)
+        with track_stage(PIPELINE, 'transform') as stage:
+            clean_data = transform(data)
+            stage.add_rows(len(clean_data))
 
-    if clean_data:
+    if not clean_data.empty:
         logging.info('Data cleaned.')
-        load(clean_data)
+        with track_stage(PIPELINE, 'load') as stage:
+            load(clean_data)
+            stage.add_rows(len(clean_data))
         logging.info('Data loaded.')
 
+    if cache:
+        cache.set_run_hash(PIPELINE, payload_hash)
+        cache.close()
+
 
 if __name__ == '__main__':
     lambda_handler({}, {})
\ No newline at end of file
@@ -1,8 +1,16 @@
 '''Loads cleaned data into the RDS instance'''
+from os import environ as ENV
 import logging
+import pandas as pd
 from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 from quadhoral_extract import get_connection
+from openmeteo_columnar import to_rows, to_csv_buffer
+
+FORECAST_COLUMNS = ('county_id', 'at', 'temperature_c', 'precipitation_probability_percent',
+                    'precipitation_mm', 'cloud_coverage_percent', 'visibility_m')
+FORECAST_KEY = ('county_id', 'at')
+LOAD_MODES = ('merge', 'replace')
 
 
 def truncate_database() -> None:
@@ -24,17 +32,56 @@ def load_data(data: list[list]) -> None:
             execute_values(cur, query, data)
             conn.commit()
 
-def load(data:list[list]) -> None:
+def copy_frame(cur, table: str, data: pd.DataFrame) -> None:
+    '''Streams a forecast frame into a table with COPY through an in memory CSV buffer'''
+    cur.copy_expert(
+        f"COPY {table} ({', '.join(FORECAST_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        to_csv_buffer(data[list(FORECAST_COLUMNS)]))
+
+def merge_data(data: pd.DataFrame) -> int:
+    '''Copies forecasts into a staging table and merges them into forecast on
+    (county_id, at) in one transaction, only rewriting forecasts whose values
+    have changed. Returns the number of rows inserted or updated.'''
+    columns = ', '.join(FORECAST_COLUMNS)
+    values = [column for column in FORECAST_COLUMNS if column not in FORECAST_KEY]
+    query = f'''INSERT INTO forecast ({columns})
+    SELECT DISTINCT ON ({', '.join(FORECAST_KEY)}) {columns} FROM forecast_staging
+    ON CONFLICT ({', '.join(FORECAST_KEY)}) DO UPDATE SET
+    {', '.join(f'{column} = EXCLUDED.{column}' for column in values)}
+    WHERE ({', '.join(f'forecast.{column}' for column in values)})
+    IS DISTINCT FROM ({', '.join(f'EXCLUDED.{column}' for column in values)})'''
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f'''CREATE TEMP TABLE forecast_staging ON COMMIT DROP AS
+            SELECT {columns} FROM forecast WITH NO DATA''')
+            copy_frame(cur, 'forecast_staging', data)
+            cur.execute(query)
+            changed = cur.rowcount
+            conn.commit()
+    return changed
+
+def get_load_mode() -> str:
+    '''Returns how forecasts are loaded, merge by default'''
+    mode = ENV.get('FORECAST_LOAD_MODE', 'merge')
+    if mode not in LOAD_MODES:
+        raise ValueError(f'Unknown forecast load mode: {mode}')
+    return mode
+
+def load(data: pd.DataFrame) -> None:
     '''Runs load portion of ETL pipeline'''
+    if get_load_mode() == 'merge':
+        changed = merge_data(data)
+        logging.info('%s rows merged, %s inserted or changed',len(data),changed)
+        return
+
     truncate_database()
     logging.info('Truncated database successfully')
-    load_data(data)
+    load_data(to_rows(data))
     logging.info('%s rows inserted successfully',len(data))
 
 
-
 if __name__ == '__main__':
     logger = logging.getLogger(__name__)
     logging.basicConfig(level=logging.INFO)
     load_dotenv()
-    load([[]])
+    load(pd.DataFrame(columns=FORECAST_COLUMNS))
@@ -0,0 +1,120 @@
+'''Contains tests for the Open-Meteo response cache'''
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+import pytest
+from openmeteo_cache import (ResponseCache, get_model_run_expiry, get_payload_hash,
+                             parse_cache_control)
+
+URL = 'https://api.open-meteo.com/v1/forecast'
+PARAMS = {'latitude': [51.0], 'longitude': [1.0]}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    '''Returns an empty cache in a temporary file'''
+    return ResponseCache(str(tmp_path / 'cache.sqlite'))
+
+
+def make_send(status_code: int = 200, headers: dict = None, body: bytes = b'[{"a": 1}]'):
+    '''Returns a fake GET function answering with the given response'''
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.content = body
+    return MagicMock(return_value=response)
+
+
+def timestamp(hour: int, minute: int = 0) -> float:
+    '''Returns a UTC timestamp on 1 October 2024'''
+    return datetime(2024, 10, 1, hour, minute, tzinfo=timezone.utc).timestamp()
+
+
+class TestResponseCache:
+    '''Contains tests for the ResponseCache class'''
+    def test_fresh_response_is_reused(self, cache):
+        '''Tests that a response is not requested again while fresh'''
+        send = make_send(headers={'Cache-Control': 'max-age=600'})
+
+        cache.get(send, URL, PARAMS, 10)
+        response = cache.get(send, URL, PARAMS, 10)
+
+        assert send.call_count == 1
+        assert response.json() == [{'a': 1}]
+        assert response.headers['X-Cache'] == 'HIT'
+
+    def test_stale_response_is_revalidated(self, cache):
+        '''Tests that a stale response is revalidated with its ETag'''
+        cache.get(make_send(headers={'Cache-Control': 'no-cache', 'ETag': '"v1"'}),
+                  URL, PARAMS, 10)
+
+        send = make_send(status_code=304, headers={'Cache-Control': 'max-age=60'})
+        response = cache.get(send, URL, PARAMS, 10)
+
+        assert send.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        assert response.status_code == 200
+        assert response.content == b'[{"a": 1}]'
+        assert cache.get(send, URL, PARAMS, 10).headers['X-Cache'] == 'HIT'
+        assert send.call_count == 1
+
+    def test_no_store_is_not_cached(self, cache):
+        '''Tests that a no-store response is requested every time'''
+        send = make_send(headers={'Cache-Control': 'no-store'})
+
+        cache.get(send, URL, PARAMS, 10)
+        cache.get(send, URL, PARAMS, 10)
+
+        assert send.call_count == 2
+
+    def test_failed_response_is_not_cached(self, cache):
+        '''Tests that unsuccessful responses are returned but not stored'''
+        send = make_send(status_code=500)
+
+        assert cache.get(send, URL, PARAMS, 10).status_code == 500
+        cache.get(send, URL, PARAMS, 10)
+        assert send.call_count == 2
+
+    def test_expiry_falls_back_to_model_run(self, cache):
+        '''Tests that a response without caching headers expires at the next model run'''
+        response = make_send().return_value
+
+        assert cache.get_expiry(response, timestamp(5)) == timestamp(8)
+
+    def test_expiry_from_expires_header(self, cache):
+        '''Tests that the Expires header is used without Cache-Control'''
+        response = make_send(headers={'Expires': 'Tue, 01 Oct 2024 09:30:00 GMT'}).return_value
+
+        assert cache.get_expiry(response, timestamp(5)) == timestamp(9, 30)
+
+    def test_run_hash(self, cache):
+        '''Tests that the last loaded payload hash is kept per pipeline'''
+        assert cache.get_run_hash('quadhoral-openmeteo') is None
+
+        cache.set_run_hash('quadhoral-openmeteo', 'abc')
+
+        assert cache.get_run_hash('quadhoral-openmeteo') == 'abc'
+
+    @patch.dict('openmeteo_cache.ENV', {'OPENMETEO_CACHE': 'off'})
+    def test_from_env_disabled(self):
+        '''Tests that the cache can be switched off'''
+        assert ResponseCache.from_env() is None
+
+
+class TestCacheFunctions:
+    '''Contains tests for the cache helper functions'''
+    @pytest.mark.parametrize('hour,expected', [(1, 2), (5, 8), (8, 14), (23, 26)])
+    def test_get_model_run_expiry(self, hour, expected):
+        '''Tests that each time expires when the next model run is published'''
+        assert get_model_run_expiry(timestamp(hour), 6, 2) == timestamp(0) + expected * 3600
+
+    def test_parse_cache_control(self):
+        '''Tests that Cache-Control directives are split into names and values'''
+        assert parse_cache_control('public, Max-Age=900') == {'public': '', 'max-age': '900'}
+
+    def test_payload_hash_ignores_generation_time(self):
+        '''Tests that only the county and its values change the payload hash'''
+        first = [{'county_id': 1, 'generationtime_ms': 0.1, 'hourly': {'time': ['t']}}]
+        second = [{'county_id': 1, 'generationtime_ms': 0.7, 'hourly': {'time': ['t']}}]
+        changed = [{'county_id': 1, 'generationtime_ms': 0.7, 'hourly': {'time': ['u']}}]
+
+        assert get_payload_hash(first, 'hourly') == get_payload_hash(second, 'hourly')
+        assert get_payload_hash(first, 'hourly') != get_payload_hash(changed, 'hourly')
@@ -0,0 +1,68 @@
+'''Contains tests for the columnar Open-Meteo transform'''
+from datetime import datetime as dt
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from openmeteo_columnar import stack_columns, to_rows, to_csv_buffer
+
+FIELDS = {'at': 'time', 'temperature_c': 'temperature_2m'}
+
+
+def make_county(times: list[str], temperatures: list, county_id: int = 1) -> dict:
+    '''Returns an hourly Open-Meteo response for one county'''
+    return {'county_id': county_id, 'hourly': {'time': times, 'temperature_2m': temperatures}}
+
+
+class TestStackColumns:
+    '''Contains tests for the stack columns function'''
+    def test_stack_columns_broadcasts_county_ids(self):
+        '''Tests that each county's values are stacked under its id'''
+        times = ['2024-10-01T00:00', '2024-10-01T01:00']
+        frame = stack_columns([make_county(times, [1.0, 2.0], 5),
+                               make_county(times, [3.0, 4.0], 2)], 'hourly', FIELDS, ('at',))
+        assert frame['county_id'].tolist() == [5, 5, 2, 2]
+        assert frame['temperature_c'].tolist() == [1.0, 2.0, 3.0, 4.0]
+        assert frame['at'].iloc[3] == dt(2024, 10, 1, 1, 0)
+
+    @patch('openmeteo_columnar.pd.to_datetime', wraps=pd.to_datetime)
+    def test_shared_time_axis_parsed_once(self, mock_to_datetime):
+        '''Tests that a time axis shared by every county is parsed once'''
+        times = ['2024-10-01T00:00', '2024-10-01T01:00']
+        stack_columns([make_county(times, [1.0, 2.0])] * 50, 'hourly', FIELDS, ('at',))
+        assert mock_to_datetime.call_args.args[0] == times
+
+    def test_different_time_axes(self):
+        '''Tests that counties with their own times keep them'''
+        frame = stack_columns([make_county(['2024-10-01T00:00'], [1.0]),
+                               make_county(['2024-10-02T06:30'], [2.0], 2)],
+                              'hourly', FIELDS, ('at',))
+        assert frame['at'].tolist() == [dt(2024, 10, 1, 0, 0), dt(2024, 10, 2, 6, 30)]
+
+    def test_fixed_length(self):
+        '''Tests that only `length` values are taken from each county'''
+        frame = stack_columns([make_county(['2024-10-01T00:00', '2024-10-01T01:00'],
+                                           [1.0, 2.0], 7)],
+                              'hourly', FIELDS, ('at',), length=1)
+        assert to_rows(frame) == [[7, dt(2024, 10, 1, 0, 0), 1.0]]
+
+    def test_too_few_values(self):
+        '''Tests that a field shorter than the time axis raises an error'''
+        with pytest.raises(IndexError):
+            stack_columns([make_county(['2024-10-01T00:00', '2024-10-01T01:00'], [1.0])],
+                          'hourly', FIELDS, ('at',))
+
+    def test_invalid_time(self):
+        '''Tests that an unparseable time raises an error'''
+        with pytest.raises(ValueError):
+            stack_columns([make_county(['01-10-2024 00:00'], [1.0])],
+                          'hourly', FIELDS, ('at',))
+
+
+class TestOutputs:
+    '''Contains tests for the row and CSV outputs'''
+    def test_missing_values(self):
+        '''Tests that missing values become None in rows and NULL in CSV'''
+        frame = stack_columns([make_county(['2024-10-01T00:00'], [None])],
+                              'hourly', FIELDS, ('at',))
+        assert to_rows(frame) == [[1, dt(2024, 10, 1, 0, 0), None]]
+        assert to_csv_buffer(frame).read() == '1,2024-10-01 00:00:00,\n'
@@ -0,0 +1,136 @@
+'''Contains tests for the sharded Open-Meteo fetcher'''
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+import threading
+import time
+from unittest.mock import patch
+import pytest
+from api_error import APIError
+from openmeteo_fetch import ShardedFetcher, get_session
+from openmeteo_locations import LocationRegistry
+
+
+def make_registry(count: int) -> LocationRegistry:
+    '''Returns a registry of counties a tenth of a degree apart'''
+    return LocationRegistry([{'county_id': n, 'latitude': 50.0 + n / 10, 'longitude': 1.0}
+                             for n in range(1, count + 1)])
+
+
+def make_request(max_batch: int = None, error: Exception = None):
+    '''Returns a fake batch request recording the batch sizes it was sent,
+    which fails for batches larger than max_batch'''
+    sizes = []
+    lock = threading.Lock()
+
+    def request(locations, session):
+        with lock:
+            sizes.append(len(locations))
+        if max_batch and len(locations) > max_batch:
+            raise error
+        return locations.match([{'latitude': lat, 'longitude': long}
+                                for lat, long in zip(locations.latitudes,
+                                                     locations.longitudes)])
+
+    request.sizes = sizes
+    return request
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    '''Answers requests for more than 10 locations too slowly'''
+    def do_GET(self):  # pylint: disable=C0103
+        '''Sleeps past the client timeout when too many locations are requested'''
+        count = int(parse_qs(urlparse(self.path).query)['count'][0])
+        if count > 10:
+            time.sleep(0.5)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'[]')
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        '''Keeps the test output quiet'''
+
+
+@pytest.fixture
+def slow_server():
+    '''Yields the URL of a local server that is slow for large batches'''
+    server = HTTPServer(('127.0.0.1', 0), SlowHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+    server.server_close()
+
+
+class TestShardedFetcher:
+    '''Contains tests for the ShardedFetcher class'''
+    def test_fetch_in_batches(self):
+        '''Tests that locations are requested in batches and merged in order'''
+        request = make_request()
+        responses = ShardedFetcher(request, batch_size=40, workers=3).fetch(make_registry(106))
+
+        assert sorted(request.sizes) == [26, 40, 40]
+        assert [response['county_id'] for response in responses] == list(range(1, 107))
+
+    def test_fetch_splits_long_batches(self):
+        '''Tests that a batch whose URL is too long is split until it succeeds'''
+        request = make_request(max_batch=10, error=APIError('Unsuccessful request.', 414))
+        responses = ShardedFetcher(request, batch_size=40).fetch(make_registry(40))
+
+        assert len(responses) == 40
+        assert max(size for size in request.sizes if size <= 10) == 10
+
+    def test_fetch_splits_slow_batches(self, slow_server):
+        '''Tests that a batch timing out through the retrying session is split
+        until it succeeds'''
+        sizes = []
+        lock = threading.Lock()
+
+        def request(locations, session):
+            with lock:
+                sizes.append(len(locations))
+            session.get(slow_server, params={'count': len(locations)}, timeout=0.2)
+            return locations.match([{'latitude': lat, 'longitude': long}
+                                    for lat, long in zip(locations.latitudes,
+                                                         locations.longitudes)])
+
+        responses = ShardedFetcher(request, batch_size=40).fetch(make_registry(40))
+
+        assert len(responses) == 40
+        assert sizes[:3] == [40, 20, 10]
+        assert max(size for size in sizes if size <= 10) == 10
+
+    def test_fetch_raises_other_errors(self):
+        '''Tests that a failed request that is not too large is not split'''
+        request = make_request(max_batch=1, error=APIError('Unsuccessful request.', 500))
+
+        with pytest.raises(APIError):
+            ShardedFetcher(request, batch_size=10).fetch(make_registry(10))
+        assert request.sizes == [10]
+
+    def test_fetch_validates_locations(self):
+        '''Tests that responses must answer the expected locations'''
+        def request(locations, session):
+            return [{'county_id': 1}] * len(locations)
+
+        with pytest.raises(ValueError, match='missing'):
+            ShardedFetcher(request).fetch(make_registry(3))
+
+    @patch.dict('openmeteo_fetch.ENV', {'OPENMETEO_BATCH_SIZE': '20',
+                                        'OPENMETEO_WORKERS': '6',
+                                        'OPENMETEO_ATTEMPTS': '2'})
+    def test_from_env(self):
+        '''Tests that the fetcher settings are read from the environment'''
+        fetcher = ShardedFetcher.from_env(make_request())
+
+        assert (fetcher.batch_size, fetcher.workers, fetcher.attempts) == (20, 6, 2)
+
+
+class TestGetSession:
+    '''Contains tests for the get session function'''
+    def test_session_retries(self):
+        '''Tests that the session retries rate limited and failed requests'''
+        adapter = get_session(4, 3).get_adapter('https://api.open-meteo.com')
+
+        assert adapter.max_retries.total == 2
+        assert 429 in adapter.max_retries.status_forcelist
+        assert adapter.max_retries.read is False
+        assert adapter._pool_maxsize == 4  # pylint: disable=W0212
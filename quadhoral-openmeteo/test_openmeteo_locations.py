@@ -0,0 +1,97 @@
+'''Contains tests for the Open-Meteo location registry'''
+from unittest.mock import patch
+import pytest
+from openmeteo_locations import LocationRegistry
+
+
+@pytest.fixture
+def registry():
+    '''Returns a registry of three counties, given out of id order'''
+    return LocationRegistry([{'county_id': 3, 'latitude': 53.0, 'longitude': -2.0},
+                             {'county_id': 1, 'latitude': 51.0, 'longitude': 1.0},
+                             {'county_id': 2, 'latitude': 52.0, 'longitude': -1.0}])
+
+
+class TestLocationRegistry:
+    '''Contains tests for the LocationRegistry class'''
+    def test_locations_ordered_by_county_id(self, registry):
+        '''Tests that the request coordinates follow county id order'''
+        assert registry.latitudes == [51.0, 52.0, 53.0]
+        assert registry.longitudes == [1.0, -1.0, -2.0]
+        assert len(registry) == 3
+
+    def test_duplicate_county_ids(self):
+        '''Tests that a county can only be registered once'''
+        with pytest.raises(ValueError):
+            LocationRegistry([{'county_id': 1, 'latitude': 51.0, 'longitude': 1.0}] * 2)
+
+    def test_match_in_order(self, registry):
+        '''Tests that responses snapped to the model grid keep their county'''
+        responses = [{'latitude': 51.02, 'longitude': 0.98},
+                     {'latitude': 52.01, 'longitude': -1.03},
+                     {'latitude': 53.0, 'longitude': -2.0}]
+        assert [county['county_id'] for county in registry.match(responses)] == [1, 2, 3]
+
+    def test_match_out_of_order(self, registry):
+        '''Tests that reordered responses are matched by their coordinates'''
+        responses = [{'latitude': 53.0, 'longitude': -2.0},
+                     {'latitude': 51.0, 'longitude': 1.0},
+                     {'latitude': 52.0, 'longitude': -1.0}]
+        assert [county['county_id'] for county in registry.match(responses)] == [3, 1, 2]
+
+    def test_match_shared_grid_cell(self):
+        '''Tests that counties sharing a grid cell keep their request order'''
+        registry = LocationRegistry([{'county_id': 1, 'latitude': 51.01, 'longitude': 1.0},
+                                     {'county_id': 2, 'latitude': 51.03, 'longitude': 1.0}])
+        responses = [{'latitude': 51.0, 'longitude': 1.0, 'n': 'first'},
+                     {'latitude': 51.0, 'longitude': 1.0, 'n': 'second'}]
+        assert [(county['county_id'], county['n']) for county in registry.match(responses)] \
+            == [(1, 'first'), (2, 'second')]
+
+    def test_match_swapped_neighbours(self):
+        '''Tests that swapped responses for neighbouring counties less than the
+        old tolerance apart are matched to the nearest county'''
+        registry = LocationRegistry([{'county_id': 1, 'latitude': 54.78, 'longitude': -1.57},
+                                     {'county_id': 2, 'latitude': 54.97, 'longitude': -1.61}])
+        responses = [{'latitude': 54.96, 'longitude': -1.6, 'n': 'tyne and wear'},
+                     {'latitude': 54.78, 'longitude': -1.58, 'n': 'durham'}]
+        assert [(county['county_id'], county['n']) for county in registry.match(responses)] \
+            == [(2, 'tyne and wear'), (1, 'durham')]
+
+    def test_match_equidistant_keeps_position(self):
+        '''Tests that a response as near to two counties keeps its request order'''
+        registry = LocationRegistry([{'county_id': 1, 'latitude': 51.0, 'longitude': 1.0},
+                                     {'county_id': 2, 'latitude': 51.02, 'longitude': 1.0}])
+        responses = [{'latitude': 51.01, 'longitude': 1.0, 'n': 'first'},
+                     {'latitude': 51.01, 'longitude': 1.0, 'n': 'second'}]
+        assert [(county['county_id'], county['n']) for county in registry.match(responses)] \
+            == [(1, 'first'), (2, 'second')]
+
+    def test_match_coarse_grid(self, registry):
+        '''Tests that responses snapped to a 0.25 degree grid are matched'''
+        responses = [{'latitude': 51.125, 'longitude': 1.125},
+                     {'latitude': 52.125, 'longitude': -1.125},
+                     {'latitude': 52.875, 'longitude': -2.125}]
+        assert [county['county_id'] for county in registry.match(responses)] == [1, 2, 3]
+
+    def test_match_unknown_coordinates(self, registry, caplog):
+        '''Tests that a response far from every location keeps its position'''
+        responses = [{'latitude': 51.0, 'longitude': 1.0},
+                     {'latitude': 52.0, 'longitude': -1.0},
+                     {'latitude': 40.0, 'longitude': 10.0}]
+        assert [county['county_id'] for county in registry.match(responses)] == [1, 2, 3]
+        assert 'matched by its position' in caplog.text
+
+    @patch.dict('openmeteo_locations.ENV', {'OPENMETEO_MATCH_TOLERANCE': '0.05'})
+    def test_tolerance_from_env(self):
+        '''Tests that the match tolerance is read from the environment and
+        kept by batches'''
+        registry = LocationRegistry([{'county_id': n, 'latitude': 51.0 + n, 'longitude': 1.0}
+                                     for n in range(1, 5)])
+        assert registry.tolerance == 0.05
+        assert {batch.tolerance for batch in registry.batch(2)} == {0.05}
+
+    def test_match_missing_response(self, registry):
+        '''Tests that every location must be answered'''
+        with pytest.raises(ValueError, match='Expected 3 locations'):
+            registry.match([{'latitude': 51.0, 'longitude': 1.0}])
@@ -1,43 +1,44 @@
 '''Contains tests for the extract script in this folder'''
 import os
+import json
 from unittest.mock import patch, MagicMock
 import pytest
-from quadhoral_extract import get_county_coordinates, convert_to_params,\
+from quadhoral_extract import get_county_locations, convert_to_params,\
                               request_weather_data, extract
 from api_error import APIError
+from openmeteo_cache import ResponseCache
 
-class TestGetCountyCoordinates:
-    '''Contains tests for get county coordinate functions'''
+class TestGetCountyLocations:
+    '''Contains tests for get county locations function'''
     @patch('quadhoral_extract.get_connection')
-    def test_get_county_coordinates_valid(self,mock_get_connection,valid_coords):
-        """Test getting valid county coordinates."""
+    def test_get_county_locations_valid(self,mock_get_connection,valid_coords):
+        """Test getting valid county locations in id order."""
         mock_cursor = MagicMock()
         mock_get_connection.return_value.__enter__.return_value.\
             cursor.return_value.__enter__.return_value = mock_cursor
         mock_cursor.fetchall.return_value = valid_coords
-        longitudes, latitudes = get_county_coordinates()
-        assert longitudes == [1.0, -1.0]
-        assert latitudes == [51.0, 52.0]
+        locations = get_county_locations()
+        assert locations == [{'county_id': 1, 'latitude': 51.0, 'longitude': 1.0},
+                             {'county_id': 2, 'latitude': 52.0, 'longitude': -1.0}]
+        assert 'ORDER BY county_id' in mock_cursor.execute.call_args.args[0]
 
 
     @patch('quadhoral_extract.get_connection')
-    def test_get_county_coordinates_empty(self, mock_conn):
-        """Test handling empty county coordinates."""
+    def test_get_county_locations_empty(self, mock_conn):
+        """Test handling no county locations."""
         mock_cursor = MagicMock()
         mock_conn.return_value.__enter__.return_value.cursor.return_value = mock_cursor
         mock_cursor.fetchall.return_value = []
-        longitudes, latitudes = get_county_coordinates()
 
-        assert longitudes == []
-        assert latitudes == []
+        assert get_county_locations() == []
 
     @patch('quadhoral_extract.get_connection')
-    def test_get_county_coordinates_error(self, mock_conn):
-        """Test database error when getting county coordinates."""
+    def test_get_county_locations_error(self, mock_conn):
+        """Test database error when getting county locations."""
         mock_conn.side_effect = Exception("Database connection error")
 
         with pytest.raises(Exception, match="Database connection error"):
-            get_county_coordinates()
+            get_county_locations()
 
 
 class TestConvertToParams:
@@ -63,6 +64,43 @@ class TestConvertToParams:
 
 class TestRequestWeatherData:
     '''Contains tests for request weather data'''
+    @patch('quadhoral_extract.get')
+    def test_request_weather_data_single_location(self, mock_get, valid_json_data):
+        """Test that a single location object is returned as a list."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        location = {**valid_json_data[0], 'latitude': 51.0, 'longitude': 1.0}
+        mock_response.json.return_value = location
+        mock_get.return_value = mock_response
+
+        assert request_weather_data({'latitude': [51.0], 'longitude': [1.0]}) == [location]
+
+    def test_request_weather_data_session(self, valid_json_data):
+        """Test that the request is sent through the given session."""
+        mock_session = MagicMock()
+        mock_session.get.return_value.status_code = 200
+        mock_session.get.return_value.json.return_value = valid_json_data
+
+        assert len(request_weather_data({}, mock_session)) == 106
+        assert mock_session.get.called
+
+    @patch('quadhoral_extract.record_request')
+    def test_request_weather_data_cache(self, mock_record, valid_json_data, tmp_path):
+        """Test that a cached response is reused without another request."""
+        mock_session = MagicMock()
+        mock_session.get.return_value.status_code = 200
+        mock_session.get.return_value.headers = {'Cache-Control': 'max-age=600'}
+        mock_session.get.return_value.content = json.dumps(valid_json_data).encode()
+        mock_session.get.return_value.json.return_value = valid_json_data
+        cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+
+        request_weather_data({}, mock_session, cache)
+        data = request_weather_data({}, mock_session, cache)
+
+        assert len(data) == 106
+        assert mock_session.get.call_count == 1
+        assert mock_record.call_count == 1
+
     @patch('quadhoral_extract.get')
     def test_request_weather_data_valid(self, mock_get,valid_json_data):
         """Test successful weather data request."""
@@ -100,25 +138,40 @@ class TestRequestWeatherData:
 
 class TestExtract:
     '''Contains tests for extract function'''
-    @patch('quadhoral_extract.get_county_coordinates')
-    @patch('quadhoral_extract.convert_to_params')
+    @patch('quadhoral_extract.get_county_locations')
     @patch('quadhoral_extract.request_weather_data')
     @patch.dict(os.environ, {"DB_NAME": "test_db", "DB_USER": "test_user", "DB_PASS": "test_pass"})
-    def test_extract_valid(self, mock_weather_data, mock_params,
-                                           mock_coords, valid_json_data):
-        """Test successful data extraction pipeline."""
-        mock_coords.return_value = ([1.0], [51.0])
-        mock_params.return_value = {'latitude': [1.0], 'longitude': [51.0]}
-        mock_weather_data.return_value = valid_json_data
+    def test_extract_valid(self, mock_weather_data, mock_locations, valid_json_data):
+        """Test successful data extraction pipeline, in batches."""
+        mock_locations.return_value = [{'county_id': n, 'latitude': 50.0 + n / 10,
+                                        'longitude': 1.0} for n in range(1, 107)]
+        mock_weather_data.side_effect = lambda params, session, cache=None: [
+            {**valid_json_data[0], 'latitude': lat, 'longitude': long}
+            for lat, long in zip(params['latitude'], params['longitude'])]
 
         result = extract()
         assert len(result) == 106
+        assert [county['county_id'] for county in result] == list(range(1, 107))
+        assert mock_weather_data.call_count == 3
+
+    @patch('quadhoral_extract.get_county_locations')
+    @patch('quadhoral_extract.request_weather_data')
+    def test_extract_matches_by_coordinates(self, mock_weather_data, mock_locations):
+        """Test that responses are given the county at their coordinates."""
+        mock_locations.return_value = [{'county_id': 2, 'latitude': 52.0, 'longitude': -1.0},
+                                       {'county_id': 1, 'latitude': 51.0, 'longitude': 1.0}]
+        mock_weather_data.return_value = [{'latitude': 51.0, 'longitude': 1.0},
+                                          {'latitude': 52.0, 'longitude': -1.0}]
+
+        result = extract()
+        assert mock_weather_data.call_args.args[0]['latitude'] == [51.0, 52.0]
+        assert [county['county_id'] for county in result] == [1, 2]
 
-    @patch('quadhoral_extract.get_county_coordinates')
+    @patch('quadhoral_extract.get_county_locations')
     @patch.dict(os.environ, {"DB_NAME": "test_db", "DB_USER": "test_user", "DB_PASS": "test_pass"})
-    def test_extract_db_error(self, mock_coords):
+    def test_extract_db_error(self, mock_locations):
         """Test extraction pipeline fails due to DB connection."""
-        mock_coords.side_effect = Exception("Database connection error")
+        mock_locations.side_effect = Exception("Database connection error")
 
         with pytest.raises(Exception, match="Database connection error"):
             extract()
@@ -1,6 +1,7 @@
 '''Contains tests for the load script in this folder'''
 from unittest.mock import patch, MagicMock
-from quadhoral_load import truncate_database, load_data
+import pytest
+from quadhoral_load import truncate_database, load_data, merge_data, load, get_load_mode
 
 
 class TestDatabaseFunctions:
@@ -28,3 +29,52 @@ class TestDatabaseFunctions:
         load_data(valid_db_data)
         assert mock_execute_values.called
         mock_conn.commit.assert_called_once()
+
+    @patch('quadhoral_load.get_connection')
+    def test_merge_data(self, mock_get_connection, valid_db_frame):
+        '''Tests that forecasts are copied to staging and merged in one transaction'''
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.rowcount = 3
+        mock_get_connection.return_value.__enter__.return_value = mock_conn
+        mock_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        assert merge_data(valid_db_frame) == 3
+        assert 'forecast_staging' in mock_cursor.copy_expert.call_args.args[0]
+        copied = mock_cursor.copy_expert.call_args.args[1].read().splitlines()
+        assert copied[0] == '1,2024-10-01 00:00:00,10,20,0.0,50,10000'
+        merge_query = mock_cursor.execute.call_args.args[0]
+        assert 'ON CONFLICT (county_id, at) DO UPDATE' in merge_query
+        assert 'IS DISTINCT FROM' in merge_query
+        assert 'DELETE' not in merge_query
+        mock_get_connection.assert_called_once()
+        mock_conn.commit.assert_called_once()
+
+
+class TestLoad:
+    '''Contains tests for the load function'''
+    @patch.dict('quadhoral_load.ENV', {}, clear=True)
+    @patch('quadhoral_load.truncate_database')
+    @patch('quadhoral_load.merge_data')
+    def test_load_merges_by_default(self, mock_merge, mock_truncate, valid_db_frame):
+        '''Tests that future forecasts are merged rather than deleted'''
+        load(valid_db_frame)
+        mock_merge.assert_called_once_with(valid_db_frame)
+        assert not mock_truncate.called
+
+    @patch.dict('quadhoral_load.ENV', {'FORECAST_LOAD_MODE': 'replace'})
+    @patch('quadhoral_load.load_data')
+    @patch('quadhoral_load.truncate_database')
+    @patch('quadhoral_load.merge_data')
+    def test_load_replace_mode(self, mock_merge, mock_truncate, mock_load,
+                               valid_db_frame, expected_formatted_data):
+        '''Tests that the replace mode deletes and reinserts future forecasts'''
+        load(valid_db_frame)
+        assert mock_truncate.called
+        assert mock_load.call_args.args[0][:2] == expected_formatted_data
+        assert not mock_merge.called
+
+    @patch.dict('quadhoral_load.ENV', {'FORECAST_LOAD_MODE': 'append'})
+    def test_get_load_mode_invalid(self):
+        '''Tests that an unknown load mode raises an error'''
+        with pytest.raises(ValueError):
+            get_load_mode()
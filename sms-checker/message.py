@@ -3,6 +3,7 @@ import logging
 from os import environ as ENV
 from dotenv import load_dotenv
 from boto3 import client
+from instrumentation import record_request
 
 def send_sms_for_bodies(subscribers: list[dict]) -> None:
     '''Uses boto3 to send messages to subscribers by sms'''
@@ -21,6 +22,7 @@ def send_sms_for_bodies(subscribers: list[dict]) -> None:
             logging.info('Message constructed successfully')
             response = sms.publish(PhoneNumber=sub['phone'],
                         Message=message)
+            record_request()
             logging.info('Message sent for subscriber: %s',sub['user'])
             logging.info('SNS response received: %s', response)
         else:
@@ -50,6 +52,7 @@ def send_email_for_bodies(subscribers: list[dict]) -> None:
                            Destination={'ToAddresses': [sub['email']]},
                            Message={'Subject': {'Data': subject},
                                     'Body': {'Text': {'Data': message}}})
+            record_request()
             logging.info('Message sent for subscriber: %s', sub['user'])
             logging.info('SES response received: %s', response)
         else:
@@ -60,6 +63,7 @@ def send_aurora_sms(sms, number: str, message: str) -> None:
     '''Sends an sms using boto3'''
     response = sms.publish(PhoneNumber=number,
             Message=message)
+    record_request()
     logging.info('SNS response received: %s', response)
 
 def send_aurora_email(ses, address: str, sub: str, text: str) -> None:
@@ -68,6 +72,7 @@ def send_aurora_email(ses, address: str, sub: str, text: str) -> None:
                               Destination={'ToAddresses': [address]},
                               Message={'Subject': {'Data': sub},
                                        'Body': {'Text': {'Data': text}}})
+    record_request()
     logging.info('SES response received: %s', response)
 
 def assign_content(colour:str) -> str:
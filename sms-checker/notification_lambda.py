@@ -5,6 +5,7 @@ import asyncio
 from checker import get_subscribers_bodies, get_subscribers_aurora
 from message import send_email_for_bodies,send_sms_for_bodies,\
                     construct_aurora_email,construct_aurora_sms
+from instrumentation import track_stage
 
 
 def process_users(contacts: list) -> tuple[list]:
@@ -15,7 +16,9 @@ def process_users(contacts: list) -> tuple[list]:
 
 async def alerts_for_bodies() -> None:
     '''Asynchronous function that alerts users about celestial bodies'''
-    subscribers = get_subscribers_bodies()
+    with track_stage('sms-checker', 'extract-bodies') as stage:
+        subscribers = get_subscribers_bodies()
+        stage.add_rows(len(subscribers) if subscribers else 0)
     if subscribers:
         logging.info('Subscribers found: %s', len(subscribers))
         email_list, phone_list = process_users(subscribers)
@@ -34,7 +37,9 @@ async def alerts_for_bodies() -> None:
 
 async def alerts_for_auroras() -> None:
     '''Asynchronous function that alerts users about auroras'''
-    users,colour = get_subscribers_aurora()
+    with track_stage('sms-checker', 'extract-aurora') as stage:
+        users,colour = get_subscribers_aurora()
+        stage.add_rows(len(users) if users else 0)
     if users:
         logging.info('Subscribers found: %s', len(users))
         email_list, phone_list = process_users(users)
@@ -61,7 +66,8 @@ def lambda_handler(event,context) -> None:
     '''Runs the notification pipeline'''
     logger = logging.getLogger(__name__)
     logging.basicConfig(level=logging.INFO)
-    asyncio.run(run_notifications())
+    with track_stage('sms-checker', 'notify'):
+        asyncio.run(run_notifications())
 
 
 if __name__ == '__main__':
@@ -46,31 +46,6 @@ def valid_coords():
     return [51.5074, 51.5072], [0.1276, -0.1280]
 
 
-@pytest.fixture
-def valid_unclean_data():
-    '''Returns a valid dictionary with solar data'''
-    return {'daily': {'sunrise': ['2024-10-09T06:00', '2024-10-10T06:01'],
-            'sunset': ['2024-10-09T18:00', '2024-10-10T18:01']}}
-
-
-@pytest.fixture
-def valid_cleaned_data():
-    '''Returns a valid dictionary with solar data'''
-    return {'sunrise': ['2024-10-09T06:00', '2024-10-10T06:01'],
-            'sunset': ['2024-10-09T18:00', '2024-10-10T18:01']}
-
-
-@pytest.fixture
-def valid_times():
-    '''Returns valid solar data'''
-    return {'sunrise': ['2024-10-09T06:00', '2024-10-10T06:01', '2024-10-11T06:02',
-                        '2024-10-12T06:03', '2024-10-13T06:04', '2024-10-14T06:05',
-                        '2024-10-15T06:06'],
-            'sunset': ['2024-10-09T18:00', '2024-10-10T18:01', '2024-10-11T18:02',
-                       '2024-10-12T18:03', '2024-10-13T18:04', '2024-10-14T18:05',
-                       '2024-10-15T18:06']}
-
-
 @pytest.fixture
 def expected_valid_times():
     '''Returns valid solar data after it has been cleaned'''
@@ -85,34 +60,27 @@ def expected_valid_times():
     ]
 
 
-@pytest.fixture
-def invalid_times():
-    '''Returns an invalid time set'''
-    return {'sunrise': ['2024-10-09T06:00', '2024-10-10T18:01'],
-            'sunset': ['2024-10-09T18:00', '2024-10-10T18:01']}
-
-
 @pytest.fixture
 def valid_openmeteo_data():
     '''Returns a sample dataset akin to openmeteo'''
-    return [{'daily': {
+    return [{'county_id': county_id, 'daily': {
             'sunrise': ['2024-10-09T06:00', '2024-10-10T06:01', '2024-10-11T06:02',
                         '2024-10-12T06:03', '2024-10-13T06:04', '2024-10-14T06:05',
                         '2024-10-15T06:06'],
             'sunset': ['2024-10-09T18:00', '2024-10-10T18:01', '2024-10-11T18:02',
                        '2024-10-12T18:03', '2024-10-13T18:04', '2024-10-14T18:05',
-                       '2024-10-15T18:06']}}]*100
+                       '2024-10-15T18:06']}} for county_id in range(1, 101)]
 
 
 @pytest.fixture
 def invalid_openmeteo_data():
     '''Returns a sample dataset akin to openmeteo'''
-    return [{'daily': {
+    return [{'county_id': county_id, 'daily': {
             'sunrise': ['2024-10-09T06:00', '2024-10-10T06:01', '2024-10-11T06:02',
                         '2024-10-12T06:03', '2024-10-13T06:04', '2024-10-14T06:05'],
             'sunset': ['2024-10-09T18:00', '2024-10-10T18:01', '2024-10-11T18:02',
                        '2024-10-12T18:03', '2024-10-13T18:04', '2024-10-14T18:05',
-                       '2024-10-15T18:06']}}]*100
+                       '2024-10-15T18:06']}} for county_id in range(1, 101)]
 
 
 @pytest.fixture
@@ -3,8 +3,11 @@ from os import environ as ENV
 import logging
 from dotenv import load_dotenv
 from psycopg2 import connect
-from requests import get
+from requests import get, Session
 from api_error import APIError
+from instrumentation import record_request
+from openmeteo_locations import LocationRegistry
+from openmeteo_fetch import ShardedFetcher
 
 URL = "https://api.open-meteo.com/v1/forecast"
 
@@ -13,14 +16,15 @@ def get_connection():
     return connect(f"""dbname={ENV["DB_NAME"]} user={ENV["DB_USER"]}
                  host={ENV["DB_HOST"]} password={ENV["DB_PASSWORD"]} port={ENV["DB_PORT"]}""")
 
-def get_county_coordinates() -> tuple[list[int]]:
-    '''Returns a params dict containing the UK counties coordinates'''
-    query = '''SELECT longitude,latitude FROM county'''
+def get_county_locations() -> list[dict]:
+    '''Returns the id and coordinates of every UK county, ordered by id'''
+    query = '''SELECT county_id, latitude, longitude FROM county ORDER BY county_id'''
     with get_connection() as conn:
         with conn.cursor() as cur:
             cur.execute(query)
             counties = cur.fetchall()
-    return [county[0] for county in counties], [county[1] for county in counties]
+    return [{'county_id': county[0], 'latitude': county[1], 'longitude': county[2]}
+            for county in counties]
 
 def convert_to_params(long:list[int], lat:list[int]):
     '''Converts the obtained longitude and latitude values to params'''
@@ -31,20 +35,23 @@ def convert_to_params(long:list[int], lat:list[int]):
 
     raise TypeError('Queried data is wrong datatype')
 
-def request_solar_data(params: dict) -> list:
-    '''Returns the solar data for the given set of coordinates'''
-    response = get(URL, params=params, timeout=10)
+def request_solar_data(params: dict, session: Session = None) -> list:
+    '''Returns the solar data for the given set of coordinates, through the session if given'''
+    response = (session.get if session else get)(URL, params=params, timeout=10)
     logging.info('Request sent.')
+    record_request(len(response.content or b''))
 
     if response.status_code == 200:
         logging.info('Get request successful.')
         solar_data = response.json()
+        # A single location is returned as an object rather than a list
+        if isinstance(solar_data, dict) and 'latitude' in solar_data:
+            solar_data = [solar_data]
 
         if isinstance(solar_data,list):
 
-            if len(solar_data) == 106 and \
-                all(len(region['daily']['sunrise']) > 0 for region in solar_data) and \
-                all(len(region['daily']['sunset']) > 0 for region in solar_data):
+            if all(isinstance(region['daily'][key], list) and len(region['daily'][key]) > 0
+                   for region in solar_data for key in ('sunrise', 'sunset')):
                 return solar_data
 
             raise ValueError('Missing Values in returned data')
@@ -54,11 +61,15 @@ def request_solar_data(params: dict) -> list:
     logging.info('Get request unsuccessful.')
     raise APIError('Unsuccessful request.',response.status_code)
 
+def request_batch(locations: LocationRegistry, session: Session) -> list[dict]:
+    '''Returns the solar data for a batch of locations, matched to their counties'''
+    parameters = convert_to_params(locations.longitudes,locations.latitudes)
+    return locations.match(request_solar_data(parameters, session))
+
 def extract() -> list:
-    '''Runs extract pipeline'''
-    longitude,latitude = get_county_coordinates()
-    parameters = convert_to_params(longitude,latitude)
-    return request_solar_data(parameters)
+    '''Runs extract pipeline, returning each response with its county_id'''
+    locations = LocationRegistry(get_county_locations())
+    return ShardedFetcher.from_env(request_batch).fetch(locations)
 
 
 
@@ -0,0 +1,65 @@
+'''Columnar transform shared by the Open-Meteo pipelines. Stacks every
+county's hourly or daily arrays into one column per field, parsing each
+time column once and broadcasting county ids, so the result can be
+copied straight into the database.'''
+import io
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M'
+
+
+def get_county_lengths(data: list[dict], section: str, fields: list[str],
+                       length: int = None) -> list[int]:
+    '''Returns the number of rows taken from each county, the length of its
+    first field unless a fixed length is given. Raises an IndexError if a
+    field has fewer values than that.'''
+    lengths = []
+    for county in data:
+        values = county[section]
+        count = len(values[fields[0]]) if length is None else length
+        for field in fields:
+            if len(values[field]) < count:
+                raise IndexError(f"County {county['county_id']} has too few {field} values.")
+        lengths.append(count)
+    return lengths
+
+def parse_times(columns: list[list], lengths: list[int]) -> np.ndarray:
+    '''Returns one time column for every county. When every county shares
+    the same time axis it is parsed once and repeated.'''
+    first = columns[0][:lengths[0]]
+    if all(column[:count] == first for column, count in zip(columns, lengths)):
+        return np.tile(pd.to_datetime(first, format=TIME_FORMAT).values, len(columns))
+    return pd.to_datetime(list(chain.from_iterable(
+        column[:count] for column, count in zip(columns, lengths))), format=TIME_FORMAT).values
+
+def stack_columns(data: list[dict], section: str, fields: dict[str, str],
+                  time_columns: tuple = (), length: int = None) -> pd.DataFrame:
+    '''Returns a frame with the county_id of each response followed by each
+    output column in `fields`, mapped from its Open-Meteo field in `section`.
+    Columns in `time_columns` are parsed to timestamps.'''
+    lengths = get_county_lengths(data, section, list(fields.values()), length)
+    county_ids = [county['county_id'] for county in data]
+
+    frame = {'county_id': np.repeat(np.asarray(county_ids, dtype=np.int16), lengths)}
+    for column, field in fields.items():
+        values = [county[section][field] for county in data]
+        if column in time_columns:
+            frame[column] = parse_times(values, lengths)
+        else:
+            frame[column] = list(chain.from_iterable(
+                value[:count] for value, count in zip(values, lengths)))
+
+    return pd.DataFrame(frame)
+
+def to_rows(frame: pd.DataFrame) -> list[list]:
+    '''Returns the frame as a list of rows of Python values, with None for missing values'''
+    return frame.astype(object).where(frame.notna(), None).values.tolist()
+
+def to_csv_buffer(frame: pd.DataFrame) -> io.StringIO:
+    '''Returns the frame as a CSV buffer ready for COPY. Missing values become NULL.'''
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, date_format='%Y-%m-%d %H:%M:%S')
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,115 @@
+'''Registry of the locations requested from Open-Meteo. Each location
+carries its county id through the request, and each response is matched
+back to its location by the coordinates Open-Meteo returns instead of by
+its position in the response.'''
+from os import environ as ENV
+import logging
+from math import hypot
+
+# Open-Meteo snaps coordinates to the grid of the model that answers, which
+# for best_match can be a 0.25 degree global grid, so a response can be up
+# to half that grid's diagonal from the location it answers
+MATCH_TOLERANCE = 0.18
+# Distances closer than this are treated as equal
+DISTANCE_PRECISION = 6
+
+
+class LocationRegistry:
+    '''Locations to request from Open-Meteo, ordered by county id'''
+
+    def __init__(self, locations: list[dict], tolerance: float = None):
+        '''Creates a registry from rows with a county_id, latitude and longitude.
+        Responses are matched to locations within `tolerance` degrees, or
+        OPENMETEO_MATCH_TOLERANCE if not given.'''
+        self.locations = sorted(locations, key=lambda location: location['county_id'])
+        self.tolerance = tolerance or float(ENV.get('OPENMETEO_MATCH_TOLERANCE',
+                                                    MATCH_TOLERANCE))
+
+        if len(set(self.county_ids)) != len(self.locations):
+            raise ValueError('Locations have duplicate county ids.')
+
+    def __len__(self) -> int:
+        '''Returns the number of locations'''
+        return len(self.locations)
+
+    @property
+    def latitudes(self) -> list[float]:
+        '''Returns the latitude of each location'''
+        return [location['latitude'] for location in self.locations]
+
+    @property
+    def longitudes(self) -> list[float]:
+        '''Returns the longitude of each location'''
+        return [location['longitude'] for location in self.locations]
+
+    @property
+    def county_ids(self) -> list[int]:
+        '''Returns the county id of each location'''
+        return [location['county_id'] for location in self.locations]
+
+    def split(self, index: int) -> tuple:
+        '''Returns registries of the locations before and after an index'''
+        return (LocationRegistry(self.locations[:index], self.tolerance),
+                LocationRegistry(self.locations[index:], self.tolerance))
+
+    def batch(self, size: int) -> list:
+        '''Returns registries of at most `size` locations each'''
+        return [LocationRegistry(self.locations[start:start + size], self.tolerance)
+                for start in range(0, len(self.locations), size)]
+
+    @staticmethod
+    def get_distance(location: dict, response: dict) -> float:
+        '''Returns the distance in degrees between a location and a response'''
+        return hypot(location['latitude'] - response['latitude'],
+                     location['longitude'] - response['longitude'])
+
+    def find_location(self, position: int, response: dict, unmatched: dict) -> int:
+        '''Returns the index of the nearest unmatched location to a response.
+        Neighbouring counties can share a grid cell, so of locations at the
+        same distance the one requested at the response's position is kept.
+        A response near no unmatched location falls back to its position.'''
+        distances = {index: round(self.get_distance(location, response), DISTANCE_PRECISION)
+                     for index, location in unmatched.items()}
+        candidates = {index: distance for index, distance in distances.items()
+                      if distance <= self.tolerance}
+
+        if not candidates:
+            logging.warning('Response %s at %s, %s is further than %s degrees from every '
+                            'unmatched location, matched by its position.', position,
+                            response['latitude'], response['longitude'], self.tolerance)
+            if position in unmatched:
+                return position
+            candidates = distances
+
+        index = min(candidates, key=lambda index: (candidates[index], index != position))
+        if index != position:
+            logging.warning('Response %s is out of order, matched by its coordinates.', position)
+        return index
+
+    def match(self, responses: list[dict]) -> list[dict]:
+        '''Returns each response with the county_id of the location it answers.
+        Raises a ValueError unless every location is answered exactly once.'''
+        if len(responses) != len(self.locations):
+            raise ValueError(f'Expected {len(self.locations)} locations, '
+                             f'received {len(responses)}.')
+
+        unmatched = dict(enumerate(self.locations))
+        matched = []
+
+        for position, response in enumerate(responses):
+            location = unmatched.pop(self.find_location(position, response, unmatched))
+            matched.append({**response, 'county_id': location['county_id']})
+
+        return matched
+
+    def validate(self, responses: list[dict]) -> None:
+        '''Raises a ValueError unless the matched responses answer every
+        location exactly once'''
+        returned = [response['county_id'] for response in responses]
+        missing = set(self.county_ids) - set(returned)
+        unexpected = set(returned) - set(self.county_ids)
+
+        if missing or unexpected or len(returned) != len(set(returned)):
+            raise ValueError(f'Responses do not match the requested locations: '
+                             f'missing {sorted(missing)}, unexpected {sorted(unexpected)}, '
+                             f'{len(returned) - len(set(returned))} duplicated.')
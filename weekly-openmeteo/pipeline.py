@@ -2,6 +2,7 @@
 #pylint: disable=W0612,W0613,E0606
 import logging
 from dotenv import load_dotenv
+from instrumentation import track_stage
 from extract import extract
 from transform import transform
 from load import load_data
@@ -14,15 +15,21 @@ def lambda_handler(event, context):
     load_dotenv()
     logging.info('Environment loaded.')
 
-    data = extract()
+    with track_stage('weekly-openmeteo', 'extract') as stage:
+        data = extract()
+        stage.add_rows(len(data))
 
     if data:
         logging.info('Data extracted.')
-        clean_data = transform(data)
+        with track_stage('weekly-openmeteo', 'transform') as stage:
+            clean_data = transform(data)
+            stage.add_rows(len(clean_data))
 
     if clean_data:
         logging.info('Data cleaned.')
-        load_data(clean_data)
+        with track_stage('weekly-openmeteo', 'load') as stage:
+            load_data(clean_data)
+            stage.add_rows(len(clean_data))
         logging.info('Data loaded.')
 
 if __name__ == '__main__':
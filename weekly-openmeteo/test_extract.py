@@ -4,8 +4,8 @@ import json
 from unittest.mock import patch, MagicMock
 import pytest
 from requests import Response
-from extract import request_solar_data,get_county_coordinates,\
-                    convert_to_params
+from extract import request_solar_data,get_county_locations,\
+                    convert_to_params,extract
 from api_error import APIError
 
 class TestExtractFunction():
@@ -90,23 +90,32 @@ class TestDatabaseFunctions:
         "DB_PASSWORD": "test_password"
     })
     @patch("extract.get_connection")
-    def test_get_county_coordinates(self,mock_get_connection):
-        """Test that the get_county_coordinates function returns the correct coordinates."""
+    def test_get_county_locations(self,mock_get_connection):
+        """Test that the get_county_locations function returns each county's id and coordinates."""
         mock_connection = MagicMock()
         mock_cursor = MagicMock()
         mock_get_connection.return_value.__enter__.return_value = mock_connection
         mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
 
-        mock_cursor.fetchall.return_value = [(0.1278, 51.5074),
-                                             (-3.7038, 40.4168),
-                                             (0.1276, 51.5033)]
-        expected_longitudes = [0.1278, -3.7038, 0.1276]
-        expected_latitudes = [51.5074, 40.4168, 51.5033]
+        mock_cursor.fetchall.return_value = [(1, 51.5074, 0.1278),
+                                             (2, 40.4168, -3.7038)]
 
-        longitudes, latitudes = get_county_coordinates()
+        locations = get_county_locations()
 
-        assert longitudes == expected_longitudes
-        assert latitudes == expected_latitudes
+        assert locations == [{'county_id': 1, 'latitude': 51.5074, 'longitude': 0.1278},
+                             {'county_id': 2, 'latitude': 40.4168, 'longitude': -3.7038}]
+        assert 'ORDER BY county_id' in mock_cursor.execute.call_args.args[0]
+
+    @patch("extract.request_solar_data")
+    @patch("extract.get_county_locations")
+    def test_extract_matches_by_coordinates(self, mock_locations, mock_request):
+        """Test that each response is given the county at its coordinates."""
+        mock_locations.return_value = [{'county_id': 4, 'latitude': 51.5, 'longitude': 0.1},
+                                       {'county_id': 9, 'latitude': 40.4, 'longitude': -3.7}]
+        mock_request.return_value = [{'latitude': 40.4, 'longitude': -3.7},
+                                     {'latitude': 51.5, 'longitude': 0.1}]
+
+        assert [county['county_id'] for county in extract()] == [9, 4]
 
     def test_convert_to_params(self):
         """Test convert_to_params function"""